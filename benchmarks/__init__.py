@@ -0,0 +1,9 @@
+"""
+基准测试套件
+
+- `datagen`：生成可复现的合成聊天记录，写入本地 SQLite 数据库；
+- `suite`：转换、加载、写出和完整导出各阶段的基准测试；
+- `results`：结果的 JSON 格式和跨提交的回归比较。
+
+运行方式: python -m benchmarks.run --messages 100000 --output bench.json
+"""
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+消息转换基准测试
+
+生成包含多种消息段的消息，测量快速路径转换（不含序列化）的吞吐量。
+运行方式: python benchmarks/bench_converter.py [消息条数] [重复次数]
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import nonebot
+
+# 将项目根目录添加到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+nonebot.init()
+nonebot.load_plugin("nonebot_plugin_qq_chat_exporter")
+
+from nonebot_plugin_qq_chat_exporter.converter import (  # noqa: E402
+    MessageConverter,
+    MessageRow,
+    convert_rows_to_export_dicts,
+    new_resource_stats,
+)
+
+BATCH_SIZE = 1000
+
+# 按群聊中常见的比例组合消息段
+SEGMENT_PATTERNS = [
+    [{"type": "text", "data": {"text": "大家好，今天的会议改到下午三点。"}}],
+    [{"type": "text", "data": {"text": "收到"}}, {"type": "face", "data": {"id": "178"}}],
+    [{"type": "image", "data": {"file": "a.jpg", "url": "http://example.com/a.jpg"}}],
+    [
+        {"type": "reply", "data": {"id": "1"}},
+        {"type": "at", "data": {"qq": "10001"}},
+        {"type": "text", "data": {"text": " 这个问题我来看一下"}},
+    ],
+    [{"type": "record", "data": {"file": "a.amr"}}],
+    [{"type": "at", "data": {"qq": "all"}}, {"type": "text", "data": {"text": " 请查收通知"}}],
+    [{"type": "file", "data": {"file": "报告.pdf"}}],
+    [{"type": "json", "data": {"data": "{}"}}],
+]
+
+
+def make_batches(count: int):
+    """生成混合消息段的消息批次"""
+    start = datetime(2024, 1, 1)
+    rows = [
+        MessageRow(
+            id=i,
+            time=start + timedelta(seconds=i),
+            message_id=str(i),
+            type="message",
+            message=SEGMENT_PATTERNS[i % len(SEGMENT_PATTERNS)],
+            session_persist_id=i % 200,
+            user_id=str(10000 + i % 200),
+            user_name=f"群成员{i % 200}"
+        )
+        for i in range(count)
+    ]
+    return [rows[i:i + BATCH_SIZE] for i in range(0, len(rows), BATCH_SIZE)]
+
+
+def run_per_batch(batches) -> float:
+    """每批单独调用 convert_rows_to_export_dicts，只共享统计累加器"""
+    sender_stats = {}
+    resource_totals = new_resource_stats()
+    started = time.perf_counter()
+    for batch in batches:
+        convert_rows_to_export_dicts(
+            batch,
+            "group",
+            "123456",
+            sender_stats=sender_stats,
+            resource_totals=resource_totals
+        )
+    return time.perf_counter() - started
+
+
+def run_converter(batches) -> float:
+    """整个导出复用一个 MessageConverter，与导出服务的用法相同"""
+    converter = MessageConverter("group", "123456")
+    started = time.perf_counter()
+    for batch in batches:
+        converter.convert(batch)
+    converter.statistics()
+    return time.perf_counter() - started
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    batches = make_batches(count)
+    print(f"Converting {count} messages, best of {repeat}")  # noqa: T201
+
+    for name, run in (("per-batch", run_per_batch), ("converter", run_converter)):
+        best = min(run(batches) for _ in range(repeat))
+        print(f"{name:>9}: {best:.3f}s  {count / best:,.0f} msg/s")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
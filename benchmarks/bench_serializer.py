@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+JSON 序列化后端基准测试
+
+生成大量中文文本消息，分别用标准库和 orjson 序列化并写入文件，对比吞吐量。
+运行方式: python benchmarks/bench_serializer.py [消息条数]
+"""
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import nonebot
+
+# 将项目根目录添加到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+nonebot.init()
+nonebot.load_plugin("nonebot_plugin_qq_chat_exporter")
+
+from nonebot_plugin_qq_chat_exporter.converter import (  # noqa: E402
+    MessageRow,
+    convert_rows_to_export_dicts,
+)
+from nonebot_plugin_qq_chat_exporter.models import ChatInfo, Statistics  # noqa: E402
+from nonebot_plugin_qq_chat_exporter.serializer import (  # noqa: E402
+    dumps_orjson,
+    dumps_stdlib,
+    orjson,
+)
+from nonebot_plugin_qq_chat_exporter.writer import ExportWriter  # noqa: E402
+
+BATCH_SIZE = 1000
+TEXT = "今天群里讨论了新版本的发布计划，大家觉得下周三之前可以完成测试。"
+
+
+def make_batches(count: int):
+    """生成中文文本为主的消息批次"""
+    start = datetime(2024, 1, 1)
+    rows = [
+        MessageRow(
+            id=i,
+            time=start + timedelta(seconds=i),
+            message_id=str(i),
+            type="message",
+            message=[{"type": "text", "data": {"text": TEXT * (1 + i % 4)}}],
+            session_persist_id=i % 200,
+            user_id=str(10000 + i % 200),
+            user_name=f"群成员{i % 200}"
+        )
+        for i in range(count)
+    ]
+    dicts, _ = convert_rows_to_export_dicts(rows, "group", "123456")
+    return [dicts[i:i + BATCH_SIZE] for i in range(0, len(dicts), BATCH_SIZE)]
+
+
+def run(name, dumps, batches, output_dir: Path):
+    output_file = output_dir / f"{name}.json"
+    started = time.perf_counter()
+    with ExportWriter(output_file, ChatInfo(name="基准测试群", type="group"), dumps=dumps) as writer:
+        for batch in batches:
+            writer.write_messages(batch)
+        writer.finish(Statistics(totalMessages=writer.message_count))
+    elapsed = time.perf_counter() - started
+    size = output_file.stat().st_size
+    count = sum(len(b) for b in batches)
+    print(  # noqa: T201
+        f"{name:>8}: {elapsed:.3f}s  {count / elapsed:,.0f} msg/s  "
+        f"{size / elapsed / 1024 / 1024:.1f} MiB/s  ({size / 1024 / 1024:.1f} MiB)"
+    )
+    return output_file
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    batches = make_batches(count)
+    print(f"Serializing {count} messages")  # noqa: T201
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = Path(tmp)
+        stdlib_file = run("json", dumps_stdlib, batches, output_dir)
+        if orjson is None:
+            print("  orjson: not installed, skipped")  # noqa: T201
+            return
+        orjson_file = run("orjson", dumps_orjson, batches, output_dir)
+        same = stdlib_file.read_bytes() == orjson_file.read_bytes()
+        print(f"Outputs identical: {same}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
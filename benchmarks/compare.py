@@ -0,0 +1,48 @@
+"""
+比较两次基准测试的结果
+
+有基准测试的吞吐量比基线下降超过阈值时以状态码 1 退出，可以在 CI 中对比不同提交。
+
+运行方式: python -m benchmarks.compare baseline.json current.json [--thresholds thresholds.json]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from .results import THRESHOLDS_FILE, BenchmarkReport, compare_reports, load_thresholds, print_comparison
+
+
+def compare_and_print(baseline: BenchmarkReport, current: BenchmarkReport, thresholds: dict[str, float]) -> bool:
+    """
+    打印对比并返回是否没有回归
+
+    Returns:
+        没有基准测试变慢超过阈值时返回 True
+    """
+    regressions = compare_reports(baseline, current, thresholds)
+    print_comparison(baseline, current, regressions)
+    for regression in regressions:
+        print(  # noqa: T201
+            f"Regression: {regression.name} is {regression.slowdown:.1%} slower "
+            f"(threshold {regression.threshold:.0%})"
+        )
+    return not regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较两次基准测试的结果")
+    parser.add_argument("baseline", type=Path, help="基线结果 JSON 文件")
+    parser.add_argument("current", type=Path, help="当前结果 JSON 文件")
+    parser.add_argument("--thresholds", type=Path, default=THRESHOLDS_FILE, help="回归阈值文件")
+    args = parser.parse_args()
+
+    ok = compare_and_print(
+        BenchmarkReport.load(args.baseline),
+        BenchmarkReport.load(args.current),
+        load_thresholds(args.thresholds)
+    )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+合成聊天记录生成器
+
+按固定的随机种子生成接近真实群聊的消息：发言集中在少数活跃成员，
+消息以纯文本为主，混有图片、@、回复、表情、语音、视频、文件和卡片消息，
+时间间隔服从指数分布，同一秒内可能有多条消息。
+相同的参数总是生成相同的数据，因此不同提交的结果可以直接比较。
+
+运行方式: python -m benchmarks.datagen --messages 1000000 --db bench.db
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+
+# 被导出的群、用作干扰数据的另一个群和私聊对象
+GROUP_ID = "100000001"
+OTHER_GROUP_ID = "100000002"
+PRIVATE_USER_ID = "20001"
+BOT_ID = "10000"
+
+# 场景：目标群、另一个群、私聊
+SCENE_GROUP = 0
+SCENE_OTHER_GROUP = 1
+SCENE_PRIVATE = 2
+SCENE_WEIGHTS = (85, 10, 5)
+
+# 机器人自己发出的消息比例
+SENT_RATIO = 0.03
+
+START_TIME = datetime(2021, 1, 1)
+
+# 每次插入的行数
+INSERT_CHUNK_SIZE = 20_000
+
+PHRASES = (
+    "大家好", "收到", "好的", "哈哈哈哈", "今天的会议改到下午三点", "这个问题我来看一下",
+    "有人知道怎么配置吗", "已经修复了，更新一下就好", "晚上一起吃饭吗", "周末有空吗",
+    "文档在群文件里", "辛苦了", "明天见", "刚看到消息", "这个版本有点问题",
+    "please check the latest build", "LGTM", "ok", "thanks", "see the PR for details",
+)
+
+FACE_IDS = ("14", "21", "76", "178", "179", "277", "305")
+
+
+class SyntheticMessage(NamedTuple):
+    """一条合成消息"""
+    index: int
+    time: datetime
+    scene: int
+    user_index: int
+    type: str
+    message: list[dict[str, Any]]
+    plain_text: str
+
+
+def _member_weights(members: int) -> list[float]:
+    """成员发言权重，近似齐夫分布，少数成员贡献大部分消息"""
+    return [1 / (rank + 1) for rank in range(members)]
+
+
+class SyntheticChat:
+    """
+    合成聊天记录
+
+    Args:
+        messages: 消息总数，其中约 85% 属于目标群
+        members: 群成员数
+        seed: 随机种子
+        interval: 平均消息间隔（秒）
+    """
+
+    def __init__(self, messages: int, members: int = 200, seed: int = 42, interval: float = 60.0):
+        self.messages = messages
+        self.members = members
+        self.seed = seed
+        self.interval = interval
+
+    def user_id(self, user_index: int) -> str:
+        """成员序号对应的 QQ 号，序号 -1 为机器人"""
+        return BOT_ID if user_index < 0 else str(20001 + user_index)
+
+    def _text(self, rng: random.Random) -> str:
+        # 大多是短句，少数是长消息
+        count = 1 if rng.random() < 0.6 else rng.randint(2, 6)
+        if rng.random() < 0.02:
+            count = rng.randint(20, 60)
+        return "，".join(rng.choice(PHRASES) for _ in range(count))
+
+    def _segments(self, index: int, rng: random.Random) -> list[dict[str, Any]]:
+        kind = rng.random()
+        text = {"type": "text", "data": {"text": self._text(rng)}}
+        if kind < 0.55:
+            return [text]
+        if kind < 0.60:
+            return [text, {"type": "face", "data": {"id": rng.choice(FACE_IDS)}}]
+        if kind < 0.72:
+            name = f"{rng.getrandbits(64):016X}.jpg"
+            return [{"type": "image", "data": {"file": name, "url": f"https://example.com/{name}"}}]
+        if kind < 0.80:
+            target = self.user_id(rng.randrange(self.members))
+            return [{"type": "at", "data": {"qq": target}}, {"type": "text", "data": {"text": " " + self._text(rng)}}]
+        if kind < 0.87:
+            return [{"type": "reply", "data": {"id": str(max(index - rng.randint(1, 50), 0))}}, text]
+        if kind < 0.93:
+            name = f"{rng.getrandbits(64):016X}.png"
+            target = self.user_id(rng.randrange(self.members))
+            return [
+                {"type": "at", "data": {"qq": target}},
+                text,
+                {"type": "image", "data": {"file": name, "url": f"https://example.com/{name}"}},
+                {"type": "face", "data": {"id": rng.choice(FACE_IDS)}},
+            ]
+        if kind < 0.95:
+            return [{"type": "record", "data": {"file": f"{index}.amr"}}]
+        if kind < 0.965:
+            return [{"type": "video", "data": {"file": f"{index}.mp4"}}]
+        if kind < 0.975:
+            return [{"type": "file", "data": {"file": f"报告{index}.pdf", "file_size": str(rng.randint(1, 10 ** 7))}}]
+        if kind < 0.99:
+            return [{"type": "json", "data": {"data": '{"app":"com.tencent.miniapp","prompt":"[分享]"}'}}]
+        # 插件未识别的消息段类型
+        return [{"type": "mface", "data": {"summary": "[动画表情]"}}]
+
+    def __iter__(self) -> Iterator[SyntheticMessage]:
+        rng = random.Random(self.seed)
+        weights = _member_weights(self.members)
+        members = range(self.members)
+        offset = 0.0
+        for index in range(self.messages):
+            offset += rng.expovariate(1 / self.interval)
+            scene = rng.choices((SCENE_GROUP, SCENE_OTHER_GROUP, SCENE_PRIVATE), SCENE_WEIGHTS)[0]
+            sent = rng.random() < SENT_RATIO
+            if sent:
+                user_index = -1
+            elif scene == SCENE_PRIVATE:
+                user_index = 0
+            else:
+                user_index = rng.choices(members, weights)[0]
+            segments = self._segments(index, rng)
+            yield SyntheticMessage(
+                index=index,
+                # 只保留到秒，产生相同时间的消息
+                time=START_TIME + timedelta(seconds=int(offset)),
+                scene=scene,
+                user_index=user_index,
+                type="message_sent" if sent else "message",
+                message=segments,
+                plain_text="".join(s["data"]["text"] for s in segments if s["type"] == "text"),
+            )
+
+
+async def populate_database(chat: SyntheticChat, chunk_size: int = INSERT_CHUNK_SIZE) -> int:
+    """
+    将合成聊天记录写入插件当前使用的数据库
+
+    需要先初始化 NoneBot 并完成 `init_orm`，表结构由 ORM 创建。
+
+    Args:
+        chat: 合成聊天记录
+        chunk_size: 每次插入的行数
+
+    Returns:
+        目标群的消息数
+    """
+    from nonebot_plugin_chatrecorder import MessageRecord
+    from nonebot_plugin_orm import get_session
+    from nonebot_plugin_uninfo import SceneType
+    from nonebot_plugin_uninfo.orm import BotModel, SceneModel, SessionModel, UserModel
+    from sqlalchemy import insert
+
+    scenes = {
+        SCENE_GROUP: (1, GROUP_ID, SceneType.GROUP),
+        SCENE_OTHER_GROUP: (2, OTHER_GROUP_ID, SceneType.GROUP),
+        SCENE_PRIVATE: (3, PRIVATE_USER_ID, SceneType.PRIVATE),
+    }
+    # 用户序号 -1 为机器人自己，user 主键为序号 + 2
+    users = range(-1, chat.members)
+
+    def session_id(scene: int, user_index: int) -> int:
+        return scene * (chat.members + 1) + user_index + 2
+
+    async with get_session() as db_session:
+        db_session.add(BotModel(id=1, self_id=BOT_ID, adapter="OneBot V11", scope="QQClient"))
+        for scene, (scene_pk, scene_id, scene_type) in scenes.items():
+            db_session.add(SceneModel(
+                id=scene_pk,
+                bot_persist_id=1,
+                parent_scene_persist_id=None,
+                scene_id=scene_id,
+                scene_type=scene_type,
+                scene_data={"name": f"基准测试{scene_id}"}
+            ))
+        for user_index in users:
+            name = "机器人" if user_index < 0 else f"群成员{user_index}"
+            db_session.add(UserModel(
+                id=user_index + 2, bot_persist_id=1, user_id=chat.user_id(user_index), user_data={"name": name}
+            ))
+            for scene, (scene_pk, _, _) in scenes.items():
+                db_session.add(SessionModel(
+                    id=session_id(scene, user_index),
+                    bot_persist_id=1,
+                    scene_persist_id=scene_pk,
+                    user_persist_id=user_index + 2,
+                    member_data=None
+                ))
+        await db_session.commit()
+
+        group_messages = 0
+        rows: list[dict[str, Any]] = []
+        for message in chat:
+            if message.scene == SCENE_GROUP:
+                group_messages += 1
+            rows.append({
+                "session_persist_id": session_id(message.scene, message.user_index),
+                "time": message.time,
+                "type": message.type,
+                "message_id": str(100000 + message.index),
+                "message": message.message,
+                "plain_text": message.plain_text,
+            })
+            if len(rows) >= chunk_size:
+                await db_session.execute(insert(MessageRecord), rows)
+                await db_session.commit()
+                rows = []
+        if rows:
+            await db_session.execute(insert(MessageRecord), rows)
+            await db_session.commit()
+
+    return group_messages
+
+
+def default_db_path(chat: SyntheticChat) -> Path:
+    """按参数命名的数据库文件，相同参数的数据库可以重复使用"""
+    return Path(__file__).parent / ".data" / f"chat_{chat.messages}_{chat.members}_{chat.seed}.db"
+
+
+def init_plugin(db_path: Path) -> None:
+    """以指定的 SQLite 数据库初始化 NoneBot 并加载插件"""
+    import nonebot
+
+    nonebot.init(
+        sqlalchemy_database_url=f"sqlite+aiosqlite:///{db_path.resolve()}",
+        alembic_startup_check=False,
+        log_level="WARNING"
+    )
+    nonebot.load_plugin("nonebot_plugin_qq_chat_exporter")
+
+
+async def prepare_database(chat: SyntheticChat, db_path: Path) -> Optional[int]:
+    """
+    初始化数据库，文件不存在时生成合成数据
+
+    Returns:
+        新生成时返回目标群的消息数，使用已有文件时返回 None
+    """
+    from nonebot_plugin_orm import init_orm
+
+    exists = db_path.exists()
+    await init_orm()
+    if exists:
+        return None
+
+    started = time.perf_counter()
+    group_messages = await populate_database(chat)
+    print(  # noqa: T201
+        f"Generated {chat.messages} messages ({group_messages} in group {GROUP_ID}) "
+        f"into {db_path} in {time.perf_counter() - started:.1f}s"
+    )
+    return group_messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成聊天记录数据库")
+    parser.add_argument("--messages", type=int, default=100_000, help="消息总数")
+    parser.add_argument("--members", type=int, default=200, help="群成员数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--db", type=Path, help="数据库文件，默认按参数命名保存在 benchmarks/.data")
+    args = parser.parse_args()
+
+    chat = SyntheticChat(args.messages, args.members, args.seed)
+    db_path = args.db or default_db_path(chat)
+    if db_path.exists():
+        parser.error(f"{db_path} already exists")
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    init_plugin(db_path)
+    asyncio.run(prepare_database(chat, db_path))
+
+
+if __name__ == "__main__":
+    main()
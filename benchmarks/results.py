@@ -0,0 +1,182 @@
+"""
+基准测试结果：JSON 格式、阈值文件和跨提交的回归比较
+"""
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field
+
+# 结果文件格式版本
+RESULTS_VERSION = 1
+
+THRESHOLDS_FILE = Path(__file__).parent / "thresholds.json"
+
+# 阈值文件中没有列出的基准测试允许的最大变慢比例
+DEFAULT_THRESHOLD = 0.15
+
+
+class BenchmarkResult(BaseModel):
+    """单项基准测试的结果，取多轮中最快的一轮计算吞吐量"""
+
+    name: str
+    items: int
+    """ 每轮处理的消息数 """
+    rounds: list[float]
+    """ 每轮耗时（秒） """
+    extra: dict[str, Any] = Field(default_factory=dict)
+    """ 附加信息，例如输出文件大小 """
+
+    @property
+    def best(self) -> float:
+        return min(self.rounds)
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.best if self.best > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.name:<38} {self.best:>9.3f}s  {self.items_per_second:>12,.0f} msg/s"
+            f"  (best of {len(self.rounds)})"
+        )
+
+
+class BenchmarkReport(BaseModel):
+    """一次基准测试运行的全部结果"""
+
+    version: int = RESULTS_VERSION
+    created_at: datetime = Field(default_factory=datetime.now)
+    commit: Optional[str] = None
+    environment: dict[str, Any] = Field(default_factory=dict)
+    parameters: dict[str, Any] = Field(default_factory=dict)
+    benchmarks: dict[str, BenchmarkResult] = Field(default_factory=dict)
+
+    def add(self, result: BenchmarkResult) -> None:
+        self.benchmarks[result.name] = result
+
+    def save(self, path: Path) -> None:
+        path.write_text(self.model_dump_json(indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path) -> "BenchmarkReport":
+        return cls.model_validate_json(Path(path).read_text(encoding="utf-8"))
+
+
+class Regression(BaseModel):
+    """一项变慢超过阈值的基准测试"""
+
+    name: str
+    baseline: float
+    current: float
+    threshold: float
+
+    @property
+    def slowdown(self) -> float:
+        return 1 - self.current / self.baseline
+
+
+def current_commit() -> Optional[str]:
+    """当前 git 提交，不在 git 仓库中时返回 None"""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def environment_info() -> dict[str, Any]:
+    """影响结果的运行环境"""
+    from nonebot_plugin_qq_chat_exporter.serializer import orjson
+
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "orjson": orjson is not None,
+    }
+
+
+def load_thresholds(path: Path = THRESHOLDS_FILE) -> dict[str, float]:
+    """
+    读取阈值文件
+
+    格式为 `{"default": 0.15, "benchmarks": {"名称": 0.25}}`，
+    值为相对基线允许的最大变慢比例
+
+    Returns:
+        各基准测试的阈值，`default` 键为默认阈值
+    """
+    if not path.exists():
+        return {"default": DEFAULT_THRESHOLD}
+    data = json.loads(path.read_text(encoding="utf-8"))
+    thresholds = dict(data.get("benchmarks", {}))
+    thresholds["default"] = data.get("default", DEFAULT_THRESHOLD)
+    return thresholds
+
+
+def compare_reports(
+    baseline: BenchmarkReport,
+    current: BenchmarkReport,
+    thresholds: Optional[dict[str, float]] = None
+) -> list[Regression]:
+    """
+    按吞吐量比较两次运行，找出变慢超过阈值的基准测试
+
+    只比较两次都运行过的基准测试。参数（消息数、批大小等）不同时结果没有可比性，
+    调用方应先检查 `parameters` 是否一致。
+
+    Args:
+        baseline: 基线结果
+        current: 当前结果
+        thresholds: 各基准测试的阈值，为空时使用默认阈值
+
+    Returns:
+        变慢超过阈值的基准测试
+    """
+    thresholds = thresholds or {}
+    default = thresholds.get("default", DEFAULT_THRESHOLD)
+    regressions = []
+    for name, result in current.benchmarks.items():
+        base = baseline.benchmarks.get(name)
+        if base is None or base.items_per_second <= 0:
+            continue
+        threshold = thresholds.get(name, default)
+        if result.items_per_second < base.items_per_second * (1 - threshold):
+            regressions.append(Regression(
+                name=name,
+                baseline=base.items_per_second,
+                current=result.items_per_second,
+                threshold=threshold
+            ))
+    return regressions
+
+
+def print_comparison(baseline: BenchmarkReport, current: BenchmarkReport, regressions: list[Regression]) -> None:
+    """打印两次运行的吞吐量对比"""
+    if baseline.parameters != current.parameters:
+        print(f"Warning: parameters differ: {baseline.parameters} vs {current.parameters}")  # noqa: T201
+    print(f"Baseline {baseline.commit or '?'} ({baseline.created_at:%Y-%m-%d %H:%M}) -> current {current.commit or '?'}")  # noqa: T201
+    regressed = {r.name for r in regressions}
+    for name, result in current.benchmarks.items():
+        base = baseline.benchmarks.get(name)
+        if base is None:
+            print(f"  {name:<38} {result.items_per_second:>12,.0f} msg/s  (new)")  # noqa: T201
+            continue
+        change = result.items_per_second / base.items_per_second - 1 if base.items_per_second else 0.0
+        marker = "  REGRESSION" if name in regressed else ""
+        print(  # noqa: T201
+            f"  {name:<38} {base.items_per_second:>12,.0f} -> {result.items_per_second:>12,.0f} msg/s"
+            f"  {change:+.1%}{marker}"
+        )
@@ -0,0 +1,94 @@
+"""
+运行基准测试套件并输出 JSON 结果
+
+首次运行时按参数生成合成数据库并缓存在 benchmarks/.data，之后直接复用。
+传入 --baseline 时与之前的结果比较，有基准测试变慢超过阈值时以状态码 1 退出。
+
+运行方式:
+    python -m benchmarks.run --messages 100000 --output bench.json
+    python -m benchmarks.run --messages 100000 --output new.json --baseline bench.json
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+from .datagen import SyntheticChat, default_db_path, init_plugin, prepare_database
+from .results import THRESHOLDS_FILE, BenchmarkReport, load_thresholds
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="运行导出插件的基准测试")
+    parser.add_argument("--messages", type=int, default=100_000, help="合成数据库的消息总数")
+    parser.add_argument("--members", type=int, default=200, help="群成员数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--sample", type=int, default=50_000, help="内存中基准测试使用的消息数")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批消息条数")
+    parser.add_argument("--repeat", type=int, default=3, help="每项测试的轮数")
+    parser.add_argument("--db", type=Path, help="数据库文件，默认按参数命名保存在 benchmarks/.data")
+    parser.add_argument("--only", help="只运行指定的基准测试，逗号分隔")
+    parser.add_argument("--output", type=Path, help="结果 JSON 文件")
+    parser.add_argument("--baseline", type=Path, help="用于比较的基线结果 JSON 文件")
+    parser.add_argument("--thresholds", type=Path, default=THRESHOLDS_FILE, help="回归阈值文件")
+    return parser.parse_args()
+
+
+async def run(args: argparse.Namespace, chat: SyntheticChat, db_path: Path) -> BenchmarkReport:
+    # 插件模块需要在 NoneBot 初始化之后导入
+    from .results import current_commit, environment_info
+    from .suite import BENCHMARKS, BenchmarkSuite
+
+    await prepare_database(chat, db_path)
+
+    names = BENCHMARKS
+    if args.only:
+        names = tuple(name.strip() for name in args.only.split(","))
+        unknown = set(names) - set(BENCHMARKS)
+        if unknown:
+            raise SystemExit(f"Unknown benchmarks: {', '.join(sorted(unknown))}, expected {BENCHMARKS}")
+
+    report = BenchmarkReport(
+        commit=current_commit(),
+        environment=environment_info(),
+        parameters={
+            "messages": chat.messages,
+            "members": chat.members,
+            "seed": chat.seed,
+            "sample": args.sample,
+            "batch_size": args.batch_size,
+            "repeat": args.repeat,
+        }
+    )
+    suite = BenchmarkSuite(chat, args.sample, args.batch_size, args.repeat)
+    for name in names:
+        result = await getattr(suite, name)()
+        report.add(result)
+        print(result.summary())  # noqa: T201
+    return report
+
+
+def main():
+    args = parse_args()
+    chat = SyntheticChat(args.messages, args.members, args.seed)
+    db_path = args.db or default_db_path(chat)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    init_plugin(db_path)
+    # 导出过程的日志会干扰计时输出
+    logging.getLogger("nonebot_plugin_qq_chat_exporter").setLevel(logging.ERROR)
+
+    report = asyncio.run(run(args, chat, db_path))
+    if args.output is not None:
+        report.save(args.output)
+        print(f"Results written to {args.output}")  # noqa: T201
+
+    if args.baseline is not None:
+        from .compare import compare_and_print
+
+        if not compare_and_print(BenchmarkReport.load(args.baseline), report, load_thresholds(args.thresholds)):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+基准测试项
+
+内存中的基准测试（解析、转换、写出）使用合成数据中目标群的前 `sample` 条消息，
+数据库相关的基准测试（加载关联信息、完整导出）使用整个数据库。
+每项测试先运行一轮预热（填充数据库页缓存、导入模块等），再运行多轮，结果取最快的一轮。
+"""
+import gc
+import shutil
+import tempfile
+import time
+from collections.abc import Awaitable
+from pathlib import Path
+from typing import Callable, Union
+
+from nonebot_plugin_chatrecorder import MessageRecord
+from nonebot_plugin_uninfo.orm import SessionModel, UserModel
+
+from nonebot_plugin_qq_chat_exporter import export_group_messages
+from nonebot_plugin_qq_chat_exporter.converter import (
+    MessageRow,
+    convert_records_to_export_messages,
+    convert_rows_to_export_dicts,
+    new_resource_stats,
+    parse_message_content,
+)
+from nonebot_plugin_qq_chat_exporter.exporter import _group_filters, _load_records_with_info
+from nonebot_plugin_qq_chat_exporter.fetch import count_message_records, iter_message_records
+from nonebot_plugin_qq_chat_exporter.models import ChatInfo, Statistics
+from nonebot_plugin_qq_chat_exporter.serializer import get_serializer
+from nonebot_plugin_qq_chat_exporter.writer import ExportWriter
+
+from .datagen import GROUP_ID, SCENE_GROUP, SyntheticChat
+from .results import BenchmarkResult
+
+Round = Callable[[], Union[float, Awaitable[float]]]
+
+
+class BenchmarkSuite:
+    """
+    基准测试集合
+
+    Args:
+        chat: 生成数据库使用的合成聊天记录
+        sample: 内存中基准测试使用的消息数
+        batch_size: 每批消息条数
+        repeat: 每项测试的轮数
+    """
+
+    def __init__(self, chat: SyntheticChat, sample: int, batch_size: int, repeat: int):
+        self.chat = chat
+        self.batch_size = batch_size
+        self.repeat = repeat
+        self.rows = self._sample_rows(sample)
+
+    def _sample_rows(self, sample: int) -> list[MessageRow]:
+        """目标群的前 sample 条消息，id 与写入数据库时的自增 id 一致"""
+        rows = []
+        for message in self.chat:
+            if len(rows) >= sample:
+                break
+            if message.scene != SCENE_GROUP:
+                continue
+            rows.append(MessageRow(
+                id=message.index + 1,
+                time=message.time,
+                message_id=str(100000 + message.index),
+                type=message.type,
+                message=message.message,
+                session_persist_id=message.user_index + 2,
+                user_id=self.chat.user_id(message.user_index),
+                user_name="机器人" if message.user_index < 0 else f"群成员{message.user_index}",
+            ))
+        return rows
+
+    def _batches(self, items: list) -> list[list]:
+        return [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+
+    async def _run(self, name: str, items: int, run_round: Round, **extra) -> BenchmarkResult:
+        rounds = []
+        for _ in range(self.repeat + 1):
+            # 避免上一轮留下的垃圾在本轮中被回收
+            gc.collect()
+            elapsed = run_round()
+            if isinstance(elapsed, Awaitable):
+                elapsed = await elapsed
+            rounds.append(elapsed)
+        # 第一轮为预热，不计入结果
+        return BenchmarkResult(name=name, items=items, rounds=rounds[1:], extra=extra)
+
+    async def parse_message_content(self) -> BenchmarkResult:
+        """逐条解析消息段并构建 MessageContent 模型"""
+        segments = [row.message for row in self.rows]
+
+        def run_round() -> float:
+            started = time.perf_counter()
+            for message in segments:
+                parse_message_content(message)
+            return time.perf_counter() - started
+
+        return await self._run("parse_message_content", len(segments), run_round)
+
+    async def convert_records_to_export_messages(self) -> BenchmarkResult:
+        """由 ORM 实体分批转换为 ExportMessage 模型"""
+        users = {}
+        records = []
+        for row in self.rows:
+            user = users.get(row.session_persist_id)
+            if user is None:
+                user = users[row.session_persist_id] = UserModel(
+                    id=row.session_persist_id, bot_persist_id=1, user_id=row.user_id, user_data={"name": row.user_name}
+                )
+            session = SessionModel(
+                id=row.session_persist_id, bot_persist_id=1, scene_persist_id=1, user_persist_id=user.id
+            )
+            record = MessageRecord(
+                id=row.id,
+                session_persist_id=row.session_persist_id,
+                time=row.time,
+                type=row.type,
+                message_id=row.message_id,
+                message=row.message,
+                plain_text=""
+            )
+            records.append((record, session, user))
+        batches = self._batches(records)
+
+        def run_round() -> float:
+            sender_stats = {}
+            resource_totals = new_resource_stats()
+            started = time.perf_counter()
+            for batch in batches:
+                convert_records_to_export_messages(
+                    batch, "group", GROUP_ID, sender_stats=sender_stats, resource_totals=resource_totals
+                )
+            return time.perf_counter() - started
+
+        return await self._run("convert_records_to_export_messages", len(records), run_round)
+
+    async def write_json(self) -> BenchmarkResult:
+        """将转换好的消息字典分批序列化并写入导出文件"""
+        messages, _ = convert_rows_to_export_dicts(self.rows, "group", GROUP_ID)
+        batches = self._batches(messages)
+        dumps = get_serializer()
+        output_dir = Path(tempfile.mkdtemp(prefix="qce_bench_"))
+        output_file = output_dir / "export.json"
+
+        def run_round() -> float:
+            started = time.perf_counter()
+            with ExportWriter(output_file, ChatInfo(name="基准测试群", type="group"), dumps=dumps) as writer:
+                for batch in batches:
+                    writer.write_messages(batch)
+                writer.finish(Statistics(totalMessages=writer.message_count))
+            return time.perf_counter() - started
+
+        try:
+            result = await self._run("write_json", len(messages), run_round)
+            result.extra["bytes"] = output_file.stat().st_size
+            return result
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+    async def load_records_with_info(self) -> BenchmarkResult:
+        """按批拉取消息记录后加载其会话和用户，只计加载的耗时"""
+        filters = _group_filters(GROUP_ID, None, None)
+        total = await count_message_records(**filters)
+
+        async def run_round() -> float:
+            elapsed = 0.0
+            async for records in iter_message_records(batch_size=self.batch_size, **filters):
+                started = time.perf_counter()
+                await _load_records_with_info(records)
+                elapsed += time.perf_counter() - started
+            return elapsed
+
+        return await self._run("load_records_with_info", total, run_round)
+
+    async def _export(self, name: str, **kwargs) -> BenchmarkResult:
+        total = await count_message_records(**_group_filters(GROUP_ID, None, None))
+        output_dir = Path(tempfile.mkdtemp(prefix="qce_bench_"))
+        sizes = []
+
+        async def run_round() -> float:
+            started = time.perf_counter()
+            output_file = await export_group_messages(
+                GROUP_ID, output_dir=str(output_dir), batch_size=self.batch_size, **kwargs
+            )
+            elapsed = time.perf_counter() - started
+            sizes.append(Path(output_file).stat().st_size)
+            Path(output_file).unlink()
+            return elapsed
+
+        try:
+            result = await self._run(name, total, run_round, options=kwargs)
+            result.extra["bytes"] = sizes[-1]
+            return result
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+    async def export_group_messages(self) -> BenchmarkResult:
+        """完整的群聊导出：拉取、转换、统计和写出"""
+        return await self._export("export_group_messages", convert_workers=0, fetch_parallelism=1)
+
+    async def export_group_messages_parallel_fetch(self) -> BenchmarkResult:
+        """按时间窗口并发拉取的完整导出"""
+        return await self._export(
+            "export_group_messages_parallel_fetch", convert_workers=0, fetch_parallelism=4
+        )
+
+
+# 内存中的基准测试，不访问数据库
+MEMORY_BENCHMARKS = ("parse_message_content", "convert_records_to_export_messages", "write_json")
+
+DATABASE_BENCHMARKS = (
+    "load_records_with_info",
+    "export_group_messages",
+    "export_group_messages_parallel_fetch",
+)
+
+BENCHMARKS = MEMORY_BENCHMARKS + DATABASE_BENCHMARKS
@@ -6,10 +6,20 @@ NoneBot QQ Chat Exporter Plugin
 from nonebot import require
 from nonebot.plugin import PluginMetadata
 
+require("nonebot_plugin_orm")
 require("nonebot_plugin_chatrecorder")
 
 from . import webui  # noqa: F401
-from .exporter import export_group_messages, export_private_messages  # noqa: F401
+from .batch import export_batch  # noqa: F401
+from .config import Config
+from .exporter import (  # noqa: F401
+    export_group_messages,
+    export_private_messages,
+    get_group_statistics,
+    get_private_statistics,
+)
+from .segments import register_segment_handler, unregister_segment_handler  # noqa: F401
+from .streaming import open_export_stream  # noqa: F401
 
 __plugin_meta__ = PluginMetadata(
     name="QQ聊天记录导出",
@@ -28,6 +38,7 @@ __plugin_meta__ = PluginMetadata(
     ),
     type="application",
     homepage="https://github.com/leafliber/nonebot-plugin-qq-chat-exporter",
+    config=Config,
     supported_adapters={"~onebot.v11", "~onebot.v12"},
     extra={
         "author": "leafliber",
@@ -40,6 +51,12 @@ __version__ = "0.1.0"
 __all__ = [
     "__plugin_meta__",
     "__version__",
+    "export_batch",
     "export_group_messages",
     "export_private_messages",
+    "get_group_statistics",
+    "get_private_statistics",
+    "open_export_stream",
+    "register_segment_handler",
+    "unregister_segment_handler",
 ]
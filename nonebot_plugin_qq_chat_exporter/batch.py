@@ -0,0 +1,216 @@
+"""
+批量导出：一次导出多个聊天，打包为一个 zip 文件
+"""
+import asyncio
+import json
+import logging
+import shutil
+import tempfile
+import zipfile
+from collections.abc import Iterable
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from nonebot import get_bot
+
+from .config import plugin_config
+from .exporter import (
+    DEFAULT_OUTPUT_DIR,
+    _export_chat,
+    _get_group_member_map,
+    _get_group_names,
+    _group_filters,
+    _private_filters,
+)
+from .fetch import DEFAULT_BATCH_SIZE
+from .metrics import ExportMetrics
+from .progress import (
+    STAGE_DONE,
+    STAGE_EXPORTING,
+    STAGE_FINALIZING,
+    STAGE_PREPARING,
+    ExportCancelled,
+    ExportProgress,
+)
+
+logger = logging.getLogger(__name__)
+
+# 压缩包中清单文件的名称
+MANIFEST_FILENAME = "manifest.json"
+
+CHAT_TYPES = ("group", "private")
+
+
+def _chat_entry_name(chat_type: str, chat_id: str) -> str:
+    """聊天在压缩包中的文件名"""
+    return f"{chat_type}_{chat_id}.json"
+
+
+async def export_batch(
+    chats: Iterable[tuple[str, str]],
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    output_dir: Optional[str] = None,
+    concurrency: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: Optional[ExportProgress] = None
+) -> str:
+    """
+    批量导出多个聊天的消息，打包为一个 zip 文件
+
+    同时最多导出 `concurrency` 个聊天，所有聊天共用同一个机器人，群名称通过一次
+    `get_group_list` 获取。每个聊天导出完成后立即写入压缩包并删除临时文件，
+    压缩包中另有 `manifest.json` 记录每个聊天的导出结果。
+    单个聊天导出失败不影响其他聊天，失败原因记录在清单中。
+
+    Args:
+        chats: (聊天类型, 群号或用户ID) 列表，聊天类型为 "group" 或 "private"
+        start_time: 开始时间
+        end_time: 结束时间
+        output_dir: 输出目录
+        concurrency: 同时导出的聊天数，为空时使用插件配置
+        batch_size: 每批拉取的消息条数
+        progress: 整体导出进度，记录数和写入字节数为所有聊天之和
+
+    Returns:
+        压缩包路径
+    """
+    # 去重并保持顺序
+    chats = list(dict.fromkeys((chat_type, str(chat_id)) for chat_type, chat_id in chats))
+    if not chats:
+        raise ValueError("No chats to export")
+    for chat_type, _ in chats:
+        if chat_type not in CHAT_TYPES:
+            raise ValueError(f"Invalid chat_type: {chat_type}")
+
+    if concurrency is None:
+        concurrency = plugin_config.qq_chat_exporter_batch_concurrency
+    concurrency = max(1, concurrency)
+
+    output_path = Path(output_dir or DEFAULT_OUTPUT_DIR)
+    output_path.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    archive_file = output_path / f"batch_{timestamp}.zip"
+    # 单个聊天先导出到临时目录，写入压缩包后删除
+    work_dir = Path(tempfile.mkdtemp(prefix=".batch_", dir=output_path))
+
+    logger.info(f"Starting batch export of {len(chats)} chats to {archive_file}")
+    if progress is not None:
+        progress.set_stage(STAGE_PREPARING)
+
+    # 所有聊天共用同一个机器人和群名称列表
+    try:
+        bot = get_bot()
+    except Exception as e:
+        logger.warning(f"No bot available for batch export: {e}")
+        bot = None
+    group_names: dict[str, str] = {}
+    if bot is not None and any(chat_type == "group" for chat_type, _ in chats):
+        group_names = await _get_group_names(bot)
+
+    children: list[ExportProgress] = []
+
+    def report(snapshot: dict[str, Any]) -> None:
+        if progress is not None:
+            progress.update(
+                fetched=sum(child.fetched for child in children),
+                converted=sum(child.converted for child in children),
+                bytes_written=sum(child.bytes_written for child in children)
+            )
+
+    semaphore = asyncio.Semaphore(concurrency)
+    archive_lock = asyncio.Lock()
+
+    async def export_one(archive: zipfile.ZipFile, chat_type: str, chat_id: str) -> dict[str, Any]:
+        async with semaphore:
+            if progress is not None:
+                progress.check_cancelled()
+
+            child = ExportProgress(on_update=report, parent=progress)
+            children.append(child)
+            entry: dict[str, Any] = {"chatType": chat_type, "chatId": chat_id}
+            metrics = ExportMetrics(chat_type)
+            try:
+                if chat_type == "group":
+                    with metrics.span("member_lookup"):
+                        nickname_map = await _get_group_member_map(chat_id, bot) if bot is not None else {}
+                    chat_name = group_names.get(chat_id) or f"Group {chat_id}"
+                    filters = _group_filters(chat_id, start_time, end_time)
+                else:
+                    nickname_map = {}
+                    chat_name = f"User {chat_id}"
+                    filters = _private_filters(chat_id, start_time, end_time)
+                entry["name"] = chat_name
+
+                file_path = Path(await _export_chat(
+                    chat_type, chat_id, chat_name, filters, nickname_map,
+                    str(work_dir), batch_size, progress=child, metrics=metrics
+                ))
+            except ExportCancelled:
+                metrics.finish("cancelled")
+                raise
+            except Exception as e:
+                logger.warning(f"Batch export of {chat_type} {chat_id} failed: {type(e).__name__} - {str(e)}")
+                # 获取群成员失败时 _export_chat 尚未开始，在这里计入失败
+                metrics.finish("failed", e)
+                entry.update(status="failed", error=f"{type(e).__name__}: {str(e)}")
+                return entry
+
+            entry_name = _chat_entry_name(chat_type, chat_id)
+            entry.update(
+                status="completed",
+                file=entry_name,
+                messageCount=child.converted,
+                size=file_path.stat().st_size
+            )
+            # zipfile 不支持并发写入，压缩在线程中进行，避免阻塞事件循环
+            async with archive_lock:
+                await asyncio.to_thread(archive.write, file_path, entry_name)
+            file_path.unlink()
+            return entry
+
+    try:
+        with zipfile.ZipFile(archive_file, "w", zipfile.ZIP_DEFLATED) as archive:
+            if progress is not None:
+                progress.set_stage(STAGE_EXPORTING)
+
+            # 取消时各聊天在下一批消息前自行中止，等待全部结束后再关闭压缩包
+            results = await asyncio.gather(
+                *(export_one(archive, chat_type, chat_id) for chat_type, chat_id in chats),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+
+            if progress is not None:
+                progress.check_cancelled()
+                progress.set_stage(STAGE_FINALIZING)
+
+            failed = sum(1 for entry in results if entry["status"] == "failed")
+            manifest = {
+                "createdAt": datetime.now().isoformat(),
+                "startTime": start_time.isoformat() if start_time else None,
+                "endTime": end_time.isoformat() if end_time else None,
+                "total": len(results),
+                "completed": len(results) - failed,
+                "failed": failed,
+                "chats": results,
+            }
+            archive.writestr(MANIFEST_FILENAME, json.dumps(manifest, ensure_ascii=False, indent=2))
+    except BaseException:
+        # 不保留不完整的压缩包
+        archive_file.unlink(missing_ok=True)
+        raise
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if progress is not None:
+        progress.update(bytes_written=archive_file.stat().st_size)
+        progress.set_stage(STAGE_DONE)
+
+    if failed:
+        logger.warning(f"Batch export finished with {failed} of {len(results)} chats failed")
+    logger.info(f"Batch export completed successfully: {archive_file}")
+    return str(archive_file)
@@ -0,0 +1,177 @@
+"""
+机器人 API 缓存：群列表、群信息和群成员列表在一段时间内复用，避免每次导出都请求协议端
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Hashable
+from typing import Any, Callable, Generic, TypeVar
+
+from nonebot.adapters import Bot
+
+from .config import plugin_config
+
+logger = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+def _consume_exception(task: asyncio.Future) -> None:
+    """取出任务的异常，避免没有调用方等待时出现 `exception was never retrieved`"""
+    if not task.cancelled():
+        task.exception()
+
+
+class AsyncTTLCache(Generic[_T]):
+    """
+    带过期时间的异步缓存
+
+    - 在 `ttl` 内直接返回缓存值；
+    - 过期后的 `stale_ttl` 内仍返回旧值，同时在后台刷新；
+    - 更久的条目视为未命中，调用方等待重新加载；
+    - 同一个键同时只有一次加载，并发的未命中共享同一次调用；
+    - 加载失败不缓存，后台刷新失败时保留旧值。
+
+    条目数超过 `max_entries` 时淘汰最久未使用的条目。
+    """
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float, max_entries: int):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: OrderedDict[Hashable, tuple[_T, float]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[_T]]) -> _T:
+        """
+        获取缓存值，未命中时调用 `loader` 加载
+
+        Args:
+            key: 缓存键
+            loader: 加载函数
+
+        Returns:
+            缓存值或新加载的值
+        """
+        if not self.enabled:
+            self.misses += 1
+            return await loader()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, loaded_at = entry
+            age = time.monotonic() - loaded_at
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale_ttl:
+                # 先返回旧值，在后台刷新
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    self._load(key, loader, background=True)
+                return value
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._load(key, loader)
+        # 调用方被取消时不取消共享的加载
+        return await asyncio.shield(task)
+
+    def _load(self, key: Hashable, loader: Callable[[], Awaitable[_T]], background: bool = False) -> asyncio.Task:
+        task = asyncio.ensure_future(self._run(key, loader, background))
+        task.add_done_callback(_consume_exception)
+        self._inflight[key] = task
+        return task
+
+    async def _run(self, key: Hashable, loader: Callable[[], Awaitable[_T]], background: bool) -> _T:
+        try:
+            value = await loader()
+        except Exception as e:
+            if background:
+                logger.warning(f"Failed to refresh {self.name} cache for {key}: {e}")
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        """删除缓存条目"""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """命中统计"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+
+def _new_cache(name: str) -> AsyncTTLCache:
+    return AsyncTTLCache(
+        name,
+        ttl=plugin_config.qq_chat_exporter_bot_cache_ttl,
+        stale_ttl=plugin_config.qq_chat_exporter_bot_cache_stale,
+        max_entries=plugin_config.qq_chat_exporter_bot_cache_size
+    )
+
+
+group_list_cache: AsyncTTLCache[list[dict[str, Any]]] = _new_cache("group_list")
+group_info_cache: AsyncTTLCache[dict[str, Any]] = _new_cache("group_info")
+group_member_cache: AsyncTTLCache[list[dict[str, Any]]] = _new_cache("group_member_list")
+
+BOT_CACHES = (group_list_cache, group_info_cache, group_member_cache)
+
+
+async def get_group_list(bot: Bot) -> list[dict[str, Any]]:
+    """获取群列表（带缓存）"""
+    return await group_list_cache.get(bot.self_id, lambda: bot.get_group_list())
+
+
+async def get_group_info(bot: Bot, group_id: str) -> dict[str, Any]:
+    """获取群信息（带缓存）"""
+    return await group_info_cache.get(
+        (bot.self_id, group_id), lambda: bot.get_group_info(group_id=int(group_id))
+    )
+
+
+async def get_group_member_list(bot: Bot, group_id: str) -> list[dict[str, Any]]:
+    """获取群成员列表（带缓存）"""
+    return await group_member_cache.get(
+        (bot.self_id, group_id), lambda: bot.get_group_member_list(group_id=int(group_id))
+    )
+
+
+def bot_cache_stats() -> dict[str, dict[str, int]]:
+    """各个机器人 API 缓存的命中统计"""
+    return {cache.name: cache.stats() for cache in BOT_CACHES}
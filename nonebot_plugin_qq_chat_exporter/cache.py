@@ -0,0 +1,131 @@
+"""
+导出结果缓存：相同聊天、时间范围和数据水位的导出直接复用已有文件
+"""
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from nonebot_plugin_chatrecorder.utils import remove_timezone
+
+from .config import plugin_config
+
+logger = logging.getLogger(__name__)
+
+
+class ExportCacheKey(NamedTuple):
+    """
+    导出缓存键
+
+    `watermark` 为时间范围内最大的消息记录 id，有新消息写入时随之变化，
+    旧的缓存项自然不再命中
+    """
+    chat_type: str
+    chat_id: str
+    start_time: Optional[datetime]
+    end_time: Optional[datetime]
+    output_dir: Optional[str]
+    compression: Optional[str]
+    watermark: Optional[int]
+
+
+def normalize_time(dt: Optional[datetime]) -> Optional[datetime]:
+    """统一转换为不带时区的 UTC 时间，与 chatrecorder 的筛选方式一致"""
+    if dt is None:
+        return None
+    return remove_timezone(dt)
+
+
+class _CacheEntry(NamedTuple):
+    file_path: str
+    created_at: float
+
+
+class ExportCache:
+    """
+    导出结果的 LRU 缓存
+
+    按条目数和存活时间淘汰，命中时检查文件是否仍然存在。
+    淘汰只是不再复用，不会删除导出文件。
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[ExportCacheKey, _CacheEntry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _expired(self, entry: _CacheEntry, now: float) -> bool:
+        return self.ttl > 0 and now - entry.created_at > self.ttl
+
+    def get(self, key: ExportCacheKey) -> Optional[str]:
+        """
+        查找缓存的导出文件
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            导出文件路径，未命中时返回 None
+        """
+        entry = self._entries.get(key)
+        if entry is not None and (
+            self._expired(entry, time.monotonic()) or not Path(entry.file_path).is_file()
+        ):
+            del self._entries[key]
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.file_path
+
+    def put(self, key: ExportCacheKey, file_path: str) -> None:
+        """
+        缓存导出文件
+
+        Args:
+            key: 缓存键
+            file_path: 导出文件路径
+        """
+        if not self.enabled:
+            return
+
+        # 同一导出的旧水位条目已不会再命中，直接移除
+        for stale in [k for k in self._entries if k[:-1] == key[:-1] and k != key]:
+            del self._entries[stale]
+
+        self._entries[key] = _CacheEntry(file_path, time.monotonic())
+        self._entries.move_to_end(key)
+        self.evict()
+
+    def evict(self) -> None:
+        """淘汰过期的条目和超出数量上限的最久未使用条目"""
+        now = time.monotonic()
+        for key in [k for k, entry in self._entries.items() if self._expired(entry, now)]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+
+
+export_cache = ExportCache(
+    plugin_config.qq_chat_exporter_cache_size,
+    plugin_config.qq_chat_exporter_cache_ttl
+)
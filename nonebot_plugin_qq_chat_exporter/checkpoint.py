@@ -0,0 +1,140 @@
+"""
+增量导出检查点：记录每个聊天上次导出到的位置和导出文件的状态
+"""
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field
+
+from .converter import new_resource_stats
+
+logger = logging.getLogger(__name__)
+
+# 检查点文件名，保存在导出目录中
+CHECKPOINT_FILENAME = "checkpoints.json"
+
+
+class Checkpoint(BaseModel):
+    """单个聊天的导出检查点"""
+    chat_type: str
+    chat_id: str
+    file_path: str
+    # 首次导出时的开始时间，开始时间不同的导出不能续接
+    start_time: Optional[datetime] = None
+    first_time: Optional[datetime] = None
+    # 最后一条已导出记录的 (time, id)
+    last_time: Optional[datetime] = None
+    last_id: Optional[int] = None
+    message_count: int = 0
+    # 导出文件中头部预留空间的长度和 messages 数组结束位置
+    header_size: int
+    messages_end: int
+    file_size: int
+    senders: dict[str, dict[str, Any]] = Field(default_factory=dict)
+    resources: dict[str, int] = Field(default_factory=new_resource_stats)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+    @property
+    def last_key(self) -> Optional[tuple[datetime, int]]:
+        """最后一条已导出记录的分页键"""
+        if self.last_time is None or self.last_id is None:
+            return None
+        return self.last_time, self.last_id
+
+    def can_resume(self, start_time: Optional[datetime]) -> bool:
+        """
+        导出文件是否可以续接
+
+        文件必须存在且在上次导出后没有被修改，开始时间也必须一致
+
+        Args:
+            start_time: 本次导出的开始时间
+        """
+        if start_time != self.start_time:
+            logger.info(f"Start time changed for {self.chat_type} {self.chat_id}, exporting from scratch")
+            return False
+
+        path = Path(self.file_path)
+        if not path.is_file() or path.stat().st_size != self.file_size:
+            logger.info(f"Export file {path} is missing or was modified, exporting from scratch")
+            return False
+        return True
+
+
+class CheckpointStore:
+    """
+    检查点存储，以 JSON 文件保存在导出目录中
+
+    每个聊天只保留最近一次增量导出的检查点
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    @staticmethod
+    def _key(chat_type: str, chat_id: str) -> str:
+        return f"{chat_type}_{chat_id}"
+
+    def _load(self) -> dict[str, Any]:
+        if not self.path.is_file():
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read checkpoints from {self.path}: {e}")
+            return {}
+
+    def _dump(self, data: dict[str, Any]) -> None:
+        # 先写入临时文件再替换，避免写到一半时损坏已有的检查点
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, chat_type: str, chat_id: str) -> Optional[Checkpoint]:
+        """
+        获取聊天的检查点
+
+        Args:
+            chat_type: 聊天类型 ("group" or "private")
+            chat_id: 群号或用户ID
+
+        Returns:
+            检查点，不存在或无法解析时返回 None
+        """
+        data = self._load().get(self._key(chat_type, chat_id))
+        if data is None:
+            return None
+        try:
+            return Checkpoint.model_validate(data)
+        except ValueError as e:
+            logger.warning(f"Ignoring invalid checkpoint for {chat_type} {chat_id}: {e}")
+            return None
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        """
+        保存检查点，覆盖同一聊天已有的检查点
+
+        Args:
+            checkpoint: 检查点
+        """
+        data = self._load()
+        data[self._key(checkpoint.chat_type, checkpoint.chat_id)] = checkpoint.model_dump(mode="json")
+        self._dump(data)
+
+    def remove(self, chat_type: str, chat_id: str) -> None:
+        """
+        删除聊天的检查点
+
+        Args:
+            chat_type: 聊天类型 ("group" or "private")
+            chat_id: 群号或用户ID
+        """
+        data = self._load()
+        if data.pop(self._key(chat_type, chat_id), None) is not None:
+            self._dump(data)
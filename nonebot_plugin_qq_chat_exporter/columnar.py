@@ -0,0 +1,360 @@
+"""
+列式导出：每条消息一行，写出为 Parquet（需要 pyarrow）或 CSV，便于 pandas / DuckDB 直接分析
+"""
+import csv
+import io
+import json
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Optional, TextIO
+
+from typing_extensions import Self
+
+from .compression import compressed_path, normalize_compression, open_output
+from .converter import MessageRow
+from .models import ChatInfo, Metadata, Statistics
+from .segments import RESOURCE_SEGMENT_TYPES, RESOURCE_TYPES
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - 取决于运行环境
+    pyarrow = None
+
+COLUMNAR_FORMATS = ("parquet", "csv")
+
+# Parquet 列的压缩编码，"none" 表示不压缩
+PARQUET_COMPRESSIONS = ("none", "snappy", "gzip", "brotli", "lz4", "zstd")
+
+# Parquet 默认的列压缩编码
+PARQUET_DEFAULT_COMPRESSION = "zstd"
+
+# 列名，顺序即输出顺序
+COLUMNS = (
+    "message_id",
+    "timestamp",
+    "sender_uid",
+    "sender_uin",
+    "sender_name",
+    "is_system_message",
+    "text",
+    "text_length",
+    "element_count",
+    "resource_count",
+    *(f"{resource_type}_count" for resource_type in RESOURCE_TYPES),
+    "segment_types",
+)
+
+# Parquet 每个行组至少包含的行数；行组越大压缩率和扫描速度越好，内存中最多缓存这么多行
+ROW_GROUP_SIZE = 64 * 1024
+
+# Parquet 文件元数据中保存 metadata、chatInfo、statistics 的键
+PARQUET_METADATA_KEY = "qq_chat_exporter"
+
+# CSV 中多个消息段类型之间的分隔符
+CSV_LIST_SEPARATOR = ";"
+
+
+def normalize_parquet_compression(compression: Optional[str]) -> Optional[str]:
+    """
+    校验 Parquet 列的压缩编码
+
+    编码由 pyarrow 实现，不需要 zstandard 等压缩库；
+    未安装 pyarrow 时 Parquet 导出退回到 CSV，按整个文件的压缩方式校验
+
+    Args:
+        compression: `PARQUET_COMPRESSIONS` 之一，为空时使用默认的 zstd
+
+    Returns:
+        压缩编码，为空表示使用默认编码；退回到 CSV 时为 `normalize_compression` 的结果
+    """
+    if pyarrow is None:
+        return normalize_compression(compression)
+    if not compression:
+        return None
+    if compression not in PARQUET_COMPRESSIONS:
+        raise ValueError(f"Invalid Parquet compression: {compression}, expected one of {PARQUET_COMPRESSIONS}")
+    if compression != "none" and not pyarrow.Codec.is_available(compression):
+        raise ValueError(f"Parquet compression {compression} is not supported by the installed pyarrow")
+    return compression
+
+
+def _parquet_schema() -> "pyarrow.Schema":
+    int_columns = ("text_length", "element_count", "resource_count") + tuple(
+        f"{resource_type}_count" for resource_type in RESOURCE_TYPES
+    )
+    types = {
+        "timestamp": pyarrow.timestamp("ms", tz="UTC"),
+        "is_system_message": pyarrow.bool_(),
+        "segment_types": pyarrow.list_(pyarrow.string()),
+        **{column: pyarrow.int32() for column in int_columns},
+    }
+    return pyarrow.schema([(column, types.get(column, pyarrow.string())) for column in COLUMNS])
+
+
+class ColumnarWriter(ABC):
+    """
+    列式导出写入器的基类
+
+    逐批接收转换后的消息和对应的消息行，拆分为各列。
+    消息段类型和各类资源数量从消息行的原始消息段中统计。
+    """
+
+    suffix = ""
+
+    def __init__(self, output_file: Path, chat_info: ChatInfo, metadata: Optional[Metadata] = None):
+        self.output_file = Path(output_file)
+        self.chat_info = chat_info
+        self.metadata = metadata or Metadata()
+        self.message_count = 0
+        self.file_size = 0
+        self._columns: dict[str, list[Any]] = {column: [] for column in COLUMNS}
+        self._finished = False
+
+    def __enter__(self) -> Self:
+        self._open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._close()
+        if exc_type is not None:
+            # 出错时不保留不完整的导出文件
+            self.output_file.unlink(missing_ok=True)
+
+    @property
+    def bytes_written(self) -> int:
+        """已落盘的字节数"""
+        if self._finished:
+            return self.file_size
+        try:
+            return self.output_file.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    @property
+    def _flush_threshold(self) -> int:
+        """缓存的行数达到该值时写出，默认每批写出一次"""
+        return 1
+
+    @abstractmethod
+    def _open(self) -> None:
+        """打开输出文件"""
+
+    @abstractmethod
+    def _close(self) -> None:
+        """关闭输出文件，重复调用时忽略"""
+
+    @abstractmethod
+    def _flush(self) -> None:
+        """写出缓存的各列并清空"""
+
+    def _write_metadata(self, statistics: Statistics) -> None:
+        """写出导出的元数据和统计信息，不支持的格式忽略"""
+
+    def _timestamp(self, row: MessageRow, message: dict[str, Any]) -> Any:
+        return message["timestamp"]
+
+    def _segment_types(self, segment_types: list[str]) -> Any:
+        return segment_types
+
+    def write_rows(self, rows: list[MessageRow], messages: list[dict[str, Any]]) -> None:
+        """
+        写入一批消息
+
+        Args:
+            rows: 消息行，与 messages 一一对应
+            messages: 转换后的导出消息字典
+        """
+        if self._finished:
+            raise RuntimeError(f"{type(self).__name__} is already finished")
+
+        columns = self._columns
+        for row, message in zip(rows, messages):
+            sender = message["sender"]
+            stats = message["stats"]
+            segments = row.message if isinstance(row.message, list) else []
+            segment_types = [segment.get("type", "text") for segment in segments]
+            resource_counts = dict.fromkeys(RESOURCE_TYPES, 0)
+            for segment_type in segment_types:
+                resource_type = RESOURCE_SEGMENT_TYPES.get(segment_type)
+                if resource_type is not None:
+                    resource_counts[resource_type] += 1
+
+            columns["message_id"].append(message["messageId"])
+            columns["timestamp"].append(self._timestamp(row, message))
+            columns["sender_uid"].append(sender["uid"])
+            columns["sender_uin"].append(sender["uin"])
+            columns["sender_name"].append(sender["name"])
+            columns["is_system_message"].append(message["isSystemMessage"])
+            columns["text"].append(message["content"]["text"])
+            columns["text_length"].append(stats["textLength"])
+            columns["element_count"].append(stats["elementCount"])
+            columns["resource_count"].append(stats["resourceCount"])
+            for resource_type, count in resource_counts.items():
+                columns[f"{resource_type}_count"].append(count)
+            columns["segment_types"].append(self._segment_types(segment_types))
+
+        self.message_count += len(messages)
+        if len(columns["message_id"]) >= self._flush_threshold:
+            self._flush()
+
+    def finish(self, statistics: Statistics) -> None:
+        """
+        写出剩余的消息并关闭文件
+
+        Args:
+            statistics: 全部消息的统计信息
+        """
+        if self._finished:
+            raise RuntimeError(f"{type(self).__name__} is already finished")
+
+        self._flush()
+        self._write_metadata(statistics)
+        self._close()
+        self._finished = True
+        self.file_size = self.output_file.stat().st_size
+        logger.debug(f"Wrote {self.message_count} rows to {self.output_file}")
+
+
+class ParquetExportWriter(ColumnarWriter):
+    """
+    Parquet 写入器
+
+    消息按批缓存，每满 `ROW_GROUP_SIZE` 行写出一个行组；
+    metadata、chatInfo 和 statistics 以 JSON 保存在文件元数据的 `qq_chat_exporter` 键中。
+    `compression` 为列的压缩编码（见 `PARQUET_COMPRESSIONS`），为空时使用 zstd。
+    """
+
+    suffix = ".parquet"
+
+    def __init__(
+        self,
+        output_file: Path,
+        chat_info: ChatInfo,
+        metadata: Optional[Metadata] = None,
+        compression: Optional[str] = None,
+        row_group_size: int = ROW_GROUP_SIZE
+    ):
+        if pyarrow is None:
+            raise ValueError("Parquet export requires the pyarrow package")
+        super().__init__(output_file, chat_info, metadata)
+        self.compression = compression or PARQUET_DEFAULT_COMPRESSION
+        self.row_group_size = row_group_size
+        self._schema = _parquet_schema()
+        self._writer: Optional["pyarrow.parquet.ParquetWriter"] = None
+
+    @property
+    def _flush_threshold(self) -> int:
+        return self.row_group_size
+
+    def _open(self) -> None:
+        self._writer = pyarrow.parquet.ParquetWriter(
+            str(self.output_file), self._schema, compression=self.compression
+        )
+
+    def _close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _timestamp(self, row: MessageRow, message: dict[str, Any]) -> Any:
+        # 数据库中是 UTC 时间，写入带时区的时间戳列
+        return row.time
+
+    def _flush(self) -> None:
+        if not self._columns["message_id"]:
+            return
+        table = pyarrow.table(self._columns, schema=self._schema)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        for values in self._columns.values():
+            values.clear()
+
+    def _write_metadata(self, statistics: Statistics) -> None:
+        self._writer.add_key_value_metadata({
+            PARQUET_METADATA_KEY: json.dumps({
+                "metadata": self.metadata.model_dump(mode="json"),
+                "chatInfo": self.chat_info.model_dump(mode="json"),
+                "statistics": statistics.model_dump(mode="json"),
+            }, ensure_ascii=False)
+        })
+
+
+class CSVExportWriter(ColumnarWriter):
+    """
+    CSV 写入器，未安装 pyarrow 时代替 Parquet
+
+    第一行为列名，每批消息直接写出；消息段类型以分号连接，时间为导出格式的 ISO 时间戳。
+    指定压缩方式时整个文件经 gzip / zstd 压缩。
+    """
+
+    suffix = ".csv"
+
+    def __init__(
+        self,
+        output_file: Path,
+        chat_info: ChatInfo,
+        metadata: Optional[Metadata] = None,
+        compression: Optional[str] = None
+    ):
+        super().__init__(output_file, chat_info, metadata)
+        self.compression = compression
+        self._file: Optional[TextIO] = None
+
+    def _open(self) -> None:
+        self._file = io.TextIOWrapper(
+            open_output(self.output_file, self.compression), encoding="utf-8", newline=""
+        )
+        self._csv = csv.writer(self._file)
+        self._csv.writerow(COLUMNS)
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _segment_types(self, segment_types: list[str]) -> Any:
+        return CSV_LIST_SEPARATOR.join(segment_types)
+
+    def _flush(self) -> None:
+        self._csv.writerows(zip(*(self._columns[column] for column in COLUMNS)))
+        for values in self._columns.values():
+            values.clear()
+
+
+def create_columnar_writer(
+    base_path: Path,
+    output_format: str,
+    chat_info: ChatInfo,
+    compression: Optional[str] = None
+) -> ColumnarWriter:
+    """
+    创建列式导出写入器
+
+    未安装 pyarrow 时 Parquet 导出退回到 CSV
+
+    Args:
+        base_path: 不含后缀的输出路径
+        output_format: "parquet" 或 "csv"
+        chat_info: 聊天信息
+        compression: 压缩方式，Parquet 为列的压缩编码（经 `normalize_parquet_compression` 校验），
+            CSV 为整个文件的压缩（经 `normalize_compression` 校验）
+
+    Returns:
+        写入器，`output_file` 为实际的输出文件路径
+    """
+    if output_format == "parquet":
+        if pyarrow is not None:
+            return ParquetExportWriter(
+                base_path.with_name(base_path.name + ParquetExportWriter.suffix),
+                chat_info,
+                compression=compression
+            )
+        logger.warning("pyarrow is not installed, falling back to CSV export")
+    elif output_format != "csv":
+        raise ValueError(f"Invalid columnar format: {output_format}, expected one of {COLUMNAR_FORMATS}")
+
+    output_file = compressed_path(base_path.with_name(base_path.name + CSVExportWriter.suffix), compression)
+    return CSVExportWriter(output_file, chat_info, compression=compression)
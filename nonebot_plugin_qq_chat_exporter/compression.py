@@ -0,0 +1,141 @@
+"""
+导出文件压缩：写出时以流的方式经 gzip 或 zstd 压缩
+"""
+import gzip
+import logging
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 取决于运行环境
+    zstandard = None
+
+COMPRESSIONS = ("none", "gzip", "zstd")
+
+# 压缩方式 -> 文件后缀
+FILE_SUFFIXES = {
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+# 压缩方式 -> 下载时的媒体类型
+MEDIA_TYPES = {
+    "gzip": "application/gzip",
+    "zstd": "application/zstd",
+}
+
+# 默认压缩级别，兼顾速度和压缩率
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def normalize_compression(compression: Optional[str]) -> Optional[str]:
+    """
+    校验压缩方式
+
+    Args:
+        compression: "none"、"gzip" 或 "zstd"，为空表示不压缩
+
+    Returns:
+        压缩方式，不压缩时返回 None
+    """
+    if not compression or compression == "none":
+        return None
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Invalid compression: {compression}, expected one of {COMPRESSIONS}")
+    if compression == "zstd" and zstandard is None:
+        raise ValueError("zstd compression requires the zstandard package")
+    return compression
+
+
+def compressed_path(path: Path, compression: Optional[str]) -> Path:
+    """在文件名后追加压缩方式对应的后缀"""
+    if compression is None:
+        return path
+    return path.with_name(path.name + FILE_SUFFIXES[compression])
+
+
+def detect_compression(path: Path) -> Optional[str]:
+    """根据文件后缀判断压缩方式"""
+    for compression, suffix in FILE_SUFFIXES.items():
+        if path.name.endswith(suffix):
+            return compression
+    return None
+
+
+def open_output(path: Path, compression: Optional[str]) -> BinaryIO:
+    """
+    以写入方式打开输出文件，写入的数据经压缩后落盘
+
+    Args:
+        path: 输出文件路径
+        compression: 压缩方式，为空表示不压缩
+
+    Returns:
+        可写的二进制文件对象，关闭时写出压缩流的结尾
+    """
+    if compression is None:
+        return open(path, "wb")
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=GZIP_LEVEL)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        return compressor.stream_writer(open(path, "wb"), closefd=True)
+    raise ValueError(f"Invalid compression: {compression}, expected one of {COMPRESSIONS}")
+
+
+def open_input(path: Path, compression: Optional[str]) -> BinaryIO:
+    """
+    以读取方式打开导出文件，读出的是解压后的数据
+
+    Args:
+        path: 文件路径
+        compression: 压缩方式，为空表示不压缩
+
+    Returns:
+        可读的二进制文件对象，只支持顺序读取
+    """
+    if compression is None:
+        return open(path, "rb")
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    raise ValueError(f"Invalid compression: {compression}, expected one of {COMPRESSIONS}")
+
+
+class StreamCompressor:
+    """
+    在内存中逐块压缩，用于不落盘的流式导出
+
+    每次 `compress` 后都刷新压缩器，已输出的数据可以立即解压，客户端不必等到压缩缓冲区写满
+    """
+
+    def __init__(self, compression: str):
+        if compression == "gzip":
+            # wbits 加 16 输出带 gzip 头部和校验的格式
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._flush_mode = zlib.Z_SYNC_FLUSH
+        elif compression == "zstd":
+            if zstandard is None:
+                raise ValueError("zstd compression requires the zstandard package")
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            self._flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            raise ValueError(f"Invalid compression: {compression}, expected one of {COMPRESSIONS}")
+
+    def compress(self, data: bytes) -> bytes:
+        """压缩一块数据，返回可以立即发送的压缩数据"""
+        return self._compressor.compress(data) + self._compressor.flush(self._flush_mode)
+
+    def finish(self) -> bytes:
+        """结束压缩流，返回剩余的压缩数据"""
+        return self._compressor.flush()
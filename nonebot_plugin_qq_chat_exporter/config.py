@@ -0,0 +1,59 @@
+"""
+插件配置
+"""
+from nonebot import get_plugin_config
+from pydantic import BaseModel
+
+
+class Config(BaseModel):
+    """QQ 聊天记录导出插件配置"""
+
+    qq_chat_exporter_json_backend: str = "auto"
+    """ JSON 序列化后端\n\n`auto` 优先使用已安装的 orjson，`orjson` 强制使用 orjson，`json` 使用标准库 """
+
+    qq_chat_exporter_convert_workers: int = 0
+    """ 转换消息使用的进程数\n\n大于 1 时使用进程池并行转换，否则在事件循环中转换 """
+
+    qq_chat_exporter_record_processing_time: bool = False
+    """ 是否在每条消息的 `stats.processingTime` 中记录转换耗时（微秒）
+
+默认关闭，此时为 0，同样的消息每次导出的结果逐字节相同 """
+
+    qq_chat_exporter_fetch_parallelism: int = 1
+    """ 拉取消息时同时查询的时间窗口数\n\n大于 1 时将时间范围切分为多个窗口，在各自的数据库连接上并发拉取，适合在 PostgreSQL / MySQL 上导出很长的时间范围 """
+
+    qq_chat_exporter_fetch_partitions: int = 0
+    """ 并发拉取时切分的时间窗口数\n\n为 0 时使用并发数的 4 倍，窗口数不超过总批次数 """
+
+    qq_chat_exporter_max_workers: int = 2
+    """ WebUI 同时执行的导出任务数\n\n超出的任务按优先级排队 """
+
+    qq_chat_exporter_task_timeout: int = 0
+    """ WebUI 导出任务的最长执行时间（秒）\n\n超时的任务被取消并标记为失败，为 0 时不限制 """
+
+    qq_chat_exporter_batch_concurrency: int = 4
+    """ 批量导出时同时导出的聊天数 """
+
+    qq_chat_exporter_cache_size: int = 32
+    """ WebUI 导出结果缓存的最大条目数\n\n为 0 时不缓存 """
+
+    qq_chat_exporter_cache_ttl: int = 3600
+    """ WebUI 导出结果缓存的存活时间（秒）\n\n为 0 时不按时间淘汰 """
+
+    qq_chat_exporter_bot_cache_ttl: int = 300
+    """ 群列表、群信息和群成员列表的缓存有效期（秒）\n\n为 0 时不缓存 """
+
+    qq_chat_exporter_bot_cache_stale: int = 3600
+    """ 缓存过期后仍可使用旧值的时间（秒）\n\n期间返回旧值并在后台刷新，超过后等待重新获取 """
+
+    qq_chat_exporter_bot_cache_size: int = 256
+    """ 每种机器人 API 缓存的最大条目数 """
+
+    qq_chat_exporter_task_cache_size: int = 128
+    """ 内存中缓存的导出任务数 """
+
+    qq_chat_exporter_task_ttl: int = 7 * 24 * 3600
+    """ 已结束的导出任务在数据库中保留的时间（秒）\n\n为 0 时永久保留 """
+
+
+plugin_config = get_plugin_config(Config)
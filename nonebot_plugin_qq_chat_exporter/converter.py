@@ -3,18 +3,20 @@
 """
 import logging
 import time
+from collections.abc import Sequence
 from datetime import datetime
-from typing import Any
+from typing import Any, NamedTuple, Optional
 
 from nonebot_plugin_chatrecorder import MessageRecord
 from nonebot_plugin_uninfo.orm import SessionModel, UserModel
 
-from .models import (
-    ExportMessage,
-    MessageContent,
-    MessageReceiver,
-    MessageSender,
-    MessageStats,
+from .config import plugin_config
+from .models import ExportMessage, MessageContent
+from .segments import (
+    RESOURCE_SEGMENT_TYPES,
+    RESOURCE_TYPES,
+    SEGMENT_HANDLERS,
+    render_unknown_segment,
 )
 
 logger = logging.getLogger(__name__)
@@ -23,233 +25,518 @@ logger = logging.getLogger(__name__)
 UNKNOWN_USER_ID = "unknown"
 
 
-def parse_message_content(message_data: list[dict[str, Any]]) -> tuple[MessageContent, str, dict]:
+def new_resource_stats() -> dict[str, int]:
+    """创建空的资源统计字典"""
+    return dict.fromkeys(RESOURCE_TYPES, 0)
+
+
+def format_timestamp(dt: datetime) -> str:
+    """将 chatrecorder 存储的 UTC 时间转换为导出格式的 ISO 时间戳"""
+    return dt.isoformat(timespec="milliseconds") + "Z"
+
+
+def count_resources(message_data: list[dict[str, Any]], resource_totals: dict[str, int]) -> None:
     """
-    解析消息内容
+    只统计消息中的资源数量，不做完整解析
 
     Args:
         message_data: OneBot 消息段列表
+        resource_totals: 资源统计累加器，原地更新
+    """
+    for segment in message_data:
+        resource_type = RESOURCE_SEGMENT_TYPES.get(segment.get("type", "text"))
+        if resource_type is not None:
+            resource_totals[resource_type] += 1
+
+
+class MessageRow(NamedTuple):
+    """
+    转换所需的消息记录字段
+
+    按列查询得到的轻量行，替代完整的 MessageRecord / SessionModel / UserModel 实体
+    """
+    id: Optional[int]
+    time: Optional[datetime]
+    message_id: Optional[str]
+    type: str
+    message: Optional[list[dict[str, Any]]]
+    session_persist_id: Optional[int]
+    user_id: str
+    user_name: Optional[str]
+
+
+def get_user_name(user: Any) -> Optional[str]:
+    """获取用户在数据库中记录的名字"""
+    user_name = getattr(user, "user_name", None)
+    if user_name:
+        return user_name
+    user_data = getattr(user, "user_data", None)
+    if isinstance(user_data, dict):
+        return user_data.get("name")
+    return None
+
+
+def message_row_from_models(
+    record: MessageRecord,
+    session: SessionModel,
+    user: UserModel
+) -> MessageRow:
+    """
+    将 ORM 实体转换为消息行
+
+    对缺失的属性做防御性处理，缺失消息内容的记录会在转换时被跳过
+    """
+    return MessageRow(
+        id=getattr(record, "id", None),
+        time=getattr(record, "time", None),
+        message_id=getattr(record, "message_id", None),
+        type=getattr(record, "type", "message"),
+        message=getattr(record, "message", None),
+        session_persist_id=getattr(record, "session_persist_id", None),
+        user_id=getattr(user, "user_id", UNKNOWN_USER_ID),
+        user_name=get_user_name(user)
+    )
+
+
+def _parse_segments(
+    message_data: list[dict[str, Any]],
+    resource_totals: dict[str, int]
+) -> tuple[dict[str, Any], str, int]:
+    """
+    按注册表分派解析消息段，资源数量直接累加到 resource_totals
 
     Returns:
-        (消息内容, 纯文本, 资源统计字典)
+        (消息内容字典, 纯文本, 资源数量)
     """
     text_parts = []
     resources = []
-    resource_stats = {"image": 0, "video": 0, "audio": 0, "file": 0}
-    element_count = 0
+    handlers = SEGMENT_HANDLERS
 
     for segment in message_data:
         seg_type = segment.get("type", "text")
         seg_data = segment.get("data", {})
-        element_count += 1
-
-        # 构建文本
-        if seg_type == "text":
-            text_parts.append(seg_data.get("text", ""))
-        elif seg_type == "face":
-            text_parts.append(f"[表情{seg_data.get('id', '')}]")
-        elif seg_type == "image":
-            text_parts.append("[图片]")
-            resource_stats["image"] += 1
-            resources.append({"type": "image", "data": seg_data})
-        elif seg_type == "video":
-            text_parts.append("[视频]")
-            resource_stats["video"] += 1
-            resources.append({"type": "video", "data": seg_data})
-        elif seg_type == "audio" or seg_type == "record":
-            text_parts.append("[语音]")
-            resource_stats["audio"] += 1
-            resources.append({"type": "audio", "data": seg_data})
-        elif seg_type == "file":
-            text_parts.append(f"[文件: {seg_data.get('file', '')}]")
-            resource_stats["file"] += 1
-            resources.append({"type": "file", "data": seg_data})
-        elif seg_type == "at":
-            qq = seg_data.get("qq", "")
-            if qq == "all":
-                text_parts.append("@全体成员")
-            else:
-                text_parts.append(f"@{qq}")
-        elif seg_type == "reply":
-            text_parts.append("[回复]")
-        elif seg_type == "forward":
-            text_parts.append("[转发消息]")
-        else:
-            text_parts.append(f"[{seg_type}]")
+
+        spec = handlers.get(seg_type)
+        if spec is None:
+            text_parts.append(render_unknown_segment(seg_type))
+            continue
+
+        handler, resource_type = spec
+        text_parts.append(handler(seg_data))
+        if resource_type is not None:
+            resources.append({"type": resource_type, "data": seg_data})
+
+    # 全部消息段解析成功后再计入资源统计，解析失败的消息不影响统计
+    for resource in resources:
+        resource_totals[resource["type"]] += 1
 
     text = "".join(text_parts)
-    content = MessageContent(
-        text=text,
-        raw=text,
-        resources=resources
-    )
+    content = {
+        "text": text,
+        "html": "",
+        "raw": text,
+        "mentions": [],
+        "resources": resources,
+        "emojis": [],
+        "special": [],
+    }
+
+    return content, text, len(resources)
+
+
+def parse_message_segments(message_data: list[dict[str, Any]]) -> tuple[dict[str, Any], str, dict]:
+    """
+    解析消息内容为普通字典
+
+    返回的消息内容与 `MessageContent.model_dump(mode="json")` 结构和键顺序一致
 
+    Args:
+        message_data: OneBot 消息段列表
+
+    Returns:
+        (消息内容字典, 纯文本, 资源统计字典)
+    """
+    resource_stats = new_resource_stats()
+    content, text, _ = _parse_segments(message_data, resource_stats)
     return content, text, resource_stats
 
 
+def parse_message_content(message_data: list[dict[str, Any]]) -> tuple[MessageContent, str, dict]:
+    """
+    解析消息内容
+
+    Args:
+        message_data: OneBot 消息段列表
+
+    Returns:
+        (消息内容, 纯文本, 资源统计字典)
+    """
+    content, text, resource_stats = parse_message_segments(message_data)
+    return MessageContent(**content), text, resource_stats
+
+
+class MessageConverter:
+    """
+    一次导出使用的消息转换器（快速路径）
+
+    在多个批次之间复用：同一发送者只构建一次 sender 字典，
+    整个导出共享一个 receiver 字典，发送者和资源统计原地累加。
+    因此返回的消息中 sender / receiver 是共享对象，不应原地修改。
+
+    用法:
+        converter = MessageConverter("group", group_id, nickname_map)
+        for rows in batches:
+            writer.write_messages(converter.convert(rows))
+        statistics = converter.statistics()
+    """
+
+    def __init__(
+        self,
+        chat_type: str,
+        chat_id: str,
+        nickname_map: Optional[dict[str, str]] = None,
+        sender_stats: Optional[dict[str, dict[str, Any]]] = None,
+        resource_totals: Optional[dict[str, int]] = None,
+        record_processing_time: Optional[bool] = None
+    ):
+        self.chat_type = chat_type
+        self.chat_id = chat_id
+        if record_processing_time is None:
+            record_processing_time = plugin_config.qq_chat_exporter_record_processing_time
+        # 是否记录每条消息的转换耗时，关闭时 processingTime 为 0，相同的消息总是得到相同的导出
+        self.record_processing_time = record_processing_time
+        self.nickname_map = nickname_map or {}
+        self.sender_stats = {} if sender_stats is None else sender_stats
+        self.resource_totals = new_resource_stats() if resource_totals is None else resource_totals
+        self.receiver = {
+            "uid": str(chat_id),
+            "type": chat_type,
+        }
+        # (user_id, user_name) -> (sender 字典, 发送者统计条目)
+        self._senders: dict[tuple[str, Optional[str]], tuple[dict[str, str], dict[str, Any]]] = {}
+
+    def _get_sender(self, user_id: str, user_name: Optional[str]) -> tuple[dict[str, str], dict[str, Any]]:
+        """获取缓存的发送者信息和对应的统计条目"""
+        key = (user_id, user_name)
+        cached = self._senders.get(key)
+        if cached is not None:
+            return cached
+
+        sender_uid = f"u_{user_id}"
+
+        # 优先使用传入的昵称映射，其次使用数据库中的名字
+        sender_name = self.nickname_map.get(str(user_id)) or user_name or ""
+
+        # uin 应该是用户的数字ID，如果获取失败则使用空字符串
+        user_uin = str(user_id) if user_id != UNKNOWN_USER_ID else ""
+        sender = {
+            "uid": sender_uid,
+            "uin": user_uin,
+            "name": sender_name,
+        }
+
+        stats_entry = self.sender_stats.get(sender_uid)
+        if stats_entry is None:
+            stats_entry = self.sender_stats[sender_uid] = {
+                "uid": sender_uid,
+                "name": sender_name,
+                "messageCount": 0
+            }
+
+        cached = self._senders[key] = (sender, stats_entry)
+        return cached
+
+    def convert(
+        self,
+        rows: Sequence[MessageRow],
+        converted_rows: Optional[list[MessageRow]] = None
+    ) -> list[dict[str, Any]]:
+        """
+        转换一批消息行
+
+        每条消息的结构和键顺序与 `ExportMessage.model_dump(mode="json")` 一致
+
+        Args:
+            rows: 消息行列表
+            converted_rows: 传入时按顺序追加每条成功转换的消息对应的行，
+                跳过的行不会追加，因此与返回的消息一一对应
+
+        Returns:
+            导出消息字典列表
+        """
+        export_messages = []
+        failed_count = 0
+        receiver = self.receiver
+        resource_totals = self.resource_totals
+        record_processing_time = self.record_processing_time
+
+        for row in rows:
+            started = time.perf_counter_ns() if record_processing_time else 0
+            try:
+                # 验证消息内容存在
+                if row.message is None:
+                    logger.warning(
+                        "Message record %s missing 'message' attribute, skipping",
+                        row.message_id or UNKNOWN_USER_ID
+                    )
+                    failed_count += 1
+                    continue
+
+                # 解析消息内容
+                message_data = row.message if isinstance(row.message, list) else []
+
+                # 如果 message_data 为空或无效，记录并跳过
+                if not message_data:
+                    logger.debug(
+                        "Message %s has empty message_data, creating minimal export",
+                        row.message_id or UNKNOWN_USER_ID
+                    )
+
+                content, text, resource_count = _parse_segments(message_data, resource_totals)
+
+                # 构建发送者信息并更新发送者统计
+                sender, stats_entry = self._get_sender(row.user_id, row.user_name)
+                stats_entry["messageCount"] += 1
+
+                # 转换时间戳为ISO格式
+                if row.time:
+                    timestamp = format_timestamp(row.time)
+                else:
+                    logger.warning(
+                        "Message %s missing time attribute, using current time",
+                        row.message_id or UNKNOWN_USER_ID
+                    )
+                    timestamp = format_timestamp(datetime.now())
+
+                # 构建消息统计
+                stats = {
+                    "elementCount": len(message_data),
+                    "resourceCount": resource_count,
+                    "textLength": len(text),
+                    # 解析这条消息的耗时（微秒）
+                    "processingTime": (time.perf_counter_ns() - started) // 1000 if record_processing_time else 0,
+                }
+
+                # 判断是否为系统消息
+                # 根据消息类型判断，一般 row.type 为 "message" 是普通消息
+                is_system_message = row.type != "message"
+
+                # 获取消息ID，如果不存在则生成一个基于纳秒时间戳的唯一ID
+                message_id = row.message_id
+                if not message_id:
+                    # 使用纳秒时间戳作为唯一ID，避免高并发场景下的冲突
+                    message_id = f"msg_{time.time_ns()}"
+                    logger.debug(f"Generated fallback message_id: {message_id}")
+
+                # 构建导出消息
+                export_messages.append({
+                    "messageId": str(message_id),
+                    "messageSeq": "",
+                    "msgRandom": "0",
+                    "timestamp": timestamp,
+                    "sender": sender,
+                    "receiver": receiver,
+                    "messageType": 5,
+                    "isSystemMessage": is_system_message,
+                    "isRecalled": False,
+                    "isTempMessage": False,
+                    "content": content,
+                    "stats": stats,
+                    "rawMessage": None,  # 可选字段，默认为None
+                })
+                if converted_rows is not None:
+                    converted_rows.append(row)
+            except (KeyError, AttributeError, ValueError) as e:
+                # 记录转换失败的消息，包含详细错误信息
+                failed_count += 1
+                logger.warning(
+                    "Failed to convert message %s: %s - %s",
+                    row.message_id or UNKNOWN_USER_ID,
+                    type(e).__name__,
+                    str(e)
+                )
+                continue
+            except Exception as e:
+                # 捕获其他未预期的异常
+                failed_count += 1
+                logger.error(
+                    "Unexpected error converting message %s: %s - %s",
+                    row.message_id or UNKNOWN_USER_ID,
+                    type(e).__name__,
+                    str(e),
+                    exc_info=True
+                )
+                continue
+
+        # 记录处理结果
+        if failed_count > 0:
+            logger.info(
+                "Conversion completed: %d succeeded, %d failed out of %d total",
+                len(export_messages),
+                failed_count,
+                len(rows)
+            )
+
+        return export_messages
+
+    def statistics(self) -> dict[str, Any]:
+        """生成截至目前的累计统计信息"""
+        return build_statistics(self.sender_stats, self.resource_totals)
+
+
+def convert_rows_to_export_dicts(
+    rows: Sequence[MessageRow],
+    chat_type: str,
+    chat_id: str,
+    nickname_map: dict[str, str] = None,
+    sender_stats: Optional[dict[str, dict[str, Any]]] = None,
+    resource_totals: Optional[dict[str, int]] = None
+) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """
+    批量转换消息行为普通字典（快速路径）
+
+    不构建 pydantic 模型，也不做校验，每条消息的结构和键顺序与
+    `ExportMessage.model_dump(mode="json")` 一致，可直接序列化。
+
+    分批转换时，可传入同一组 `sender_stats` 和 `resource_totals`，
+    统计信息会在其中原地累加，返回的统计为累计结果。
+    需要跨批次复用发送者缓存时，直接使用 `MessageConverter`。
+
+    Args:
+        rows: 消息行列表
+        chat_type: 聊天类型 ("group" or "private")
+        chat_id: 聊天ID
+        nickname_map: 用户昵称映射 {user_id: nickname}
+        sender_stats: 发送者统计累加器
+        resource_totals: 资源统计累加器
+
+    Returns:
+        (导出消息字典列表, 统计信息字典)
+    """
+    converter = MessageConverter(
+        chat_type,
+        chat_id,
+        nickname_map,
+        sender_stats=sender_stats,
+        resource_totals=resource_totals
+    )
+    return converter.convert(rows), converter.statistics()
+
+
+def convert_rows_to_export_messages(
+    rows: Sequence[MessageRow],
+    chat_type: str,
+    chat_id: str,
+    nickname_map: dict[str, str] = None,
+    sender_stats: Optional[dict[str, dict[str, Any]]] = None,
+    resource_totals: Optional[dict[str, int]] = None
+) -> tuple[list[ExportMessage], dict[str, Any]]:
+    """
+    批量转换消息行
+
+    在快速路径的结果上按 `ExportMessage` 模型校验，参数与统计累加方式同
+    `convert_rows_to_export_dicts`。
+
+    Args:
+        rows: 消息行列表
+        chat_type: 聊天类型 ("group" or "private")
+        chat_id: 聊天ID
+        nickname_map: 用户昵称映射 {user_id: nickname}
+        sender_stats: 发送者统计累加器
+        resource_totals: 资源统计累加器
+
+    Returns:
+        (导出消息列表, 统计信息字典)
+    """
+    export_dicts, statistics = convert_rows_to_export_dicts(
+        rows,
+        chat_type,
+        chat_id,
+        nickname_map,
+        sender_stats=sender_stats,
+        resource_totals=resource_totals
+    )
+    return [ExportMessage.model_validate(d) for d in export_dicts], statistics
+
+
 def convert_records_to_export_messages(
     records: list[tuple[MessageRecord, SessionModel, UserModel]],
     chat_type: str,
     chat_id: str,
-    nickname_map: dict[str, str] = None
+    nickname_map: dict[str, str] = None,
+    sender_stats: Optional[dict[str, dict[str, Any]]] = None,
+    resource_totals: Optional[dict[str, int]] = None
 ) -> tuple[list[ExportMessage], dict[str, Any]]:
     """
     批量转换消息记录
 
+    分批转换时，可传入同一组 `sender_stats` 和 `resource_totals`，
+    统计信息会在其中原地累加，返回的统计为累计结果。
+
     Args:
         records: (消息记录, 会话模型, 用户模型) 元组列表
         chat_type: 聊天类型 ("group" or "private")
         chat_id: 聊天ID
         nickname_map: 用户昵称映射 {user_id: nickname}
+        sender_stats: 发送者统计累加器
+        resource_totals: 资源统计累加器
 
     Returns:
         (导出消息列表, 统计信息字典)
     """
-    export_messages = []
-    sender_stats = {}
-    resource_totals = {"image": 0, "video": 0, "audio": 0, "file": 0}
-    failed_count = 0
-    nickname_map = nickname_map or {}
-
-    for record, session, user in records:
-        try:
-            # 验证 record 对象的必要属性
-            if not hasattr(record, 'message'):
-                logger.warning(
-                    "Message record %s missing 'message' attribute, skipping",
-                    getattr(record, "message_id", UNKNOWN_USER_ID)
-                )
-                failed_count += 1
-                continue
+    return convert_rows_to_export_messages(
+        [message_row_from_models(record, session, user) for record, session, user in records],
+        chat_type,
+        chat_id,
+        nickname_map,
+        sender_stats=sender_stats,
+        resource_totals=resource_totals
+    )
 
-            # 解析消息内容
-            message_data = record.message if isinstance(record.message, list) else []
-            
-            # 如果 message_data 为空或无效，记录并跳过
-            if not message_data:
-                logger.debug(
-                    "Message %s has empty message_data, creating minimal export",
-                    getattr(record, "message_id", UNKNOWN_USER_ID)
-                )
-            
-            content, text, resource_stats = parse_message_content(message_data)
-
-            # 更新资源统计
-            for key in resource_totals:
-                resource_totals[key] += resource_stats[key]
-
-            # 构建发送者信息
-            # 增加对用户属性的防御性检查
-            user_id = getattr(user, 'user_id', UNKNOWN_USER_ID)
-            sender_uid = f"u_{user_id}"
-            
-            # 优先使用传入的昵称映射，其次使用数据库中的名字
-            sender_name = nickname_map.get(str(user_id)) or getattr(user, 'user_name', None) or ""
-            
-            # uin 应该是用户的数字ID，如果获取失败则使用空字符串
-            user_uin = str(user_id) if user_id != UNKNOWN_USER_ID else ""
-            sender = MessageSender(
-                uid=sender_uid,
-                uin=user_uin,
-                name=sender_name
-            )
 
-            # 更新发送者统计
-            if sender_uid not in sender_stats:
-                sender_stats[sender_uid] = {
-                    "uid": sender_uid,
-                    "name": sender_name,
-                    "messageCount": 0
-                }
-            sender_stats[sender_uid]["messageCount"] += 1
+def merge_statistics(
+    sender_stats: dict[str, dict[str, Any]],
+    resource_totals: dict[str, int],
+    other_senders: dict[str, dict[str, Any]],
+    other_resources: dict[str, int]
+) -> None:
+    """
+    将另一段消息的统计合并到累加器中
 
-            # 构建接收者信息
-            receiver = MessageReceiver(
-                uid=str(chat_id),
-                type=chat_type
-            )
+    按消息顺序依次合并时，发送者顺序和名字与顺序转换的结果一致
 
-            # 转换时间戳为ISO格式
-            # 增加对时间属性的防御性检查
-            if hasattr(record, 'time') and record.time:
-                timestamp = record.time.isoformat(timespec="milliseconds") + "Z"
-            else:
-                logger.warning(
-                    "Message %s missing time attribute, using current time",
-                    getattr(record, "message_id", UNKNOWN_USER_ID)
-                )
-                timestamp = datetime.now().isoformat(timespec="milliseconds") + "Z"
-
-            # 构建消息统计
-            stats = MessageStats(
-                elementCount=len(message_data),
-                resourceCount=sum(resource_stats.values()),
-                textLength=len(text),
-                processingTime=0
-            )
+    Args:
+        sender_stats: 发送者统计累加器，原地更新
+        resource_totals: 资源统计累加器，原地更新
+        other_senders: 后一段消息的发送者统计
+        other_resources: 后一段消息的资源统计
+    """
+    for uid, stats_data in other_senders.items():
+        if uid in sender_stats:
+            sender_stats[uid]["messageCount"] += stats_data["messageCount"]
+        else:
+            sender_stats[uid] = dict(stats_data)
 
-            # 判断是否为系统消息
-            # 根据消息类型判断，一般 record.type 为 "message" 是普通消息
-            is_system_message = getattr(record, 'type', 'message') != "message"
-
-            # 获取消息ID，如果不存在则生成一个基于纳秒时间戳的唯一ID
-            message_id = getattr(record, 'message_id', None)
-            if not message_id:
-                # 使用纳秒时间戳作为唯一ID，避免高并发场景下的冲突
-                message_id = f"msg_{time.time_ns()}"
-                logger.debug(f"Generated fallback message_id: {message_id}")
-
-            # 构建导出消息
-            export_msg = ExportMessage(
-                messageId=str(message_id),
-                messageSeq="",
-                msgRandom="0",
-                timestamp=timestamp,
-                sender=sender,
-                receiver=receiver,
-                messageType=5,
-                isSystemMessage=is_system_message,
-                isRecalled=False,
-                isTempMessage=False,
-                content=content,
-                stats=stats,
-                rawMessage=None  # 可选字段，默认为None
-            )
+    for key, count in other_resources.items():
+        resource_totals[key] += count
 
-            export_messages.append(export_msg)
-        except (KeyError, AttributeError, ValueError) as e:
-            # 记录转换失败的消息，包含详细错误信息
-            failed_count += 1
-            logger.warning(
-                "Failed to convert message %s: %s - %s",
-                getattr(record, "message_id", UNKNOWN_USER_ID),
-                type(e).__name__,
-                str(e)
-            )
-            continue
-        except Exception as e:
-            # 捕获其他未预期的异常
-            failed_count += 1
-            logger.error(
-                "Unexpected error converting message %s: %s - %s",
-                getattr(record, "message_id", UNKNOWN_USER_ID),
-                type(e).__name__,
-                str(e),
-                exc_info=True
-            )
-            continue
 
-    # 记录处理结果
-    if failed_count > 0:
-        logger.info(
-            "Conversion completed: %d succeeded, %d failed out of %d total",
-            len(export_messages),
-            failed_count,
-            len(records)
-        )
-
-    # 计算发送者统计百分比
-    total_messages = len(export_messages)
+def build_statistics(
+    sender_stats: dict[str, dict[str, Any]],
+    resource_totals: dict[str, int]
+) -> dict[str, Any]:
+    """
+    根据累加的发送者和资源统计生成统计信息
+
+    Args:
+        sender_stats: 发送者统计 {uid: {uid, name, messageCount}}
+        resource_totals: 资源统计
+
+    Returns:
+        统计信息字典 {"senders": [...], "resources": {...}}
+    """
+    # 每条成功转换的消息都计入且仅计入一个发送者
+    total_messages = sum(s["messageCount"] for s in sender_stats.values())
     sender_list = []
     for uid, stats_data in sender_stats.items():
         percentage = (stats_data["messageCount"] / total_messages * 100) if total_messages > 0 else 0
@@ -260,9 +547,7 @@ def convert_records_to_export_messages(
             "percentage": round(percentage, 2)
         })
 
-    statistics = {
+    return {
         "senders": sender_list,
         "resources": resource_totals
     }
-
-    return export_messages, statistics
@@ -0,0 +1,183 @@
+"""
+文件下载：支持断点续传（Range）和基于 ETag 的条件请求
+"""
+import logging
+import os
+from collections.abc import Iterator, Mapping
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+
+from fastapi.responses import Response, StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+# 每次读取并发送的字节数
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class RangeNotSatisfiable(ValueError):
+    """请求的范围超出文件大小"""
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """
+    根据文件大小和修改时间生成强 ETag
+
+    导出文件写出后不再修改，增量导出追加消息时大小和修改时间都会变化，
+    因此不需要读取文件内容计算哈希
+
+    Args:
+        stat_result: 文件的 `os.stat` 结果
+
+    Returns:
+        带引号的 ETag
+    """
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    判断 `If-None-Match` 是否与当前 ETag 匹配，按弱比较忽略 `W/` 前缀
+
+    Args:
+        if_none_match: 请求头的值，可以是 `*` 或逗号分隔的多个 ETag
+        etag: 当前文件的 ETag
+    """
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def parse_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    解析单个字节范围
+
+    支持 `bytes=start-end`、`bytes=start-` 和 `bytes=-suffix`。
+    格式错误或包含多个范围时返回 None，按完整文件响应。
+
+    Args:
+        header: `Range` 请求头的值
+        size: 文件大小
+
+    Returns:
+        (起始位置, 结束位置)，均包含在内
+
+    Raises:
+        RangeNotSatisfiable: 范围超出文件大小
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start_text, sep, end_text = spec.strip().partition("-")
+    if not sep:
+        return None
+    if not start_text:
+        # 最后 suffix 个字节
+        if not end_text.isdigit():
+            return None
+        suffix = int(end_text)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable(header)
+        return max(size - suffix, 0), size - 1
+
+    if not start_text.isdigit() or (end_text and not end_text.isdigit()):
+        return None
+    start = int(start_text)
+    end = int(end_text) if end_text else size - 1
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _content_disposition(filename: str) -> str:
+    """生成 Content-Disposition，文件名含非 ASCII 字符时使用 RFC 5987 编码"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def _iter_file(path: Path, start: int, length: int) -> Iterator[bytes]:
+    """从 start 开始读取 length 字节，StreamingResponse 在线程池中迭代"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(DOWNLOAD_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_download_response(path: Path, request_headers: Mapping[str, str], media_type: str) -> Response:
+    """
+    生成文件下载响应
+
+    - `If-None-Match` 与当前 ETag 匹配时返回 304；
+    - 带 `Range` 时返回 206 和对应的部分内容，超出文件大小时返回 416；
+    - 带 `If-Range` 且与当前 ETag 或修改时间不一致时忽略 `Range`，返回完整文件。
+
+    Args:
+        path: 文件路径
+        request_headers: 请求头
+        media_type: 媒体类型
+
+    Returns:
+        下载响应
+    """
+    stat_result = path.stat()
+    size = stat_result.st_size
+    etag = file_etag(stat_result)
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        # 允许客户端缓存，但每次使用前都要用 ETag 验证
+        "Cache-Control": "no-cache",
+    }
+
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = _content_disposition(path.name)
+
+    byte_range: Optional[tuple[int, int]] = None
+    range_header = request_headers.get("range")
+    if_range = request_headers.get("if-range")
+    # If-Range 使用强比较，文件已变化时返回完整文件
+    if range_header is not None and (if_range is None or if_range in (etag, last_modified)):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=416,
+                headers={**headers, "Content-Range": f"bytes */{size}"}
+            )
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(
+            _iter_file(path, 0, size), media_type=media_type, headers=headers
+        )
+
+    start, end = byte_range
+    length = end - start + 1
+    logger.debug(f"Serving bytes {start}-{end}/{size} of {path}")
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        _iter_file(path, start, length), status_code=206, media_type=media_type, headers=headers
+    )
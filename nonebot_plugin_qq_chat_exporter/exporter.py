@@ -1,121 +1,143 @@
 """
 导出服务：负责从 chatrecorder 获取消息并导出
 """
-import json
+import asyncio
 import logging
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional, Union
 
 from nonebot import get_bot
-from nonebot_plugin_chatrecorder import get_message_records, MessageRecord
+from nonebot.adapters import Bot
+from nonebot_plugin_chatrecorder import MessageRecord
 from nonebot_plugin_orm import get_session
 from nonebot_plugin_uninfo import SceneType
 from nonebot_plugin_uninfo.orm import SessionModel, UserModel
 from sqlalchemy import select
 
-from .converter import convert_records_to_export_messages
-from .models import (
-    ChatInfo,
-    ExportData,
-    MessageTypes,
-    Resources,
-    ResourcesByType,
-    SenderStats,
-    Statistics,
-    TimeRange,
+from .converter import MessageConverter, MessageRow
+from .fetch import (
+    DEFAULT_BATCH_SIZE,
+    QueryTimings,
+    chunked,
+    count_message_records,
+    get_max_record_id,
+    iter_message_rows_partitioned,
 )
+from .bot_api import get_group_info, get_group_list, get_group_member_list
+from .checkpoint import CHECKPOINT_FILENAME, Checkpoint, CheckpointStore
+from .columnar import COLUMNAR_FORMATS, ColumnarWriter, create_columnar_writer, normalize_parquet_compression
+from .compression import compressed_path, normalize_compression
+from .config import plugin_config
+from .metrics import ExportMetrics, record_stage
+from .models import ChatInfo, Statistics
+from .parallel import ParallelConverter, segment_handlers_picklable
+from .progress import (
+    STAGE_DONE,
+    STAGE_EXPORTING,
+    STAGE_FINALIZING,
+    STAGE_PREPARING,
+    ExportCancelled,
+    ExportProgress,
+    ExportTimeout,
+)
+from .serializer import Serializer, get_serializer
+from .statistics import build_statistics_model, build_time_range, compute_statistics
+from .writer import ExportAppender, ExportWriter, NDJSONWriter
 
 logger = logging.getLogger(__name__)
 
+# 默认输出目录
+DEFAULT_OUTPUT_DIR = "data/qq_record_exports"
+
+# 导出格式：json 为单个 JSON 文件，ndjson 为每行一条消息、可分片的目录，
+# parquet / csv 为每条消息一行的列式文件
+OUTPUT_FORMATS = ("json", "ndjson", *COLUMNAR_FORMATS)
+
+# 增量导出时每个聊天一把锁
+_chat_locks: dict[str, asyncio.Lock] = {}
 
-async def _load_records_with_info(records: list[MessageRecord]):
+
+async def _load_records_with_info(
+    records: list[MessageRecord],
+    timings: Optional[QueryTimings] = None
+):
     """
     批量加载消息记录及其关联的会话和用户信息
-    
+
+    会话和用户通过一条 JOIN 查询一起加载，会话 id 列表按 `MAX_IN_PARAMS` 分块，
+    避免超出数据库的绑定变量上限。按聊天导出时应直接使用
+    `iter_message_rows`，查询时已经 JOIN 了发送者信息，无需再单独加载。
+
     Args:
         records: 消息记录列表
-        
+        timings: 查询耗时统计
+
     Returns:
         (消息记录, 会话模型, 用户模型) 元组列表
     """
     if not records:
         return []
-    
+
     logger.info(f"Loading info for {len(records)} message records")
-    
-    records_with_info = []
-    
+
     # 收集所有需要查询的session_persist_id（使用set去重）
-    session_ids = list({r.session_persist_id for r in records if hasattr(r, 'session_persist_id')})
-    
+    session_ids = list({r.session_persist_id for r in records if hasattr(r, "session_persist_id")})
+
     if not session_ids:
         logger.warning("No valid session IDs found in records")
         return []
-    
+
+    # 按块批量查询会话及其用户信息
+    load_started = time.perf_counter()
+    sessions_dict: dict[int, tuple[SessionModel, UserModel]] = {}
     async with get_session() as db_session:
-        # 批量查询所有会话信息
-        logger.debug(f"Batch loading {len(session_ids)} sessions")
-        sessions_stmt = select(SessionModel).where(SessionModel.id.in_(session_ids))
-        sessions_result = await db_session.scalars(sessions_stmt)
-        sessions_dict = {s.id: s for s in sessions_result.all()}
-        
-        # 收集所有需要查询的user_persist_id（使用set去重）
-        user_ids = list({
-            s.user_persist_id 
-            for s in sessions_dict.values() 
-            if hasattr(s, 'user_persist_id')
-        })
-        
-        if not user_ids:
-            logger.warning("No valid user IDs found in sessions")
-            return []
-        
-        # 批量查询所有用户信息
-        logger.debug(f"Batch loading {len(user_ids)} users")
-        users_stmt = select(UserModel).where(UserModel.id.in_(user_ids))
-        users_result = await db_session.scalars(users_stmt)
-        users_dict = {u.id: u for u in users_result.all()}
-    
+        for chunk in chunked(session_ids):
+            started = time.perf_counter()
+            statement = (
+                select(SessionModel, UserModel)
+                .join(UserModel, UserModel.id == SessionModel.user_persist_id)
+                .where(SessionModel.id.in_(chunk))
+            )
+            rows = (await db_session.execute(statement)).all()
+            if timings is not None:
+                timings.record("sessions_with_users", time.perf_counter() - started, len(rows))
+            for session, user in rows:
+                sessions_dict[session.id] = (session, user)
+    record_stage("load_info", time.perf_counter() - load_started)
+
     # 组装结果
+    records_with_info = []
     skipped = 0
     for record in records:
-        if not hasattr(record, 'session_persist_id'):
-            skipped += 1
-            continue
-            
-        session = sessions_dict.get(record.session_persist_id)
-        if not session:
-            skipped += 1
-            continue
-        
-        if not hasattr(session, 'user_persist_id'):
-            skipped += 1
-            continue
-            
-        user = users_dict.get(session.user_persist_id)
-        if not user:
+        info = sessions_dict.get(getattr(record, "session_persist_id", None))
+        if not info:
             skipped += 1
             continue
-        
-        records_with_info.append((record, session, user))
-    
+
+        records_with_info.append((record, *info))
+
     if skipped > 0:
         logger.warning(f"Skipped {skipped} records due to missing session or user info")
-    
+
     logger.info(f"Successfully loaded info for {len(records_with_info)} records")
     return records_with_info
 
 
-async def _get_group_member_map(group_id: str) -> dict[str, str]:
+async def _get_group_member_map(group_id: str, bot: Optional[Bot] = None) -> dict[str, str]:
     """
     获取群成员昵称映射
+
+    Args:
+        group_id: 群号
+        bot: 使用的机器人，为空时调用 `get_bot()`
     """
     try:
-        bot = get_bot()
+        bot = bot or get_bot()
         # 尝试调用 get_group_member_list (OneBot V11)
         if hasattr(bot, "get_group_member_list"):
-            members = await bot.get_group_member_list(group_id=int(group_id))
+            members = await get_group_member_list(bot, group_id)
             return {
                 str(m["user_id"]): m.get("card") or m.get("nickname") or ""
                 for m in members
@@ -132,164 +154,674 @@ async def _get_group_name(group_id: str) -> str:
     try:
         bot = get_bot()
         if hasattr(bot, "get_group_info"):
-            group_info = await bot.get_group_info(group_id=int(group_id))
+            group_info = await get_group_info(bot, group_id)
             return group_info.get("group_name", "")
     except Exception as e:
         logger.warning(f"Failed to get group info: {e}")
     return ""
 
 
-async def export_group_messages(
+async def _get_group_names(bot: Optional[Bot] = None) -> dict[str, str]:
+    """
+    一次获取机器人所在的所有群的名称，批量导出时代替逐个调用 `get_group_info`
+
+    Args:
+        bot: 使用的机器人，为空时调用 `get_bot()`
+
+    Returns:
+        群号 -> 群名称
+    """
+    try:
+        bot = bot or get_bot()
+        if hasattr(bot, "get_group_list"):
+            groups = await get_group_list(bot)
+            return {str(g["group_id"]): g.get("group_name", "") for g in groups}
+    except Exception as e:
+        logger.warning(f"Failed to get group list: {e}")
+    return {}
+
+
+def _group_filters(
     group_id: str,
+    start_time: Optional[datetime],
+    end_time: Optional[datetime]
+) -> dict[str, Any]:
+    """群聊消息的 chatrecorder 筛选参数"""
+    return {
+        "scene_ids": [group_id],
+        "scene_types": [SceneType.GROUP],
+        "time_start": start_time,
+        "time_stop": end_time,
+    }
+
+
+def _private_filters(
+    user_id: str,
+    start_time: Optional[datetime],
+    end_time: Optional[datetime]
+) -> dict[str, Any]:
+    """私聊消息的 chatrecorder 筛选参数"""
+    return {
+        "user_ids": [user_id],
+        "scene_types": [SceneType.PRIVATE],
+        "time_start": start_time,
+        "time_stop": end_time,
+    }
+
+
+async def get_export_watermark(
+    chat_type: str,
+    chat_id: str,
     start_time: Optional[datetime] = None,
-    end_time: Optional[datetime] = None,
-    output_dir: Optional[str] = None
-) -> str:
+    end_time: Optional[datetime] = None
+) -> Optional[int]:
     """
-    导出群聊消息
+    获取导出范围内最大的消息记录 id，用于判断导出结果是否仍然有效
 
     Args:
-        group_id: 群号
+        chat_type: 聊天类型 ("group" or "private")
+        chat_id: 群号或用户ID
         start_time: 开始时间
         end_time: 结束时间
+
+    Returns:
+        最大记录 id，没有消息时返回 None
+    """
+    if chat_type == "group":
+        filters = _group_filters(chat_id, start_time, end_time)
+    elif chat_type == "private":
+        filters = _private_filters(chat_id, start_time, end_time)
+    else:
+        raise ValueError(f"Invalid chat_type: {chat_type}")
+    return await get_max_record_id(**filters)
+
+
+def _check_export_options(
+    compression: Optional[str],
+    incremental: bool,
+    output_format: str = "json",
+    split_size: Optional[int] = None,
+    split_by_month: bool = False
+) -> Optional[str]:
+    """校验导出选项，返回规范化的压缩方式"""
+    if output_format == "parquet":
+        # Parquet 的压缩是 pyarrow 实现的列编码，可选的编码与文件压缩不同
+        compression = normalize_parquet_compression(compression)
+    else:
+        compression = normalize_compression(compression)
+    if incremental and compression is not None:
+        raise ValueError("Incremental export does not support compression")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Invalid output_format: {output_format}, expected one of {OUTPUT_FORMATS}")
+    if output_format != "ndjson" and (split_size is not None or split_by_month):
+        raise ValueError("Splitting is only supported for ndjson output")
+    if output_format != "json" and incremental:
+        raise ValueError(f"Incremental export does not support {output_format} output")
+    if split_size is not None and split_size <= 0:
+        raise ValueError(f"split_size must be positive, got {split_size}")
+    return compression
+
+
+def _chat_lock(chat_type: str, chat_id: str) -> asyncio.Lock:
+    """同一聊天的增量导出需要串行执行，避免同时修改同一个文件"""
+    return _chat_locks.setdefault(f"{chat_type}_{chat_id}", asyncio.Lock())
+
+
+def _get_parallel_converter(
+    convert_workers: Optional[int],
+    chat_type: str,
+    chat_id: str,
+    nickname_map: dict[str, str],
+    dumps: Serializer
+) -> Optional[ParallelConverter]:
+    """按配置创建多进程转换器，不使用多进程时返回 None"""
+    if convert_workers is None:
+        convert_workers = plugin_config.qq_chat_exporter_convert_workers
+    if convert_workers <= 1:
+        return None
+    if not segment_handlers_picklable():
+        logger.warning("Registered segment handlers cannot be sent to worker processes, converting in-process")
+        return None
+    return ParallelConverter(convert_workers, chat_type, chat_id, nickname_map, dumps)
+
+
+def _get_fetch_parallelism(fetch_parallelism: Optional[int]) -> int:
+    """拉取消息时同时查询的时间窗口数，为空时使用插件配置"""
+    if fetch_parallelism is None:
+        fetch_parallelism = plugin_config.qq_chat_exporter_fetch_parallelism
+    return max(fetch_parallelism, 1)
+
+
+async def _write_chat_messages(
+    writer: Union[ExportWriter, NDJSONWriter, ColumnarWriter],
+    converter: MessageConverter,
+    filters: dict[str, Any],
+    batch_size: int,
+    parallel: Optional[ParallelConverter],
+    timings: QueryTimings,
+    after: Optional[tuple[datetime, int]] = None,
+    progress: Optional[ExportProgress] = None,
+    fetch_parallelism: Optional[int] = None,
+    metrics: Optional[ExportMetrics] = None
+) -> tuple[int, Optional[datetime], Optional[tuple[datetime, int]]]:
+    """
+    分批拉取、转换消息并写入 writer
+
+    `fetch_parallelism` 大于 1 时按时间窗口并发拉取，各窗口的批次仍按时间顺序依次转换和写入。
+    每批的等待拉取、转换、序列化和写入耗时分别计入 `metrics` 的 fetch、convert、serialize、write 阶段，
+    多进程转换时等待子进程的时间计入 convert，NDJSON 和列式导出的序列化计入 write
+
+    Returns:
+        (拉取的记录数, 第一条记录时间, 最后一条记录的 (time, id))
+    """
+    first_time: Optional[datetime] = None
+    last_key: Optional[tuple[datetime, int]] = None
+    fetched = 0
+    if metrics is None:
+        metrics = ExportMetrics()
+    # 增量导出时 writer 的计数包含已有消息
+    initial_count = writer.message_count
+
+    def report() -> None:
+        if progress is not None:
+            progress.update(
+                fetched=fetched,
+                converted=writer.message_count - initial_count,
+                bytes_written=writer.bytes_written
+            )
+
+    async def write_pending(futures: list) -> None:
+        with metrics.span("convert"):
+            fragments = await ParallelConverter.collect(
+                futures, converter.sender_stats, converter.resource_totals
+            )
+        with metrics.span("write"):
+            for fragment, count in fragments:
+                writer.write_raw(fragment, count)
+
+    # 按列分批拉取消息，每批经快速路径转换为字典后立即写出，
+    # 不构建 ORM 实体和 pydantic 模型，也不保留导出消息
+    pending: Optional[list] = None
+    rows_iter = iter_message_rows_partitioned(
+        batch_size=batch_size,
+        timings=timings,
+        after=after,
+        parallelism=_get_fetch_parallelism(fetch_parallelism),
+        partitions=plugin_config.qq_chat_exporter_fetch_partitions,
+        **filters
+    )
+    try:
+        # 从上一批处理完到拿到下一批之间的时间都是在等待数据库
+        waiting = time.perf_counter()
+        async for rows in rows_iter:
+            metrics.record("fetch", time.perf_counter() - waiting)
+            if progress is not None:
+                # 在每批消息之间响应取消和期限
+                progress.check_cancelled()
+            fetched += len(rows)
+            metrics.records += len(rows)
+
+            if parallel is not None:
+                # 子进程转换当前批次的同时拉取下一批，最多同时保留两批
+                previous, pending = pending, parallel.submit(rows)
+                if previous is not None:
+                    await write_pending(previous)
+            elif isinstance(writer, ColumnarWriter):
+                # 列式导出还需要消息行中的原始消息段
+                converted_rows: list[MessageRow] = []
+                with metrics.span("convert"):
+                    messages = converter.convert(rows, converted_rows)
+                with metrics.span("write"):
+                    writer.write_rows(converted_rows, messages)
+            elif isinstance(writer, NDJSONWriter):
+                with metrics.span("convert"):
+                    messages = converter.convert(rows)
+                with metrics.span("write"):
+                    writer.write_messages(messages)
+            else:
+                with metrics.span("convert"):
+                    messages = converter.convert(rows)
+                with metrics.span("serialize"):
+                    fragment = writer.dump_messages(messages)
+                with metrics.span("write"):
+                    writer.write_raw(fragment, len(messages))
+
+            # 记录时间范围和分页位置，避免事后再解析 ISO 时间戳
+            if rows:
+                if first_time is None:
+                    first_time = rows[0].time
+                last_key = (rows[-1].time, rows[-1].id)
+            report()
+            waiting = time.perf_counter()
+
+        if pending is not None:
+            previous, pending = pending, None
+            await write_pending(previous)
+            report()
+    finally:
+        # 导出被取消或出错时，不再需要尚未收集的转换结果
+        if pending is not None:
+            for future in pending:
+                future.cancel()
+        # 立即停止仍在预取的时间窗口，不等待异步生成器被回收
+        await rows_iter.aclose()
+
+    return fetched, first_time, last_key
+
+
+async def _export_chat(
+    chat_type: str,
+    chat_id: str,
+    chat_name: str,
+    filters: dict[str, Any],
+    nickname_map: dict[str, str],
+    output_dir: Optional[str],
+    batch_size: int,
+    convert_workers: Optional[int] = None,
+    compression: Optional[str] = None,
+    incremental: bool = False,
+    progress: Optional[ExportProgress] = None,
+    output_format: str = "json",
+    split_size: Optional[int] = None,
+    split_by_month: bool = False,
+    fetch_parallelism: Optional[int] = None,
+    metrics: Optional[ExportMetrics] = None
+) -> str:
+    """
+    分批拉取、转换并导出指定聊天的消息
+
+    导出结束时按结果（成功、失败或取消）记录到 `metrics`
+
+    Args:
+        chat_type: 聊天类型 ("group" or "private")
+        chat_id: 群号或用户ID
+        chat_name: 聊天名称
+        filters: chatrecorder 筛选参数
+        nickname_map: 用户昵称映射
         output_dir: 输出目录
+        batch_size: 每批拉取的消息条数
+        convert_workers: 转换使用的进程数，为空时使用插件配置
+        compression: 压缩方式，已经过 `_check_export_options` 校验
+        incremental: 是否增量导出
+        progress: 导出进度
+        output_format: 导出格式，已经过 `_check_export_options` 校验
+        split_size: NDJSON 分片的最大字节数
+        split_by_month: NDJSON 是否按自然月分片
+        fetch_parallelism: 同时拉取的时间窗口数，为空时使用插件配置
+        metrics: 导出耗时统计，调用方在获取群成员等准备工作之前创建，为空时从这里开始计时
 
     Returns:
-        输出文件路径
+        输出文件路径，NDJSON 导出时为清单文件路径
     """
+    if metrics is None:
+        metrics = ExportMetrics(chat_type, output_format)
     try:
         # 设置默认输出目录
         if output_dir is None:
-            output_dir = "data/qq_record_exports"
+            output_dir = DEFAULT_OUTPUT_DIR
 
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
 
-        logger.info(f"Starting export for group {group_id}")
+        if not incremental:
+            return await _write_export(
+                chat_type, chat_id, chat_name, filters, nickname_map,
+                output_path, batch_size, convert_workers, compression, progress=progress,
+                output_format=output_format, split_size=split_size, split_by_month=split_by_month,
+                fetch_parallelism=fetch_parallelism, metrics=metrics
+            )
 
-        # 获取消息记录
-        records = await get_message_records(
-            scene_ids=[group_id],
-            scene_types=[SceneType.GROUP],
-            time_start=start_time,
-            time_stop=end_time
-        )
+        store = CheckpointStore(output_path / CHECKPOINT_FILENAME)
+        async with _chat_lock(chat_type, chat_id):
+            checkpoint = store.get(chat_type, chat_id)
+            if checkpoint is not None and checkpoint.can_resume(filters.get("time_start")):
+                return await _append_export(
+                    checkpoint, store, chat_name, filters, nickname_map,
+                    batch_size, convert_workers, progress, fetch_parallelism, metrics
+                )
+            return await _write_export(
+                chat_type, chat_id, chat_name, filters, nickname_map,
+                output_path, batch_size, convert_workers, None, store, progress,
+                fetch_parallelism=fetch_parallelism, metrics=metrics
+            )
+    except ExportTimeout as e:
+        # 超过期限的导出记为失败
+        metrics.finish("failed", e)
+        raise
+    except (ExportCancelled, asyncio.CancelledError):
+        metrics.finish("cancelled")
+        raise
+    except BaseException as e:
+        metrics.finish("failed", e)
+        raise
+    finally:
+        # 没有出错时记为成功，已经记录过的结果不会被覆盖
+        metrics.finish("success")
+
+
+async def _write_export(
+    chat_type: str,
+    chat_id: str,
+    chat_name: str,
+    filters: dict[str, Any],
+    nickname_map: dict[str, str],
+    output_path: Path,
+    batch_size: int,
+    convert_workers: Optional[int],
+    compression: Optional[str],
+    store: Optional[CheckpointStore] = None,
+    progress: Optional[ExportProgress] = None,
+    output_format: str = "json",
+    split_size: Optional[int] = None,
+    split_by_month: bool = False,
+    fetch_parallelism: Optional[int] = None,
+    metrics: Optional[ExportMetrics] = None
+) -> str:
+    """
+    导出到新文件
 
-        logger.info(f"Retrieved {len(records)} message records")
+    传入检查点存储时，导出文件预留头部空间，完成后保存检查点供增量导出续接。
+    NDJSON 导出到以聊天和时间命名的目录，返回其中的清单文件路径
+    """
+    if metrics is None:
+        metrics = ExportMetrics(chat_type, output_format)
+
+    # 生成文件名
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    basename = f"{chat_type}_{chat_id}_{timestamp}"
+    chat_info = ChatInfo(name=chat_name, type=chat_type)
+    dumps = get_serializer()
+
+    writer: Union[ExportWriter, NDJSONWriter, ColumnarWriter]
+    if output_format in COLUMNAR_FORMATS:
+        writer = create_columnar_writer(output_path / basename, output_format, chat_info, compression)
+        output_file = writer.output_file
+        parallel = None
+    elif output_format == "ndjson":
+        writer = NDJSONWriter(
+            output_path / basename,
+            chat_info,
+            split_size=split_size,
+            split_by_month=split_by_month,
+            dumps=dumps,
+            compression=compression
+        )
+        output_file = writer.manifest_file
+        # 多进程转换输出的是拼接好的 JSON 片段，无法逐条换行和分片，NDJSON 和列式导出都在当前进程中转换
+        parallel = None
+    else:
+        output_file = compressed_path(output_path / f"{basename}.json", compression)
+        # 统计信息写在消息之前，先通过 SQL 计算，消息随后直接写入导出文件
+        with metrics.span("statistics"):
+            expected = await compute_statistics(
+                filters, nickname_map, include_resources=True, batch_size=batch_size
+            )
+        writer = ExportWriter(
+            output_file,
+            chat_info,
+            dumps=dumps,
+            compression=compression,
+            reserve_header=store is not None,
+            statistics=expected
+        )
+        parallel = _get_parallel_converter(convert_workers, chat_type, chat_id, nickname_map, dumps)
 
-        if not records:
-            logger.warning(f"No messages found for group {group_id}")
-            # 仍然创建空的导出文件
-            records_with_info = []
-        else:
-            # 使用批量加载获取关联信息
-            records_with_info = await _load_records_with_info(records)
+    converter = MessageConverter(chat_type, chat_id, nickname_map)
+    timings = QueryTimings()
 
-        # 获取群成员昵称映射
-        nickname_map = await _get_group_member_map(group_id)
+    if progress is not None:
+        progress.check_cancelled()
+        # 额外的计数查询只用于估算剩余时间
+        progress.set_total(await count_message_records(**filters))
+        progress.set_stage(STAGE_EXPORTING)
 
-        # 转换消息格式
+    with writer:
+        if isinstance(writer, NDJSONWriter):
+            # 目录名冲突时写入器改用追加序号的目录
+            output_file = writer.manifest_file
+        logger.info(f"Writing export to {output_file}")
         logger.info("Converting messages to export format")
-        export_messages, statistics_data = convert_records_to_export_messages(
-            records_with_info, "group", group_id, nickname_map
+        fetched, first_time, last_key = await _write_chat_messages(
+            writer, converter, filters, batch_size, parallel, timings,
+            progress=progress, fetch_parallelism=fetch_parallelism, metrics=metrics
         )
 
-        logger.info(f"Converted {len(export_messages)} messages successfully")
-
-        # 获取群名称
-        group_name = await _get_group_name(group_id) or f"Group {group_id}"
-
-        # 创建聊天信息
-        chat_info = ChatInfo(
-            name=group_name,
-            type="group"
+        logger.info(f"Retrieved {fetched} message records ({timings.summary()})")
+        if not fetched:
+            # 仍然创建空的导出文件
+            logger.warning(f"No messages found for {chat_type} {chat_id}")
+
+        logger.info(f"Converted {writer.message_count} messages successfully")
+
+        if progress is not None:
+            progress.check_cancelled()
+            progress.set_stage(STAGE_FINALIZING)
+        with metrics.span("finalize"):
+            statistics = build_statistics_model(
+                writer.message_count,
+                build_time_range(first_time, last_key[0] if last_key else None),
+                converter.statistics()
+            )
+            writer.finish(statistics)
+    metrics.messages = writer.message_count
+    metrics.bytes_written = writer.file_size
+
+    if store is not None:
+        store.save(Checkpoint(
+            chat_type=chat_type,
+            chat_id=chat_id,
+            file_path=str(output_file),
+            start_time=filters.get("time_start"),
+            first_time=first_time,
+            last_time=last_key[0] if last_key else None,
+            last_id=last_key[1] if last_key else None,
+            message_count=writer.message_count,
+            header_size=writer.header_size,
+            messages_end=writer.messages_end,
+            file_size=writer.file_size,
+            senders=converter.sender_stats,
+            resources=converter.resource_totals
+        ))
+
+    if progress is not None:
+        progress.update(bytes_written=writer.file_size)
+        progress.set_stage(STAGE_DONE)
+
+    logger.info(f"Export completed successfully: {output_file}")
+    return str(output_file)
+
+
+async def _append_export(
+    checkpoint: Checkpoint,
+    store: CheckpointStore,
+    chat_name: str,
+    filters: dict[str, Any],
+    nickname_map: dict[str, str],
+    batch_size: int,
+    convert_workers: Optional[int],
+    progress: Optional[ExportProgress] = None,
+    fetch_parallelism: Optional[int] = None,
+    metrics: Optional[ExportMetrics] = None
+) -> str:
+    """
+    从检查点续接，只拉取上次之后的新消息并追加到已有的导出文件
+    """
+    chat_type, chat_id = checkpoint.chat_type, checkpoint.chat_id
+    output_file = Path(checkpoint.file_path)
+    if metrics is None:
+        metrics = ExportMetrics(chat_type)
+
+    # 在已有的统计上继续累加
+    converter = MessageConverter(
+        chat_type,
+        chat_id,
+        nickname_map,
+        sender_stats={uid: dict(stats) for uid, stats in checkpoint.senders.items()},
+        resource_totals=dict(checkpoint.resources)
+    )
+    timings = QueryTimings()
+    dumps = get_serializer()
+    parallel = _get_parallel_converter(convert_workers, chat_type, chat_id, nickname_map, dumps)
+
+    if progress is not None:
+        progress.check_cancelled()
+        progress.set_total(await count_message_records(after=checkpoint.last_key, **filters))
+        progress.set_stage(STAGE_EXPORTING)
+
+    logger.info(f"Appending new messages to {output_file} after {checkpoint.last_key}")
+    with ExportAppender(
+        output_file,
+        ChatInfo(name=chat_name, type=chat_type),
+        checkpoint.header_size,
+        checkpoint.messages_end,
+        checkpoint.message_count,
+        dumps=dumps
+    ) as writer:
+        fetched, first_time, last_key = await _write_chat_messages(
+            writer, converter, filters, batch_size, parallel, timings,
+            after=checkpoint.last_key, progress=progress, fetch_parallelism=fetch_parallelism,
+            metrics=metrics
         )
 
-        # 计算时间范围
-        time_range = TimeRange()
-        if export_messages:
-            # 从第一条和最后一条消息获取时间范围
-            first_time = export_messages[0].timestamp
-            last_time = export_messages[-1].timestamp
-
-            # 转换为datetime以计算天数
-            try:
-                dt_first = datetime.fromisoformat(first_time.replace("Z", "+00:00"))
-                dt_last = datetime.fromisoformat(last_time.replace("Z", "+00:00"))
-                duration_days = (dt_last - dt_first).days
-
-                time_range.start = first_time
-                time_range.end = last_time
-                time_range.durationDays = duration_days
-            except Exception as e:
-                logger.warning(f"Failed to calculate time range: {e}")
-
-        # 创建统计信息
-        total_messages = len(export_messages)
-        message_types = MessageTypes(unknown=total_messages)
-
-        # 转换发送者统计
-        senders = [
-            SenderStats(
-                uid=s["uid"],
-                name=s["name"],
-                messageCount=s["messageCount"],
-                percentage=s["percentage"]
+        logger.info(f"Retrieved {fetched} new message records ({timings.summary()})")
+        if not fetched:
+            logger.info(f"No new messages for {chat_type} {chat_id}")
+            if progress is not None:
+                progress.set_stage(STAGE_DONE)
+            return str(output_file)
+
+        if progress is not None:
+            progress.check_cancelled()
+            progress.set_stage(STAGE_FINALIZING)
+        with metrics.span("finalize"):
+            statistics = build_statistics_model(
+                writer.message_count,
+                build_time_range(checkpoint.first_time or first_time, last_key[0]),
+                converter.statistics()
             )
-            for s in statistics_data["senders"]
-        ]
-
-        # 创建资源统计
-        resource_stats = statistics_data["resources"]
-        resources_by_type = ResourcesByType(
-            image=resource_stats["image"],
-            video=resource_stats["video"],
-            audio=resource_stats["audio"],
-            file=resource_stats["file"]
-        )
-        total_resources = sum(resource_stats.values())
-        resources = Resources(
-            total=total_resources,
-            byType=resources_by_type,
-            totalSize=0
-        )
+            writer.finish(statistics)
+    # 只统计本次追加的部分
+    metrics.messages = writer.message_count - checkpoint.message_count
+    metrics.bytes_written = max(writer.file_size - checkpoint.file_size, 0)
+
+    store.save(checkpoint.model_copy(update={
+        "first_time": checkpoint.first_time or first_time,
+        "last_time": last_key[0],
+        "last_id": last_key[1],
+        "message_count": writer.message_count,
+        "header_size": writer.header_size,
+        "messages_end": writer.messages_end,
+        "file_size": writer.file_size,
+        "senders": converter.sender_stats,
+        "resources": converter.resource_totals,
+        "updated_at": datetime.now(),
+    }))
+
+    if progress is not None:
+        progress.update(bytes_written=writer.file_size)
+        progress.set_stage(STAGE_DONE)
+
+    logger.info(
+        f"Incremental export completed: {writer.message_count - checkpoint.message_count} "
+        f"new messages appended to {output_file}"
+    )
+    return str(output_file)
 
-        statistics = Statistics(
-            totalMessages=total_messages,
-            timeRange=time_range,
-            messageTypes=message_types,
-            senders=senders,
-            resources=resources
-        )
 
-        # 创建导出数据
-        export_data = ExportData(
-            chatInfo=chat_info,
-            statistics=statistics,
-            messages=export_messages
-        )
+async def export_group_messages(
+    group_id: str,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    output_dir: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    convert_workers: Optional[int] = None,
+    compression: Optional[str] = None,
+    incremental: bool = False,
+    progress: Optional[ExportProgress] = None,
+    output_format: str = "json",
+    split_size: Optional[int] = None,
+    split_by_month: bool = False,
+    fetch_parallelism: Optional[int] = None
+) -> str:
+    """
+    导出群聊消息
+
+    Args:
+        group_id: 群号
+        start_time: 开始时间
+        end_time: 结束时间
+        output_dir: 输出目录
+        batch_size: 每批拉取的消息条数
+        convert_workers: 转换使用的进程数，为空时使用插件配置
+        compression: 压缩方式 ("none", "gzip" or "zstd")，为空表示不压缩，
+            压缩后的文件名追加 `.gz` / `.zst` 后缀；Parquet 导出时为列的压缩编码
+            （"none"、"snappy"、"gzip"、"brotli"、"lz4" 或 "zstd"，由 pyarrow 实现），为空时使用 zstd
+        incremental: 增量导出，存在检查点时只拉取上次导出之后的新消息并追加到
+            上次的导出文件，不支持与压缩同时使用
+        progress: 导出进度，导出过程中上报当前阶段、记录数、写入字节数等，
+            并在每批消息之间检查是否已被取消，取消时抛出 `ExportCancelled`
+        output_format: 导出格式，"json" 为单个 JSON 文件；"ndjson" 导出到一个目录，
+            每个分片的第一行是 chatInfo、statistics 等头部，之后每行一条消息，
+            目录中的 `manifest.json` 记录所有分片；"parquet" / "csv" 为每条消息一行的列式文件，
+            未安装 pyarrow 时 "parquet" 退回到 CSV。除 "json" 外都不支持增量导出
+        split_size: NDJSON 每个分片中消息行的最大字节数（压缩前，不含头部），
+            超过后写入新的分片，为空时不按大小分片
+        split_by_month: NDJSON 按消息时间（UTC）的自然月分片
+        fetch_parallelism: 同时拉取的时间窗口数，大于 1 时将时间范围切分为多个窗口，
+            在各自的数据库会话中并发拉取后按时间顺序拼接，为空时使用插件配置
 
-        # 生成文件名
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"group_{group_id}_{timestamp}.json"
-        output_file = output_path / filename
+    Returns:
+        输出文件路径，NDJSON 导出时为清单文件路径
+    """
+    # 在校验参数之前创建，参数错误和获取群成员失败也计入导出结果
+    metrics = ExportMetrics("group", output_format)
+    try:
+        compression = _check_export_options(
+            compression, incremental, output_format, split_size, split_by_month
+        )
 
-        # 写入文件
-        logger.info(f"Writing export to {output_file}")
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(
-                export_data.model_dump(mode="json"),
-                f,
-                ensure_ascii=False,
-                indent=None,
-                separators=(',', ':')
-            )
+        logger.info(f"Starting export for group {group_id}")
+        if progress is not None:
+            progress.set_stage(STAGE_PREPARING)
+
+        with metrics.span("member_lookup"):
+            # 获取群成员昵称映射
+            nickname_map = await _get_group_member_map(group_id)
+
+            # 获取群名称
+            group_name = await _get_group_name(group_id) or f"Group {group_id}"
+
+        return await _export_chat(
+            "group",
+            group_id,
+            group_name,
+            _group_filters(group_id, start_time, end_time),
+            nickname_map,
+            output_dir,
+            batch_size,
+            convert_workers,
+            compression,
+            incremental,
+            progress,
+            output_format,
+            split_size,
+            split_by_month,
+            fetch_parallelism,
+            metrics
+        )
 
-        logger.info(f"Export completed successfully: {output_file}")
-        return str(output_file)
-    
+    except ExportTimeout as e:
+        logger.warning(f"Export for group {group_id} timed out: {e}")
+        metrics.finish("failed", e)
+        raise
+    except (ExportCancelled, asyncio.CancelledError) as e:
+        logger.info(f"Export for group {group_id} stopped: {e}")
+        metrics.finish("cancelled")
+        raise
     except Exception as e:
         logger.error(f"Failed to export group messages: {type(e).__name__} - {str(e)}", exc_info=True)
+        # _export_chat 已经记录过的结果不会重复记录
+        metrics.finish("failed", e)
         raise
 
 
@@ -297,7 +829,16 @@ async def export_private_messages(
     user_id: str,
     start_time: Optional[datetime] = None,
     end_time: Optional[datetime] = None,
-    output_dir: Optional[str] = None
+    output_dir: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    convert_workers: Optional[int] = None,
+    compression: Optional[str] = None,
+    incremental: bool = False,
+    progress: Optional[ExportProgress] = None,
+    output_format: str = "json",
+    split_size: Optional[int] = None,
+    split_by_month: bool = False,
+    fetch_parallelism: Optional[int] = None
 ) -> str:
     """
     导出私聊消息
@@ -307,135 +848,117 @@ async def export_private_messages(
         start_time: 开始时间
         end_time: 结束时间
         output_dir: 输出目录
+        batch_size: 每批拉取的消息条数
+        convert_workers: 转换使用的进程数，为空时使用插件配置
+        compression: 压缩方式 ("none", "gzip" or "zstd")，为空表示不压缩，
+            压缩后的文件名追加 `.gz` / `.zst` 后缀；Parquet 导出时为列的压缩编码
+            （"none"、"snappy"、"gzip"、"brotli"、"lz4" 或 "zstd"，由 pyarrow 实现），为空时使用 zstd
+        incremental: 增量导出，存在检查点时只拉取上次导出之后的新消息并追加到
+            上次的导出文件，不支持与压缩同时使用
+        progress: 导出进度，导出过程中上报当前阶段、记录数、写入字节数等，
+            并在每批消息之间检查是否已被取消，取消时抛出 `ExportCancelled`
+        output_format: 导出格式，"json" 为单个 JSON 文件；"ndjson" 导出到一个目录，
+            每个分片的第一行是 chatInfo、statistics 等头部，之后每行一条消息，
+            目录中的 `manifest.json` 记录所有分片；"parquet" / "csv" 为每条消息一行的列式文件，
+            未安装 pyarrow 时 "parquet" 退回到 CSV。除 "json" 外都不支持增量导出
+        split_size: NDJSON 每个分片中消息行的最大字节数（压缩前，不含头部），
+            超过后写入新的分片，为空时不按大小分片
+        split_by_month: NDJSON 按消息时间（UTC）的自然月分片
+        fetch_parallelism: 同时拉取的时间窗口数，大于 1 时将时间范围切分为多个窗口，
+            在各自的数据库会话中并发拉取后按时间顺序拼接，为空时使用插件配置
 
     Returns:
-        输出文件路径
+        输出文件路径，NDJSON 导出时为清单文件路径
     """
+    metrics = ExportMetrics("private", output_format)
     try:
-        # 设置默认输出目录
-        if output_dir is None:
-            output_dir = "data/qq_record_exports"
-
-        output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
+        compression = _check_export_options(
+            compression, incremental, output_format, split_size, split_by_month
+        )
 
         logger.info(f"Starting export for user {user_id}")
-
-        # 获取消息记录
-        records = await get_message_records(
-            user_ids=[user_id],
-            scene_types=[SceneType.PRIVATE],
-            time_start=start_time,
-            time_stop=end_time
+        if progress is not None:
+            progress.set_stage(STAGE_PREPARING)
+
+        return await _export_chat(
+            "private",
+            user_id,
+            f"User {user_id}",
+            _private_filters(user_id, start_time, end_time),
+            {},
+            output_dir,
+            batch_size,
+            convert_workers,
+            compression,
+            incremental,
+            progress,
+            output_format,
+            split_size,
+            split_by_month,
+            fetch_parallelism,
+            metrics
         )
 
-        logger.info(f"Retrieved {len(records)} message records")
-
-        if not records:
-            logger.warning(f"No messages found for user {user_id}")
-            # 仍然创建空的导出文件
-            records_with_info = []
-        else:
-            # 使用批量加载获取关联信息
-            records_with_info = await _load_records_with_info(records)
-
-        # 转换消息格式
-        logger.info("Converting messages to export format")
-        export_messages, statistics_data = convert_records_to_export_messages(
-            records_with_info, "private", user_id
-        )
+    except ExportTimeout as e:
+        logger.warning(f"Export for user {user_id} timed out: {e}")
+        metrics.finish("failed", e)
+        raise
+    except (ExportCancelled, asyncio.CancelledError) as e:
+        logger.info(f"Export for user {user_id} stopped: {e}")
+        metrics.finish("cancelled")
+        raise
+    except Exception as e:
+        logger.error(f"Failed to export private messages: {type(e).__name__} - {str(e)}", exc_info=True)
+        # _export_chat 已经记录过的结果不会重复记录
+        metrics.finish("failed", e)
+        raise
 
-        logger.info(f"Converted {len(export_messages)} messages successfully")
 
-        # 创建聊天信息
-        chat_info = ChatInfo(
-            name=f"User {user_id}",
-            type="private"
-        )
+async def get_group_statistics(
+    group_id: str,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    include_resources: bool = False
+) -> Statistics:
+    """
+    只计算群聊消息的统计信息，不进行导出
 
-        # 计算时间范围
-        time_range = TimeRange()
-        if export_messages:
-            # 从第一条和最后一条消息获取时间范围
-            first_time = export_messages[0].timestamp
-            last_time = export_messages[-1].timestamp
-
-            # 转换为datetime以计算天数
-            try:
-                dt_first = datetime.fromisoformat(first_time.replace("Z", "+00:00"))
-                dt_last = datetime.fromisoformat(last_time.replace("Z", "+00:00"))
-                duration_days = (dt_last - dt_first).days
-
-                time_range.start = first_time
-                time_range.end = last_time
-                time_range.durationDays = duration_days
-            except Exception as e:
-                logger.warning(f"Failed to calculate time range: {e}")
-
-        # 创建统计信息
-        total_messages = len(export_messages)
-        message_types = MessageTypes(unknown=total_messages)
-
-        # 转换发送者统计
-        senders = [
-            SenderStats(
-                uid=s["uid"],
-                name=s["name"],
-                messageCount=s["messageCount"],
-                percentage=s["percentage"]
-            )
-            for s in statistics_data["senders"]
-        ]
-
-        # 创建资源统计
-        resource_stats = statistics_data["resources"]
-        resources_by_type = ResourcesByType(
-            image=resource_stats["image"],
-            video=resource_stats["video"],
-            audio=resource_stats["audio"],
-            file=resource_stats["file"]
-        )
-        total_resources = sum(resource_stats.values())
-        resources = Resources(
-            total=total_resources,
-            byType=resources_by_type,
-            totalSize=0
-        )
+    Args:
+        group_id: 群号
+        start_time: 开始时间
+        end_time: 结束时间
+        include_resources: 是否统计资源数量（需要扫描消息内容）
 
-        statistics = Statistics(
-            totalMessages=total_messages,
-            timeRange=time_range,
-            messageTypes=message_types,
-            senders=senders,
-            resources=resources
-        )
+    Returns:
+        统计信息
+    """
+    nickname_map = await _get_group_member_map(group_id)
+    return await compute_statistics(
+        _group_filters(group_id, start_time, end_time),
+        nickname_map,
+        include_resources=include_resources
+    )
 
-        # 创建导出数据
-        export_data = ExportData(
-            chatInfo=chat_info,
-            statistics=statistics,
-            messages=export_messages
-        )
 
-        # 生成文件名
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"private_{user_id}_{timestamp}.json"
-        output_file = output_path / filename
+async def get_private_statistics(
+    user_id: str,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    include_resources: bool = False
+) -> Statistics:
+    """
+    只计算私聊消息的统计信息，不进行导出
 
-        # 写入文件
-        logger.info(f"Writing export to {output_file}")
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(
-                export_data.model_dump(mode="json"),
-                f,
-                ensure_ascii=False,
-                indent=None,
-                separators=(',', ':')
-            )
+    Args:
+        user_id: 用户ID
+        start_time: 开始时间
+        end_time: 结束时间
+        include_resources: 是否统计资源数量（需要扫描消息内容）
 
-        logger.info(f"Export completed successfully: {output_file}")
-        return str(output_file)
-    
-    except Exception as e:
-        logger.error(f"Failed to export private messages: {type(e).__name__} - {str(e)}", exc_info=True)
-        raise
+    Returns:
+        统计信息
+    """
+    return await compute_statistics(
+        _private_filters(user_id, start_time, end_time),
+        include_resources=include_resources
+    )
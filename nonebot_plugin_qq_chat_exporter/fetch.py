@@ -0,0 +1,508 @@
+"""
+消息拉取：按 (time, id) 键集分页，分批从 chatrecorder 读取消息记录
+"""
+import asyncio
+import logging
+import math
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
+from datetime import datetime
+from typing import Any, Callable, Optional, TypeVar
+
+from nonebot_plugin_chatrecorder import MessageRecord
+from nonebot_plugin_chatrecorder.record import filter_statement
+from nonebot_plugin_orm import get_session
+from nonebot_plugin_uninfo.orm import BotModel, SceneModel, SessionModel, UserModel
+from sqlalchemy import Select, and_, func, or_, select
+
+from .converter import MessageRow
+
+logger = logging.getLogger(__name__)
+
+# 每批拉取的消息条数
+DEFAULT_BATCH_SIZE = 1000
+
+# 分区拉取时每个时间窗口最多预取的批次数
+PARTITION_PREFETCH = 2
+
+# 单条语句中 IN 列表的最大长度，低于 SQLite 旧版本 999 个绑定变量的限制
+MAX_IN_PARAMS = 500
+
+_T = TypeVar("_T")
+
+# 用户名保存在 uninfo 的 user_data JSON 中
+USER_NAME_COLUMN = UserModel.user_data["name"].as_string()
+
+
+class QueryTimings:
+    """
+    按查询类别累计查询次数、返回行数和耗时
+
+    用于定位导出耗时主要花在哪一类查询上
+    """
+
+    def __init__(self):
+        self.entries: dict[str, dict[str, float]] = {}
+
+    def record(self, name: str, elapsed: float, rows: int) -> None:
+        """
+        记录一次查询
+
+        Args:
+            name: 查询类别
+            elapsed: 耗时（秒）
+            rows: 返回行数
+        """
+        entry = self.entries.setdefault(name, {"queries": 0, "rows": 0, "seconds": 0.0})
+        entry["queries"] += 1
+        entry["rows"] += rows
+        entry["seconds"] += elapsed
+        logger.debug(f"Query {name} returned {rows} rows in {elapsed * 1000:.1f} ms")
+
+    def summary(self) -> str:
+        """生成便于写入日志的汇总"""
+        if not self.entries:
+            return "no queries"
+        return ", ".join(
+            f"{name}: {int(e['queries'])} queries, {int(e['rows'])} rows, {e['seconds'] * 1000:.1f} ms"
+            for name, e in self.entries.items()
+        )
+
+
+def chunked(items: Sequence[_T], size: int = MAX_IN_PARAMS) -> Iterator[Sequence[_T]]:
+    """将序列切分为长度不超过 size 的块，用于拆分过长的 IN 列表"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def build_message_statement(*entities: Any, **filters: Any) -> Select:
+    """
+    构建带关联表和筛选条件的消息查询语句
+
+    Args:
+        *entities: 要查询的模型或列
+        **filters: 筛选参数，与 chatrecorder 的 `get_message_records` 相同
+
+    Returns:
+        查询语句
+    """
+    whereclause = filter_statement(**filters)
+    return (
+        select(*entities)
+        .select_from(MessageRecord)
+        .join(SessionModel, SessionModel.id == MessageRecord.session_persist_id)
+        .join(BotModel, BotModel.id == SessionModel.bot_persist_id)
+        .join(SceneModel, SceneModel.id == SessionModel.scene_persist_id)
+        .join(UserModel, UserModel.id == SessionModel.user_persist_id)
+        .where(*whereclause)
+    )
+
+
+async def get_max_record_id(**filters: Any) -> Optional[int]:
+    """
+    获取符合筛选条件的最大消息记录 id
+
+    chatrecorder 的记录 id 自增，新消息写入后该值随之变大，可作为数据水位
+
+    Args:
+        **filters: 筛选参数，与 chatrecorder 的 `get_message_records` 相同
+
+    Returns:
+        最大记录 id，没有记录时返回 None
+    """
+    statement = build_message_statement(func.max(MessageRecord.id), **filters)
+    async with get_session() as db_session:
+        return await db_session.scalar(statement)
+
+
+def _keyset_condition(last_time: datetime, last_id: int):
+    """
+    构建 (time, id) > (last_time, last_id) 的筛选条件
+
+    不使用行值比较，以兼容所有数据库后端
+    """
+    return or_(
+        MessageRecord.time > last_time,
+        and_(MessageRecord.time == last_time, MessageRecord.id > last_id),
+    )
+
+
+async def count_message_records(
+    after: Optional[tuple[datetime, int]] = None,
+    **filters: Any
+) -> int:
+    """
+    统计符合筛选条件的消息记录数
+
+    Args:
+        after: 只统计 (time, id) 在此之后的记录
+        **filters: 筛选参数，与 chatrecorder 的 `get_message_records` 相同
+
+    Returns:
+        记录数
+    """
+    statement = build_message_statement(func.count(MessageRecord.id), **filters)
+    if after is not None:
+        statement = statement.where(_keyset_condition(*after))
+    async with get_session() as db_session:
+        return await db_session.scalar(statement) or 0
+
+
+def _row_key(row: Any) -> tuple[datetime, int]:
+    return row.time, row.id
+
+
+async def _iter_batches(
+    statement: Select,
+    batch_size: int,
+    scalars: bool,
+    key: Callable[[Any], tuple[datetime, int]] = _row_key,
+    timings: Optional[QueryTimings] = None,
+    name: str = "records",
+    after: Optional[tuple[datetime, int]] = None
+) -> AsyncIterator[list[Any]]:
+    """
+    按 (time, id) 键集分页执行查询
+
+    Args:
+        statement: 查询语句
+        batch_size: 每批行数
+        scalars: 是否只取第一列
+        key: 从一行结果中取得 (time, id) 分页键
+        timings: 查询耗时统计
+        name: 记录耗时使用的查询类别
+        after: 只返回 (time, id) 大于该值的行，用于从上次的位置继续
+    """
+    if batch_size <= 0:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+
+    statement = statement.order_by(MessageRecord.time, MessageRecord.id).limit(batch_size)
+    last_key = after
+    total = 0
+
+    while True:
+        page = statement
+        if last_key is not None:
+            page = page.where(_keyset_condition(*last_key))
+
+        # 每一批使用独立的会话，查询结束后即关闭
+        started = time.perf_counter()
+        async with get_session() as db_session:
+            if scalars:
+                rows = list((await db_session.scalars(page)).all())
+            else:
+                rows = list((await db_session.execute(page)).all())
+        if timings is not None:
+            timings.record(name, time.perf_counter() - started, len(rows))
+
+        if not rows:
+            break
+
+        total += len(rows)
+        logger.debug(f"Fetched batch of {len(rows)} rows ({total} total)")
+
+        last_key = key(rows[-1])
+        yield rows
+
+        if len(rows) < batch_size:
+            break
+
+
+async def iter_message_records(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    timings: Optional[QueryTimings] = None,
+    **filters: Any,
+) -> AsyncIterator[list[MessageRecord]]:
+    """
+    按时间顺序分批获取消息记录
+
+    每一批使用独立的数据库会话，查询结束后即关闭，
+    因此内存占用只与批大小有关，与聊天记录总量无关。
+
+    Args:
+        batch_size: 每批消息条数
+        timings: 查询耗时统计
+        **filters: 筛选参数，与 chatrecorder 的 `get_message_records` 相同
+
+    Yields:
+        按 (time, id) 升序排列的消息记录批次
+    """
+    statement = build_message_statement(MessageRecord, **filters)
+    async for records in _iter_batches(
+        statement, batch_size, scalars=True, timings=timings
+    ):
+        yield records
+
+
+def _message_row_statement(**filters: Any) -> Select:
+    """查询 `MessageRow` 各列的语句"""
+    return build_message_statement(
+        MessageRecord.id,
+        MessageRecord.time,
+        MessageRecord.message_id,
+        MessageRecord.type,
+        MessageRecord.message,
+        MessageRecord.session_persist_id,
+        UserModel.user_id,
+        USER_NAME_COLUMN,
+        **filters
+    )
+
+
+async def iter_message_rows(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    timings: Optional[QueryTimings] = None,
+    after: Optional[tuple[datetime, int]] = None,
+    **filters: Any,
+) -> AsyncIterator[list[MessageRow]]:
+    """
+    按时间顺序分批获取转换所需的消息字段
+
+    只查询 `MessageRow` 中的列，不构建 ORM 实体，也不占用会话的 identity map，
+    转换器可以直接使用返回的行。
+
+    Args:
+        batch_size: 每批消息条数
+        timings: 查询耗时统计
+        after: 只返回 (time, id) 大于该值的消息，用于增量导出
+        **filters: 筛选参数，与 chatrecorder 的 `get_message_records` 相同
+
+    Yields:
+        按 (time, id) 升序排列的消息行批次
+    """
+    statement = _message_row_statement(**filters)
+    async for rows in _iter_batches(
+        statement,
+        batch_size,
+        scalars=False,
+        timings=timings,
+        name="message_rows",
+        after=after
+    ):
+        yield [MessageRow._make(row) for row in rows]
+
+
+async def get_time_bounds(
+    after: Optional[tuple[datetime, int]] = None,
+    **filters: Any
+) -> tuple[Optional[datetime], Optional[datetime], int]:
+    """
+    获取符合筛选条件的消息的最早、最晚时间和记录数
+
+    Args:
+        after: 只统计 (time, id) 在此之后的记录
+        **filters: 筛选参数，与 chatrecorder 的 `get_message_records` 相同
+
+    Returns:
+        (最早时间, 最晚时间, 记录数)，没有记录时时间为 None
+    """
+    statement = build_message_statement(
+        func.min(MessageRecord.time),
+        func.max(MessageRecord.time),
+        func.count(MessageRecord.id),
+        **filters
+    )
+    if after is not None:
+        statement = statement.where(_keyset_condition(*after))
+    async with get_session() as db_session:
+        first_time, last_time, count = (await db_session.execute(statement)).one()
+    return first_time, last_time, count or 0
+
+
+def split_time_range(start: datetime, end: datetime, partitions: int) -> list[datetime]:
+    """
+    将 [start, end] 等分为若干个时间窗口
+
+    Args:
+        start: 开始时间
+        end: 结束时间
+        partitions: 窗口数
+
+    Returns:
+        窗口之间的分界点，升序且不重复，窗口数为分界点数加一
+    """
+    if partitions <= 1 or end <= start:
+        return []
+    span = end - start
+    bounds: list[datetime] = []
+    for i in range(1, partitions):
+        bound = start + span * i / partitions
+        # 时间跨度很短时相邻分界点可能相同
+        if bound > start and (not bounds or bound > bounds[-1]):
+            bounds.append(bound)
+    return bounds
+
+
+class _Window:
+    """一个时间窗口的拉取状态"""
+
+    def __init__(self, batches: AsyncIterator[Any], prefetch: int):
+        self.batches = batches
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=prefetch)
+        # 正在执行查询时不能取消，否则可能在查询中途中断数据库连接
+        self.querying = False
+        self.task: Optional[asyncio.Task] = None
+
+
+async def _fetch_window(window: _Window, semaphore: asyncio.Semaphore, stopped: asyncio.Event) -> None:
+    """拉取一个窗口的全部批次放入队列，结束时放入 None，出错时放入异常"""
+    try:
+        async with semaphore:
+            try:
+                while True:
+                    window.querying = True
+                    try:
+                        rows = await window.batches.__anext__()
+                    except StopAsyncIteration:
+                        rows = None
+                    finally:
+                        window.querying = False
+                    if stopped.is_set():
+                        return
+                    await window.queue.put(rows)
+                    if rows is None:
+                        return
+            finally:
+                await window.batches.aclose()
+    except Exception as e:
+        if not stopped.is_set():
+            await window.queue.put(e)
+
+
+async def iter_windows_concurrently(
+    sources: Sequence[AsyncIterator[_T]],
+    parallelism: int,
+    prefetch: int = PARTITION_PREFETCH
+) -> AsyncIterator[_T]:
+    """
+    并发拉取多个有序的数据源，按数据源的顺序依次输出
+
+    同时最多拉取 `parallelism` 个数据源，每个数据源最多预取 `prefetch` 批，
+    前面的数据源输出完毕后才输出后面的，因此内存占用有上限。
+    停止迭代时空闲的拉取任务直接取消，正在查询的任务等查询结束后退出。
+
+    Args:
+        sources: 按顺序排列的数据源
+        parallelism: 同时拉取的数据源数
+        prefetch: 每个数据源最多预取的批次数
+
+    Yields:
+        各数据源的批次
+    """
+    if parallelism <= 0:
+        raise ValueError(f"parallelism must be positive, got {parallelism}")
+
+    # 任务按顺序创建并按顺序获取信号量，当前输出的数据源总能拿到信号量
+    semaphore = asyncio.Semaphore(parallelism)
+    stopped = asyncio.Event()
+    windows = [_Window(source, prefetch) for source in sources]
+    for window in windows:
+        window.task = asyncio.ensure_future(_fetch_window(window, semaphore, stopped))
+
+    try:
+        for window in windows:
+            while True:
+                item = await window.queue.get()
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+    finally:
+        stopped.set()
+        for window in windows:
+            if not window.querying:
+                window.task.cancel()
+        await asyncio.gather(*(window.task for window in windows), return_exceptions=True)
+
+
+async def iter_message_rows_partitioned(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    timings: Optional[QueryTimings] = None,
+    after: Optional[tuple[datetime, int]] = None,
+    parallelism: int = 1,
+    partitions: int = 0,
+    **filters: Any,
+) -> AsyncIterator[list[MessageRow]]:
+    """
+    将时间范围切分为多个窗口并发拉取，按时间顺序输出消息行
+
+    每个窗口在独立的会话中按 (time, id) 键集分页，窗口之间按时间先后拼接，
+    输出顺序与 `iter_message_rows` 相同。时间范围取自符合筛选条件的消息，
+    窗口数不超过总批次数，只有一个窗口时退化为 `iter_message_rows`。
+
+    Args:
+        batch_size: 每批消息条数
+        timings: 查询耗时统计
+        after: 只返回 (time, id) 大于该值的消息，用于增量导出
+        parallelism: 同时拉取的窗口数，为 1 时不切分
+        partitions: 窗口数，为 0 时使用 `parallelism` 的 4 倍，
+            窗口多于并发数时，消息分布不均也能保持每个连接都在工作
+        **filters: 筛选参数，与 chatrecorder 的 `get_message_records` 相同
+
+    Yields:
+        按 (time, id) 升序排列的消息行批次
+    """
+    if batch_size <= 0:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+
+    bounds: list[datetime] = []
+    if parallelism > 1:
+        first_time, last_time, count = await get_time_bounds(after, **filters)
+        if first_time is not None:
+            partitions = min(partitions or parallelism * 4, math.ceil(count / batch_size))
+            bounds = split_time_range(first_time, last_time, partitions)
+
+    if not bounds:
+        async for rows in iter_message_rows(batch_size, timings, after, **filters):
+            yield rows
+        return
+
+    statement = _message_row_statement(**filters)
+    if after is not None:
+        statement = statement.where(_keyset_condition(*after))
+
+    sources = []
+    edges: list[Optional[datetime]] = [None, *bounds, None]
+    for lower, upper in zip(edges, edges[1:]):
+        window = statement
+        if lower is not None:
+            window = window.where(MessageRecord.time >= lower)
+        if upper is not None:
+            window = window.where(MessageRecord.time < upper)
+        sources.append(_iter_batches(
+            window, batch_size, scalars=False, timings=timings, name="message_rows"
+        ))
+
+    logger.debug(f"Fetching {len(sources)} time windows with parallelism {parallelism}")
+    merged = iter_windows_concurrently(sources, parallelism)
+    try:
+        async for rows in merged:
+            yield [MessageRow._make(row) for row in rows]
+    finally:
+        await merged.aclose()
+
+
+async def iter_message_columns(
+    *columns: Any,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    **filters: Any,
+) -> AsyncIterator[list[Any]]:
+    """
+    按时间顺序分批获取消息记录的部分列
+
+    Args:
+        *columns: 要查询的列，除分页所需的 `time` 和 `id` 外按需指定
+        batch_size: 每批行数
+        **filters: 筛选参数，与 chatrecorder 的 `get_message_records` 相同
+
+    Yields:
+        按 (time, id) 升序排列的行批次
+    """
+    statement = build_message_statement(
+        MessageRecord.time, MessageRecord.id, *columns, **filters
+    )
+    async for rows in _iter_batches(
+        statement, batch_size, scalars=False, name="columns"
+    ):
+        yield rows
@@ -0,0 +1,313 @@
+"""
+运行指标：导出各阶段的耗时、导出次数和时长、消息数、写入字节数、任务队列长度和失败次数，
+以 Prometheus 文本格式输出
+"""
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 指标名前缀
+PREFIX = "qq_chat_exporter"
+
+# 单个阶段（通常是一批消息）的耗时分桶（秒）
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# 整个导出的耗时分桶（秒）
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+# 单次导出的消息数分桶
+MESSAGE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# 单次导出的文件大小分桶（字节）
+SIZE_BUCKETS = tuple(1024 ** 2 * n for n in (0.1, 1, 10, 100, 1024, 10 * 1024))
+
+LabelValues = tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(ABC):
+    """指标基类，按标签值分别记录"""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._function: Optional[Callable[[], dict[LabelValues, float]]] = None
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def set_function(self, function: Callable[[], dict[LabelValues, float]]) -> None:
+        """
+        输出时调用 function 获取各标签值对应的数值，代替记录的数值
+
+        Args:
+            function: 返回 {标签值元组: 数值}
+        """
+        self._function = function
+
+    @abstractmethod
+    def _lines(self) -> Iterator[str]:
+        """生成各样本行，不含 HELP 和 TYPE"""
+
+    def render(self) -> str:
+        help_text = self.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+        lines = [f"# HELP {self.name} {help_text}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._lines())
+        return "\n".join(lines)
+
+
+class _ValueMetric(_Metric):
+    """每组标签对应一个数值的指标"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _lines(self) -> Iterator[str]:
+        values = self._function() if self._function is not None else self._values
+        if not values and not self.labelnames:
+            values = {(): 0.0}
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Counter(_ValueMetric):
+    """只增不减的计数"""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counter can only increase")
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_ValueMetric):
+    """可增可减的当前值"""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """按分桶统计观测值的分布"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # 标签值 -> (各分桶计数（非累计）, 总和)
+        self._series: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = ([0] * len(self.buckets), [0.0])
+        counts, total = series
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        total[0] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series is not None else 0
+
+    def _lines(self) -> Iterator[str]:
+        for key, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total[0])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    """指标集合"""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """生成 Prometheus 文本格式"""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+EXPORTS = REGISTRY.register(Counter(
+    f"{PREFIX}_exports_total", "Finished exports by chat type, output format and status",
+    ("chat_type", "format", "status")
+))
+EXPORT_FAILURES = REGISTRY.register(Counter(
+    f"{PREFIX}_export_failures_total", "Failed exports by exception type", ("error",)
+))
+EXPORT_DURATION = REGISTRY.register(Histogram(
+    f"{PREFIX}_export_duration_seconds", "Wall-clock duration of exports",
+    DURATION_BUCKETS, ("chat_type", "status")
+))
+EXPORT_MESSAGES = REGISTRY.register(Histogram(
+    f"{PREFIX}_export_messages", "Messages written per successful export", MESSAGE_BUCKETS
+))
+EXPORT_BYTES = REGISTRY.register(Histogram(
+    f"{PREFIX}_export_bytes", "Output size of successful exports in bytes", SIZE_BUCKETS
+))
+RECORDS = REGISTRY.register(Counter(
+    f"{PREFIX}_records_fetched_total", "Message records fetched from the database"
+))
+MESSAGES = REGISTRY.register(Counter(
+    f"{PREFIX}_messages_written_total", "Messages written to export files"
+))
+BYTES_WRITTEN = REGISTRY.register(Counter(
+    f"{PREFIX}_bytes_written_total", "Bytes written to export files"
+))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    f"{PREFIX}_stage_duration_seconds",
+    "Duration of export stages (member_lookup, statistics, fetch, load_info, convert, serialize, write, finalize), "
+    "usually observed once per batch",
+    STAGE_BUCKETS, ("stage",)
+))
+SCHEDULER_TASKS = REGISTRY.register(Gauge(
+    f"{PREFIX}_scheduler_tasks", "Export tasks waiting in the queue or running", ("state",)
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    f"{PREFIX}_cache_requests_total", "Export result and bot API cache lookups by result", ("cache", "result")
+))
+
+
+def record_stage(stage: str, elapsed: float) -> None:
+    """记录不属于某次导出的阶段耗时"""
+    STAGE_DURATION.observe(elapsed, stage=stage)
+
+
+class ExportMetrics:
+    """
+    单次导出的各阶段耗时和结果
+
+    每个阶段结束时同时计入全局的阶段耗时直方图；
+    `finish` 时记录导出次数、时长、消息数和写入字节数，并输出各阶段耗时的汇总日志。
+    计时从创建时开始，调用方应在获取群成员等准备工作之前创建。
+
+    Args:
+        chat_type: 聊天类型
+        output_format: 导出格式
+    """
+
+    def __init__(self, chat_type: str = "unknown", output_format: str = "json"):
+        self.chat_type = chat_type
+        self.output_format = output_format
+        self.started = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.records = 0
+        self.messages = 0
+        self.bytes_written = 0
+        self.finished = False
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """统计代码块的耗时，出错时同样计入"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def record(self, stage: str, elapsed: float) -> None:
+        """
+        记录一次阶段耗时
+
+        Args:
+            stage: 阶段名称
+            elapsed: 耗时（秒）
+        """
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed
+        STAGE_DURATION.observe(elapsed, stage=stage)
+
+    def summary(self) -> str:
+        """生成便于写入日志的汇总"""
+        if not self.stages:
+            return "no stages"
+        return ", ".join(f"{stage}: {seconds * 1000:.1f} ms" for stage, seconds in self.stages.items())
+
+    def finish(self, status: str, error: Optional[BaseException] = None) -> None:
+        """
+        记录导出结果，重复调用时忽略
+
+        Args:
+            status: "success"、"failed" 或 "cancelled"
+            error: 失败时的异常
+        """
+        if self.finished:
+            return
+        self.finished = True
+        elapsed = time.perf_counter() - self.started
+
+        EXPORTS.inc(chat_type=self.chat_type, format=self.output_format, status=status)
+        EXPORT_DURATION.observe(elapsed, chat_type=self.chat_type, status=status)
+        RECORDS.inc(self.records)
+        MESSAGES.inc(self.messages)
+        BYTES_WRITTEN.inc(self.bytes_written)
+        if status == "success":
+            EXPORT_MESSAGES.observe(self.messages)
+            EXPORT_BYTES.observe(self.bytes_written)
+        elif status == "failed":
+            EXPORT_FAILURES.inc(error=type(error).__name__ if error is not None else "unknown")
+
+        logger.info(
+            f"Export of {self.chat_type} ({self.output_format}) {status} in {elapsed * 1000:.1f} ms: "
+            f"{self.summary()}"
+        )
+
+
+def render_metrics() -> str:
+    """生成全部指标的 Prometheus 文本格式"""
+    return REGISTRY.render()
@@ -0,0 +1,34 @@
+"""
+插件自身的数据库模型
+"""
+from datetime import datetime
+from typing import Any, Optional
+
+from nonebot_plugin_orm import Model
+from sqlalchemy import JSON, TEXT, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class ExportTask(Model):
+    """导出任务"""
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    """ 任务id """
+    chat_type: Mapped[str] = mapped_column(String(16))
+    """ 聊天类型\n\n`group`、`private`，批量导出为 `batch` """
+    chat_id: Mapped[str] = mapped_column(String(64))
+    """ 群号或用户ID\n\n批量导出为聊天数量 """
+    status: Mapped[str] = mapped_column(String(16), index=True)
+    """ 任务状态\n\n`pending`、`processing`、`completed`、`failed` 或 `cancelled` """
+    message: Mapped[str] = mapped_column(TEXT, default="")
+    """ 状态说明 """
+    file_path: Mapped[Optional[str]] = mapped_column(TEXT, nullable=True)
+    """ 导出文件路径 """
+    request: Mapped[dict[str, Any]] = mapped_column(JSON, default=dict)
+    """ 导出请求参数 """
+    created_at: Mapped[datetime] = mapped_column(index=True)
+    """ 创建时间 """
+    updated_at: Mapped[datetime]
+    """ 最后更新时间 """
+    finished_at: Mapped[Optional[datetime]] = mapped_column(nullable=True, index=True)
+    """ 完成或失败的时间\n\n用于清理过期任务 """
@@ -93,7 +93,7 @@ class MessageStats(BaseModel):
     elementCount: int = 0
     resourceCount: int = 0
     textLength: int = 0
-    processingTime: int = 0
+    processingTime: int = 0  # 转换这条消息的耗时（微秒），未开启记录时为 0
 
 
 class ExportMessage(BaseModel):
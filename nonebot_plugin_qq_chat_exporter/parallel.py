@@ -0,0 +1,207 @@
+"""
+多进程转换：将消息行分块交给进程池转换并序列化
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import pickle
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional
+
+import nonebot
+from nonebot import get_driver
+
+from .config import plugin_config
+from .converter import MessageConverter, MessageRow, merge_statistics
+from .segments import SEGMENT_HANDLERS, SegmentSpec, register_segment_handler
+from .serializer import Serializer
+
+logger = logging.getLogger(__name__)
+
+# 工作进程的启动方式。不使用 fork：fork 会复制事件循环、数据库连接和其他线程持有的锁
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+
+
+def segment_handlers_picklable() -> bool:
+    """
+    已注册的消息段处理器能否传给工作进程
+
+    处理器按引用序列化，lambda 和嵌套函数无法在工作进程中导入
+    """
+    try:
+        pickle.dumps(dict(SEGMENT_HANDLERS))
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return False
+    return True
+
+
+def get_executor(workers: int) -> ProcessPoolExecutor:
+    """
+    获取共享的进程池，工作进程数变化时重建
+
+    工作进程是全新的解释器，导入插件包之前先用当前的配置初始化 NoneBot
+
+    Args:
+        workers: 工作进程数
+    """
+    global _executor, _executor_workers
+
+    if _executor is None or _executor_workers != workers:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(START_METHOD),
+            initializer=functools.partial(nonebot.init, **get_driver().config.model_dump())
+        )
+        _executor_workers = workers
+        logger.info(f"Started conversion process pool with {workers} workers ({START_METHOD})")
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """关闭共享进程池"""
+    global _executor, _executor_workers
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        _executor_workers = 0
+
+
+get_driver().on_shutdown(shutdown_executor)
+
+
+def _sync_segment_handlers(handlers: dict[str, SegmentSpec]) -> None:
+    """使工作进程的消息段注册表与主进程一致"""
+    if handlers == SEGMENT_HANDLERS:
+        return
+    SEGMENT_HANDLERS.clear()
+    for segment_type, spec in handlers.items():
+        register_segment_handler(segment_type, spec.handler, spec.resource_type)
+
+
+def _convert_chunk(
+    rows: Sequence[MessageRow],
+    chat_type: str,
+    chat_id: str,
+    nickname_map: dict[str, str],
+    dumps: Serializer,
+    handlers: Optional[dict[str, SegmentSpec]] = None,
+    record_processing_time: bool = False
+) -> tuple[bytes, int, dict[str, dict[str, Any]], dict[str, int]]:
+    """
+    在子进程中转换并序列化一块消息
+
+    Args:
+        handlers: 主进程中注册的消息段处理器，工作进程中不会重新加载注册处理器的其他插件
+        record_processing_time: 是否记录每条消息的转换耗时
+
+    Returns:
+        (以逗号分隔的消息 JSON, 消息条数, 发送者统计, 资源统计)
+    """
+    if handlers is not None:
+        _sync_segment_handlers(handlers)
+    converter = MessageConverter(chat_type, chat_id, nickname_map, record_processing_time=record_processing_time)
+    export_dicts = converter.convert(rows)
+    fragment = b",".join(dumps(d) for d in export_dicts)
+    return fragment, len(export_dicts), converter.sender_stats, converter.resource_totals
+
+
+def split_chunks(rows: Sequence[MessageRow], parts: int) -> list[Sequence[MessageRow]]:
+    """
+    将一批消息尽量均匀地切分为 parts 块，每个工作进程分到一块
+
+    消息数少于 parts 时只切分出消息数块，不产生空块
+
+    Args:
+        rows: 消息行列表
+        parts: 块数
+
+    Returns:
+        保持原始顺序的分块列表
+    """
+    parts = max(1, min(parts, len(rows)))
+    bounds = [len(rows) * i // parts for i in range(parts + 1)]
+    return [rows[start:end] for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+class ParallelConverter:
+    """
+    使用进程池转换一次导出中的消息
+
+    每批消息被切分为若干块并行转换，结果按块的原始顺序返回，
+    统计信息按同样的顺序合并，因此消息顺序和发送者顺序与单进程转换一致。
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        chat_type: str,
+        chat_id: str,
+        nickname_map: dict[str, str],
+        dumps: Serializer,
+        record_processing_time: Optional[bool] = None
+    ):
+        self.workers = workers
+        self.chat_type = chat_type
+        self.chat_id = chat_id
+        self.nickname_map = nickname_map
+        self.dumps = dumps
+        if record_processing_time is None:
+            record_processing_time = plugin_config.qq_chat_exporter_record_processing_time
+        self.record_processing_time = record_processing_time
+        self._executor = get_executor(workers)
+
+    def submit(self, rows: Sequence[MessageRow]) -> list[asyncio.Future]:
+        """
+        提交一批消息，立即返回各块的 Future
+
+        Args:
+            rows: 消息行列表
+        """
+        loop = asyncio.get_running_loop()
+        handlers = dict(SEGMENT_HANDLERS)
+        return [
+            loop.run_in_executor(
+                self._executor,
+                _convert_chunk,
+                chunk,
+                self.chat_type,
+                self.chat_id,
+                self.nickname_map,
+                self.dumps,
+                handlers,
+                self.record_processing_time
+            )
+            for chunk in split_chunks(rows, self.workers)
+        ]
+
+    @staticmethod
+    async def collect(
+        futures: list[asyncio.Future],
+        sender_stats: dict[str, dict[str, Any]],
+        resource_totals: dict[str, int]
+    ) -> list[tuple[bytes, int]]:
+        """
+        等待一批消息转换完成，按顺序合并统计信息
+
+        Args:
+            futures: `submit` 返回的 Future 列表
+            sender_stats: 发送者统计累加器
+            resource_totals: 资源统计累加器
+
+        Returns:
+            按原始顺序排列的 (消息 JSON 片段, 消息条数) 列表
+        """
+        results = await asyncio.gather(*futures)
+        fragments = []
+        for fragment, count, chunk_senders, chunk_resources in results:
+            merge_statistics(sender_stats, resource_totals, chunk_senders, chunk_resources)
+            fragments.append((fragment, count))
+        return fragments
@@ -0,0 +1,210 @@
+"""
+导出进度：导出流程上报各阶段的进度，WebUI 通过 SSE 订阅；
+导出流程同时在每批消息之间检查是否已被取消或超过期限
+"""
+import asyncio
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 导出阶段
+STAGE_QUEUED = "queued"
+STAGE_PREPARING = "preparing"
+STAGE_EXPORTING = "exporting"
+STAGE_FINALIZING = "finalizing"
+STAGE_DONE = "done"
+
+# 同一阶段内两次上报的最小间隔（秒），阶段变化时总是立即上报
+REPORT_INTERVAL = 0.5
+
+# 每个订阅者最多积压的事件数，超出时丢弃最旧的事件；进度事件都是完整快照，丢弃中间事件不影响结果
+SUBSCRIBER_QUEUE_SIZE = 16
+
+
+class ExportCancelled(Exception):
+    """导出被取消"""
+
+
+class ExportTimeout(ExportCancelled):
+    """导出超过期限"""
+
+
+class ExportProgress:
+    """
+    单次导出的进度
+
+    记录当前阶段、已拉取和已转换的记录数、已写入的字节数，
+    并根据已知的记录总数估算吞吐量和剩余时间。
+    每次更新经过节流后以快照的形式交给 `on_update`。
+
+    取消和期限是协作式的：导出流程在每批消息之间调用 `check_cancelled`，
+    不会在数据库查询进行中中断，中止时由写入器清理未完成的文件。
+    批量导出中每个聊天使用以整体进度为 `parent` 的子进度，整体被取消时子导出一并中止。
+    """
+
+    def __init__(
+        self,
+        on_update: Optional[Callable[[dict[str, Any]], None]] = None,
+        parent: Optional["ExportProgress"] = None
+    ):
+        self.on_update = on_update
+        self.parent = parent
+        self.stage = STAGE_QUEUED
+        self.total: Optional[int] = None
+        self.fetched = 0
+        self.converted = 0
+        self.bytes_written = 0
+        self.started_at = time.monotonic()
+        self.timeout: Optional[float] = None
+        self.deadline: Optional[float] = None
+        self.cancelled = False
+        self._reported_at = 0.0
+
+    def set_timeout(self, timeout: Optional[float]) -> None:
+        """
+        从现在开始计算期限
+
+        Args:
+            timeout: 最长执行时间（秒），为空时不限制
+        """
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+
+    def cancel(self) -> None:
+        """请求取消导出，导出流程在处理下一批消息前中止"""
+        self.cancelled = True
+
+    def check_cancelled(self) -> None:
+        """已请求取消或超过期限时抛出 `ExportCancelled` / `ExportTimeout`"""
+        if self.parent is not None:
+            self.parent.check_cancelled()
+        if self.cancelled:
+            raise ExportCancelled("Export cancelled")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise ExportTimeout(f"Export exceeded its deadline of {self.timeout:g} seconds")
+
+    def set_stage(self, stage: str) -> None:
+        """进入新的阶段"""
+        if stage == STAGE_PREPARING:
+            self.started_at = time.monotonic()
+        self.stage = stage
+        self._report(force=True)
+
+    def set_total(self, total: Optional[int]) -> None:
+        """设置需要导出的记录总数"""
+        self.total = total
+
+    def update(
+        self,
+        fetched: Optional[int] = None,
+        converted: Optional[int] = None,
+        bytes_written: Optional[int] = None
+    ) -> None:
+        """
+        更新计数
+
+        Args:
+            fetched: 已拉取的记录数
+            converted: 已转换的记录数
+            bytes_written: 已写入的字节数
+        """
+        if fetched is not None:
+            self.fetched = fetched
+        if converted is not None:
+            self.converted = converted
+        if bytes_written is not None:
+            self.bytes_written = bytes_written
+        self._report()
+
+    def snapshot(self) -> dict[str, Any]:
+        """生成当前进度的快照"""
+        elapsed = time.monotonic() - self.started_at if self.stage != STAGE_QUEUED else 0.0
+        throughput = self.converted / elapsed if elapsed > 0 else 0.0
+        eta: Optional[float] = None
+        if self.total is not None and throughput > 0:
+            eta = max(self.total - self.converted, 0) / throughput
+        return {
+            "stage": self.stage,
+            "total": self.total,
+            "fetched": self.fetched,
+            "converted": self.converted,
+            "bytes_written": self.bytes_written,
+            "elapsed": round(elapsed, 3),
+            "throughput": round(throughput, 1),
+            "eta": round(eta, 1) if eta is not None else None,
+        }
+
+    def _report(self, force: bool = False) -> None:
+        if self.on_update is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._reported_at < REPORT_INTERVAL:
+            return
+        self._reported_at = now
+        try:
+            self.on_update(self.snapshot())
+        except Exception as e:
+            logger.warning(f"Failed to report export progress: {e}")
+
+
+class ProgressHub:
+    """
+    按任务分发进度事件
+
+    保留每个未结束任务的最新事件，新订阅者先收到最新事件再接收后续事件。
+    任务结束后清除其最新事件。
+    """
+
+    def __init__(self):
+        self._latest: dict[str, dict[str, Any]] = {}
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+
+    def latest(self, task_id: str) -> Optional[dict[str, Any]]:
+        """获取任务的最新事件"""
+        return self._latest.get(task_id)
+
+    def publish(self, task_id: str, event: dict[str, Any], finished: bool = False) -> None:
+        """
+        发布事件
+
+        Args:
+            task_id: 任务id
+            event: 事件内容
+            finished: 是否为任务的最后一个事件
+        """
+        if finished:
+            self._latest.pop(task_id, None)
+        else:
+            self._latest[task_id] = event
+
+        for queue in self._subscribers.get(task_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    @contextmanager
+    def subscribe(self, task_id: str) -> Iterator[asyncio.Queue]:
+        """
+        订阅任务的事件
+
+        用法:
+            with progress_hub.subscribe(task_id) as queue:
+                event = await queue.get()
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(task_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(task_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[task_id]
+
+
+progress_hub = ProgressHub()
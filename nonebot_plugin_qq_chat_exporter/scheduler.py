@@ -0,0 +1,290 @@
+"""
+导出任务调度：限制同时执行的导出数量，其余任务按优先级排队
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+from collections.abc import Awaitable, Hashable
+from typing import Any, Callable, Optional
+
+from nonebot import get_driver
+
+from .config import plugin_config
+from .progress import ExportCancelled, ExportProgress, ExportTimeout, ProgressHub, progress_hub
+from .tasks import (
+    FINISHED_STATUSES,
+    TASK_CANCELLED,
+    TASK_COMPLETED,
+    TASK_FAILED,
+    TASK_PENDING,
+    TASK_PROCESSING,
+    task_store,
+)
+
+logger = logging.getLogger(__name__)
+
+# 导出任务的执行函数，接收进度对象，返回 (导出文件路径, 状态说明)
+ExportRunner = Callable[[ExportProgress], Awaitable[tuple[str, str]]]
+
+
+class ExportJob:
+    """
+    一次实际执行的导出
+
+    相同的导出请求共享同一个 job，job 结束时所有关联的任务一起更新
+    """
+
+    def __init__(
+        self,
+        key: Hashable,
+        runner: ExportRunner,
+        priority: int,
+        seq: int,
+        timeout: Optional[float] = None
+    ):
+        self.key = key
+        self.runner = runner
+        self.priority = priority
+        self.seq = seq
+        self.timeout = timeout
+        self.task_ids: list[str] = []
+        self.running = False
+        self.progress = ExportProgress()
+
+    @property
+    def sort_key(self) -> tuple[int, int]:
+        """优先级高的先执行，优先级相同时先提交的先执行"""
+        return -self.priority, self.seq
+
+
+class ExportScheduler:
+    """
+    导出任务调度器
+
+    同时最多执行 `max_workers` 个导出，其余导出按优先级和提交顺序排队。
+    键相同的导出在排队或执行期间再次提交时不会重复执行，新任务直接挂到已有的 job 上。
+    任务状态和导出进度的变化以事件的形式发布到 `hub`，所有挂在同一 job 上的任务都会收到。
+    取消任务时只有在 job 上不再挂有其他任务时才会取消导出本身，超过期限的导出被中止并标记为失败。
+    取消和期限都在导出流程处理下一批消息前生效。
+    """
+
+    def __init__(self, max_workers: int, store: Any = task_store, hub: Optional[ProgressHub] = None):
+        self.max_workers = max(1, max_workers)
+        self.store = store
+        self.hub = hub if hub is not None else progress_hub
+        self._seq = itertools.count()
+        self._queue: list[tuple[tuple[int, int], ExportJob]] = []
+        self._jobs: dict[Hashable, ExportJob] = {}
+        self._task_jobs: dict[str, ExportJob] = {}
+        self._running: dict[ExportJob, asyncio.Task] = {}
+
+    def __contains__(self, task_id: str) -> bool:
+        """任务是否在排队或执行中"""
+        return task_id in self._task_jobs
+
+    @property
+    def running_count(self) -> int:
+        return len(self._running)
+
+    @property
+    def queued_count(self) -> int:
+        return len(self._queue)
+
+    async def submit(
+        self,
+        task_id: str,
+        key: Hashable,
+        runner: ExportRunner,
+        priority: int = 0,
+        timeout: Optional[float] = None
+    ) -> ExportJob:
+        """
+        提交导出任务
+
+        Args:
+            task_id: 任务id
+            key: 导出键，键相同的导出会合并执行
+            runner: 执行导出的函数
+            priority: 优先级，数值越大越先执行
+            timeout: 导出的最长执行时间（秒），为空时不限制
+
+        Returns:
+            任务所属的 job
+        """
+        job = self._jobs.get(key)
+        if job is not None:
+            job.task_ids.append(task_id)
+            self._task_jobs[task_id] = job
+            if not job.running:
+                # 合并后的 job 按最宽松的期限执行
+                job.timeout = None if job.timeout is None or timeout is None else max(job.timeout, timeout)
+            if not job.running and priority > job.priority:
+                # 合并后的 job 按最高的优先级排队
+                job.priority = priority
+                self._queue = [(j.sort_key, j) for _, j in self._queue]
+                heapq.heapify(self._queue)
+            logger.info(f"Task {task_id} joined in-flight export {key}")
+            if job.running:
+                await self.store.update(task_id, status=TASK_PROCESSING, message="正在导出")
+                self._publish(job, task_id, TASK_PROCESSING, "正在导出")
+            else:
+                self._publish_queued()
+            return job
+
+        job = ExportJob(key, runner, priority, next(self._seq), timeout)
+        job.task_ids.append(task_id)
+        job.progress.on_update = lambda snapshot: self._publish_progress(job)
+        self._jobs[key] = job
+        self._task_jobs[task_id] = job
+        heapq.heappush(self._queue, (job.sort_key, job))
+        self._dispatch()
+        self._publish_queued()
+        return job
+
+    def queue_position(self, task_id: str) -> Optional[int]:
+        """
+        获取任务在队列中的位置
+
+        Args:
+            task_id: 任务id
+
+        Returns:
+            从 1 开始的排队位置，任务正在执行或不在队列中时返回 None
+        """
+        job = self._task_jobs.get(task_id)
+        if job is None or job.running:
+            return None
+        return sum(1 for sort_key, _ in self._queue if sort_key <= job.sort_key)
+
+    async def cancel(self, task_id: str) -> bool:
+        """
+        取消任务
+
+        任务从所属的 job 上移除；job 上没有其他任务时，排队中的 job 移出队列，
+        执行中的导出在处理下一批消息前中止，未完成的导出文件由写入器清理
+
+        Args:
+            task_id: 任务id
+
+        Returns:
+            任务在排队或执行中并已取消时返回 True
+        """
+        job = self._task_jobs.pop(task_id, None)
+        if job is None:
+            return False
+
+        job.task_ids.remove(task_id)
+        if not job.task_ids:
+            # 之后再提交的相同请求不再挂到正在中止的 job 上，而是重新导出
+            self._jobs.pop(job.key, None)
+            if job.running:
+                logger.info(f"Cancelling running export {job.key}")
+                job.progress.cancel()
+            else:
+                self._queue = [(sort_key, j) for sort_key, j in self._queue if j is not job]
+                heapq.heapify(self._queue)
+                self._publish_queued()
+
+        if await self.store.update(task_id, status=TASK_CANCELLED, message="任务已取消") is None:
+            # 任务已经结束
+            return False
+        self._publish(job, task_id, TASK_CANCELLED, "任务已取消")
+        logger.info(f"Task {task_id} cancelled")
+        return True
+
+    def _publish(
+        self,
+        job: ExportJob,
+        task_id: str,
+        status: str,
+        message: str,
+        file_path: Optional[str] = None
+    ) -> None:
+        """发布任务事件，包含状态、排队位置和导出进度"""
+        finished = status in FINISHED_STATUSES
+        self.hub.publish(task_id, {
+            "task_id": task_id,
+            "status": status,
+            "message": message,
+            "file_path": file_path,
+            "queue_position": None if finished else self.queue_position(task_id),
+            "progress": job.progress.snapshot(),
+        }, finished=finished)
+
+    def _publish_queued(self) -> None:
+        """排队位置变化后通知所有排队中的任务"""
+        for _, job in self._queue:
+            for task_id in job.task_ids:
+                self._publish(job, task_id, TASK_PENDING, "排队中")
+
+    def _publish_progress(self, job: ExportJob) -> None:
+        for task_id in job.task_ids:
+            self._publish(job, task_id, TASK_PROCESSING, "正在导出")
+
+    def _dispatch(self) -> None:
+        """在有空闲名额时启动排队的导出"""
+        while self._queue and len(self._running) < self.max_workers:
+            _, job = heapq.heappop(self._queue)
+            job.running = True
+            self._running[job] = asyncio.create_task(self._run(job))
+
+    async def _run(self, job: ExportJob) -> None:
+        try:
+            try:
+                for task_id in list(job.task_ids):
+                    await self.store.update(task_id, status=TASK_PROCESSING, message="正在导出")
+                self._publish_progress(job)
+                job.progress.set_timeout(job.timeout)
+                file_path, message = await job.runner(job.progress)
+                values = {"status": TASK_COMPLETED, "file_path": file_path, "message": message}
+            except asyncio.CancelledError:
+                raise
+            except ExportTimeout:
+                logger.warning(f"Export {job.key} exceeded its deadline of {job.timeout:g} seconds")
+                values = {"status": TASK_FAILED, "message": f"导出超时: 超过 {job.timeout:g} 秒"}
+            except ExportCancelled:
+                # 只有 job 上的任务都已取消时才会中止导出，没有需要更新的任务
+                logger.info(f"Export {job.key} cancelled")
+                values = {"status": TASK_CANCELLED, "message": "任务已取消"}
+            except Exception as e:
+                logger.error(f"Export {job.key} failed: {type(e).__name__} - {str(e)}", exc_info=True)
+                values = {"status": TASK_FAILED, "message": f"导出失败: {type(e).__name__} - {str(e)}"}
+            finally:
+                # 先移除 job，结束后再提交的相同请求会重新导出；
+                # job 被取消后相同的键可能已经对应新的 job
+                if self._jobs.get(job.key) is job:
+                    del self._jobs[job.key]
+                self._running.pop(job, None)
+                self._dispatch()
+                self._publish_queued()
+
+            # 更新期间任务可能被取消，遍历副本；已取消的任务不会被更新
+            for task_id in list(job.task_ids):
+                if await self.store.update(task_id, **values) is None:
+                    continue
+                self._publish(
+                    job, task_id, values["status"], values["message"], values.get("file_path")
+                )
+        finally:
+            # 任务在最终状态写入后才移出调度器，订阅者据此判断任务是否还会有事件
+            for task_id in job.task_ids:
+                self._task_jobs.pop(task_id, None)
+
+    async def shutdown(self) -> None:
+        """取消正在执行的导出并清空队列"""
+        self._queue.clear()
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+export_scheduler = ExportScheduler(plugin_config.qq_chat_exporter_max_workers)
+
+driver = get_driver()
+
+
+@driver.on_shutdown
+async def _stop_export_scheduler() -> None:
+    await export_scheduler.shutdown()
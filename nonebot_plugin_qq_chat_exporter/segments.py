@@ -0,0 +1,138 @@
+"""
+消息段处理器：按消息段类型分派，生成纯文本并登记资源
+
+其他插件可以通过 `register_segment_handler` 为新的消息段类型注册处理器，
+或覆盖内置类型的处理方式：
+
+    from nonebot_plugin_qq_chat_exporter import register_segment_handler
+
+    @register_segment_handler("mface")
+    def _(data: dict) -> str:
+        return f"[{data.get('summary', '商城表情')}]"
+
+启用多进程转换时，每批消息都会把当前的注册表传给转换进程，处理器需要是可以按名称导入的模块级函数，
+不能是 lambda 或嵌套函数，否则回退为在当前进程中转换。
+"""
+from typing import Any, Callable, NamedTuple, Optional
+
+# 消息段处理器：接收消息段的 data 字典，返回该消息段对应的纯文本
+SegmentHandler = Callable[[dict[str, Any]], str]
+
+# 资源统计中的资源类型，与 ResourcesByType 的字段一致
+RESOURCE_TYPES = ("image", "video", "audio", "file")
+
+
+class SegmentSpec(NamedTuple):
+    """已注册的消息段处理方式"""
+    handler: SegmentHandler
+    resource_type: Optional[str]
+
+
+# 消息段类型 -> 处理方式
+SEGMENT_HANDLERS: dict[str, SegmentSpec] = {}
+
+# 计入资源统计的消息段类型 -> 资源类型，随注册表同步更新
+RESOURCE_SEGMENT_TYPES: dict[str, str] = {}
+
+
+def register_segment_handler(
+    segment_type: str,
+    handler: Optional[SegmentHandler] = None,
+    resource_type: Optional[str] = None
+):
+    """
+    注册消息段处理器
+
+    可以直接调用，也可以作为装饰器使用。重复注册同一类型时覆盖之前的处理器。
+
+    Args:
+        segment_type: 消息段类型
+        handler: 处理器，接收消息段的 data 字典，返回纯文本
+        resource_type: 资源类型 (image/video/audio/file)，为空表示不计入资源
+
+    Returns:
+        直接调用时返回 handler，作为装饰器使用时返回装饰器
+    """
+    if resource_type is not None and resource_type not in RESOURCE_TYPES:
+        raise ValueError(
+            f"Invalid resource type {resource_type!r}, expected one of {', '.join(RESOURCE_TYPES)}"
+        )
+
+    def decorator(func: SegmentHandler) -> SegmentHandler:
+        SEGMENT_HANDLERS[segment_type] = SegmentSpec(func, resource_type)
+        if resource_type is None:
+            RESOURCE_SEGMENT_TYPES.pop(segment_type, None)
+        else:
+            RESOURCE_SEGMENT_TYPES[segment_type] = resource_type
+        return func
+
+    if handler is None:
+        return decorator
+    return decorator(handler)
+
+
+def unregister_segment_handler(segment_type: str) -> None:
+    """
+    移除消息段处理器，之后该类型按未知消息段处理
+
+    Args:
+        segment_type: 消息段类型
+    """
+    SEGMENT_HANDLERS.pop(segment_type, None)
+    RESOURCE_SEGMENT_TYPES.pop(segment_type, None)
+
+
+def render_unknown_segment(segment_type: str) -> str:
+    """未注册消息段的纯文本"""
+    return f"[{segment_type}]"
+
+
+# 内置处理器
+
+@register_segment_handler("text")
+def _text(data: dict[str, Any]) -> str:
+    return data.get("text", "")
+
+
+@register_segment_handler("face")
+def _face(data: dict[str, Any]) -> str:
+    return f"[表情{data.get('id', '')}]"
+
+
+@register_segment_handler("image", resource_type="image")
+def _image(data: dict[str, Any]) -> str:
+    return "[图片]"
+
+
+@register_segment_handler("video", resource_type="video")
+def _video(data: dict[str, Any]) -> str:
+    return "[视频]"
+
+
+@register_segment_handler("audio", resource_type="audio")
+@register_segment_handler("record", resource_type="audio")
+def _audio(data: dict[str, Any]) -> str:
+    return "[语音]"
+
+
+@register_segment_handler("file", resource_type="file")
+def _file(data: dict[str, Any]) -> str:
+    return f"[文件: {data.get('file', '')}]"
+
+
+@register_segment_handler("at")
+def _at(data: dict[str, Any]) -> str:
+    qq = data.get("qq", "")
+    if qq == "all":
+        return "@全体成员"
+    return f"@{qq}"
+
+
+@register_segment_handler("reply")
+def _reply(data: dict[str, Any]) -> str:
+    return "[回复]"
+
+
+@register_segment_handler("forward")
+def _forward(data: dict[str, Any]) -> str:
+    return "[转发消息]"
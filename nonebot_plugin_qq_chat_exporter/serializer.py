@@ -0,0 +1,69 @@
+"""
+JSON 序列化后端：优先使用 orjson，未安装时回退到标准库
+"""
+import json
+import logging
+from typing import Any, Callable, Optional
+
+from .config import plugin_config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 取决于运行环境
+    orjson = None
+
+# 序列化函数：对象 -> UTF-8 编码的紧凑 JSON
+Serializer = Callable[[Any], bytes]
+
+JSON_BACKENDS = ("auto", "orjson", "json")
+
+
+def dumps_stdlib(data: Any) -> bytes:
+    """
+    使用标准库序列化为紧凑 JSON
+
+    与 `json.dump(..., ensure_ascii=False, separators=(',', ':'))` 的输出一致
+    """
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_orjson(data: Any) -> bytes:
+    """
+    使用 orjson 序列化为紧凑 JSON
+
+    输出与标准库等价，仅科学计数法浮点数的写法不同（如 `1e-7` 与 `1e-07`）。
+    orjson 无法处理的数据（如超过 64 位的整数）回退到标准库。
+    """
+    try:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        return dumps_stdlib(data)
+
+
+def get_serializer(backend: Optional[str] = None) -> Serializer:
+    """
+    根据配置选择序列化后端
+
+    Args:
+        backend: "auto"、"orjson" 或 "json"，为空时使用插件配置
+
+    Returns:
+        序列化函数
+    """
+    if backend is None:
+        backend = plugin_config.qq_chat_exporter_json_backend
+
+    if backend not in JSON_BACKENDS:
+        raise ValueError(f"Invalid JSON backend: {backend}, expected one of {JSON_BACKENDS}")
+
+    if backend == "json":
+        return dumps_stdlib
+
+    if orjson is None:
+        if backend == "orjson":
+            logger.warning("orjson is not installed, falling back to stdlib json")
+        return dumps_stdlib
+
+    return dumps_orjson
@@ -0,0 +1,192 @@
+"""
+统计服务：在数据库侧计算发送者、时间范围等统计信息
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Any, Optional
+
+from nonebot_plugin_chatrecorder import MessageRecord
+from nonebot_plugin_orm import get_session
+from nonebot_plugin_uninfo.orm import UserModel
+from sqlalchemy import func
+
+from .converter import build_statistics, count_resources, format_timestamp, new_resource_stats
+from .fetch import (
+    DEFAULT_BATCH_SIZE,
+    USER_NAME_COLUMN,
+    build_message_statement,
+    iter_message_columns,
+)
+from .models import (
+    MessageTypes,
+    Resources,
+    ResourcesByType,
+    SenderStats,
+    Statistics,
+    TimeRange,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _truncate_to_milliseconds(dt: datetime) -> datetime:
+    """与导出时间戳的精度保持一致"""
+    return dt.replace(microsecond=dt.microsecond // 1000 * 1000)
+
+
+def build_time_range(
+    first_time: Optional[datetime],
+    last_time: Optional[datetime]
+) -> TimeRange:
+    """
+    根据第一条和最后一条消息的时间构建时间范围
+
+    Args:
+        first_time: 第一条消息时间
+        last_time: 最后一条消息时间
+
+    Returns:
+        时间范围
+    """
+    if first_time is None or last_time is None:
+        return TimeRange()
+
+    dt_first = _truncate_to_milliseconds(first_time)
+    dt_last = _truncate_to_milliseconds(last_time)
+    return TimeRange(
+        start=format_timestamp(dt_first),
+        end=format_timestamp(dt_last),
+        durationDays=(dt_last - dt_first).days
+    )
+
+
+def build_statistics_model(
+    total_messages: int,
+    time_range: TimeRange,
+    statistics_data: dict[str, Any]
+) -> Statistics:
+    """
+    根据统计字典构建统计信息模型
+
+    Args:
+        total_messages: 消息总数
+        time_range: 时间范围
+        statistics_data: `build_statistics` 返回的统计字典
+
+    Returns:
+        统计信息
+    """
+    message_types = MessageTypes(unknown=total_messages)
+
+    # 转换发送者统计
+    senders = [
+        SenderStats(
+            uid=s["uid"],
+            name=s["name"],
+            messageCount=s["messageCount"],
+            percentage=s["percentage"]
+        )
+        for s in statistics_data["senders"]
+    ]
+
+    # 创建资源统计
+    resource_stats = statistics_data["resources"]
+    resources_by_type = ResourcesByType(
+        image=resource_stats["image"],
+        video=resource_stats["video"],
+        audio=resource_stats["audio"],
+        file=resource_stats["file"]
+    )
+    total_resources = sum(resource_stats.values())
+    resources = Resources(
+        total=total_resources,
+        byType=resources_by_type,
+        totalSize=0
+    )
+
+    return Statistics(
+        totalMessages=total_messages,
+        timeRange=time_range,
+        messageTypes=message_types,
+        senders=senders,
+        resources=resources
+    )
+
+
+async def compute_statistics(
+    filters: dict[str, Any],
+    nickname_map: Optional[dict[str, str]] = None,
+    include_resources: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> Statistics:
+    """
+    通过 GROUP BY / MIN / MAX 查询计算统计信息，无需转换消息
+
+    发送者按首次发言时间排序。资源数量需要读取消息内容，
+    仅在 `include_resources` 为真时分批扫描 message 列统计。
+
+    Args:
+        filters: chatrecorder 筛选参数
+        nickname_map: 用户昵称映射 {user_id: nickname}
+        include_resources: 是否统计资源数量
+        batch_size: 统计资源时每批读取的行数
+
+    Returns:
+        统计信息
+    """
+    nickname_map = nickname_map or {}
+    started = time.perf_counter()
+
+    first_seen = func.min(MessageRecord.time)
+    statement = (
+        build_message_statement(
+            UserModel.user_id,
+            func.max(USER_NAME_COLUMN),
+            func.count(MessageRecord.id),
+            first_seen,
+            func.max(MessageRecord.time),
+            **filters
+        )
+        .group_by(UserModel.user_id)
+        .order_by(first_seen, UserModel.user_id)
+    )
+    async with get_session() as db_session:
+        rows = (await db_session.execute(statement)).all()
+
+    sender_stats: dict[str, dict[str, Any]] = {}
+    total_messages = 0
+    first_time: Optional[datetime] = None
+    last_time: Optional[datetime] = None
+    for user_id, user_name, message_count, user_first, user_last in rows:
+        sender_uid = f"u_{user_id}"
+        sender_stats[sender_uid] = {
+            "uid": sender_uid,
+            "name": nickname_map.get(str(user_id)) or user_name or "",
+            "messageCount": message_count
+        }
+        total_messages += message_count
+        if first_time is None or user_first < first_time:
+            first_time = user_first
+        if last_time is None or user_last > last_time:
+            last_time = user_last
+
+    resource_totals = new_resource_stats()
+    if include_resources:
+        async for batch in iter_message_columns(
+            MessageRecord.message, batch_size=batch_size, **filters
+        ):
+            for row in batch:
+                if isinstance(row.message, list):
+                    count_resources(row.message, resource_totals)
+
+    logger.info(
+        f"Computed statistics for {total_messages} messages "
+        f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+    )
+
+    return build_statistics_model(
+        total_messages,
+        build_time_range(first_time, last_time),
+        build_statistics(sender_stats, resource_totals)
+    )
@@ -0,0 +1,191 @@
+"""
+流式导出：逐批拉取、转换消息并直接生成导出内容的字节流，不写入磁盘
+"""
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from .compression import StreamCompressor, compressed_path, normalize_compression
+from .converter import MessageConverter, MessageRow
+from .exporter import _get_group_member_map, _get_group_name, _group_filters, _private_filters
+from .fetch import DEFAULT_BATCH_SIZE, QueryTimings, iter_message_rows
+from .models import ChatInfo
+from .serializer import get_serializer
+from .statistics import build_statistics_model, build_time_range
+from .writer import ExportStreamEncoder
+
+logger = logging.getLogger(__name__)
+
+# 客户端断开后等待当前查询结束再关闭游标的后台任务，保留引用避免被回收
+_closing_tasks: set[asyncio.Task] = set()
+
+
+async def _next_batch(rows: AsyncIterator[list[MessageRow]]) -> Optional[list[MessageRow]]:
+    """取下一批消息，没有更多消息时返回 None"""
+    try:
+        return await rows.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def _close_after(fetch: asyncio.Future, rows: AsyncIterator[list[MessageRow]]) -> None:
+    """等正在进行的查询结束后再关闭分页迭代器"""
+    try:
+        await fetch
+    except BaseException:
+        pass
+    await rows.aclose()
+
+
+class ExportStream:
+    """
+    不落盘的导出字节流
+
+    先输出 metadata 和 chatInfo，之后每拉取一批消息就输出一段，
+    全部消息输出后再输出统计信息，因此 statistics 位于 messages 之后。
+    指定压缩方式时每段数据压缩后立即输出。
+
+    客户端断开时响应被取消，取消不会打断正在进行的数据库查询：
+    查询在后台完成后再关闭游标，避免在查询中途中断数据库连接。
+
+    用法:
+        stream = await open_export_stream("group", "123456")
+        async for chunk in stream:
+            ...
+    """
+
+    def __init__(
+        self,
+        chat_type: str,
+        chat_id: str,
+        chat_name: str,
+        filters: dict[str, Any],
+        nickname_map: dict[str, str],
+        batch_size: int,
+        compression: Optional[str]
+    ):
+        self.chat_type = chat_type
+        self.chat_id = chat_id
+        self.chat_name = chat_name
+        self.filters = filters
+        self.nickname_map = nickname_map
+        self.batch_size = batch_size
+        self.compression = compression
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.filename = compressed_path(
+            Path(f"{chat_type}_{chat_id}_{timestamp}.json"), compression
+        ).name
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._generate()
+
+    async def _generate(self) -> AsyncIterator[bytes]:
+        started = time.perf_counter()
+        converter = MessageConverter(self.chat_type, self.chat_id, self.nickname_map)
+        encoder = ExportStreamEncoder(
+            ChatInfo(name=self.chat_name, type=self.chat_type), dumps=get_serializer()
+        )
+        compressor = StreamCompressor(self.compression) if self.compression else None
+
+        def encode(data: bytes) -> bytes:
+            return compressor.compress(data) if compressor is not None else data
+
+        logger.info(f"Streaming export for {self.chat_type} {self.chat_id}")
+        # 在第一次查询前先输出头部，缩短首字节时间
+        yield encode(encoder.header())
+
+        timings = QueryTimings()
+        rows_iter = iter_message_rows(batch_size=self.batch_size, timings=timings, **self.filters)
+        first_time: Optional[datetime] = None
+        last_time: Optional[datetime] = None
+        fetched = 0
+        try:
+            while True:
+                fetch = asyncio.ensure_future(_next_batch(rows_iter))
+                try:
+                    rows = await asyncio.shield(fetch)
+                except asyncio.CancelledError:
+                    logger.info(f"Client disconnected from streaming export for {self.chat_type} {self.chat_id}")
+                    task = asyncio.create_task(_close_after(fetch, rows_iter))
+                    _closing_tasks.add(task)
+                    task.add_done_callback(_closing_tasks.discard)
+                    rows_iter = None
+                    raise
+                if rows is None:
+                    break
+
+                fetched += len(rows)
+                if rows:
+                    if first_time is None:
+                        first_time = rows[0].time
+                    last_time = rows[-1].time
+                fragment = encoder.encode_messages(converter.convert(rows))
+                if fragment:
+                    yield encode(fragment)
+        finally:
+            if rows_iter is not None:
+                await rows_iter.aclose()
+
+        statistics = build_statistics_model(
+            encoder.message_count,
+            build_time_range(first_time, last_time),
+            converter.statistics()
+        )
+        tail = encode(encoder.tail(statistics))
+        if compressor is not None:
+            tail += compressor.finish()
+        yield tail
+
+        logger.info(
+            f"Streamed {encoder.message_count} of {fetched} records for {self.chat_type} {self.chat_id} "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms ({timings.summary()})"
+        )
+
+
+async def open_export_stream(
+    chat_type: str,
+    chat_id: str,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    compression: Optional[str] = None
+) -> ExportStream:
+    """
+    准备不落盘的流式导出
+
+    参数在这里校验，群名称和成员昵称也在这里获取，
+    因此出错时可以在开始发送响应前返回错误。
+
+    Args:
+        chat_type: 聊天类型 ("group" or "private")
+        chat_id: 群号或用户ID
+        start_time: 开始时间
+        end_time: 结束时间
+        batch_size: 每批拉取的消息条数
+        compression: 压缩方式 ("none", "gzip" or "zstd")，为空表示不压缩
+
+    Returns:
+        导出字节流，迭代时才开始查询
+    """
+    compression = normalize_compression(compression)
+    if batch_size <= 0:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+
+    if chat_type == "group":
+        nickname_map = await _get_group_member_map(chat_id)
+        chat_name = await _get_group_name(chat_id) or f"Group {chat_id}"
+        filters = _group_filters(chat_id, start_time, end_time)
+    elif chat_type == "private":
+        nickname_map = {}
+        chat_name = f"User {chat_id}"
+        filters = _private_filters(chat_id, start_time, end_time)
+    else:
+        raise ValueError(f"Invalid chat_type: {chat_type}")
+
+    return ExportStream(
+        chat_type, chat_id, chat_name, filters, nickname_map, batch_size, compression
+    )
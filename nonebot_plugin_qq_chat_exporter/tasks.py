@@ -0,0 +1,302 @@
+"""
+导出任务存储：任务保存在数据库中，内存中只保留最近访问的少量任务
+"""
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from nonebot import get_driver
+from nonebot_plugin_orm import get_session
+from pydantic import BaseModel
+from sqlalchemy import delete, func, select, update
+
+from .config import plugin_config
+from .model import ExportTask
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+TASK_PENDING = "pending"
+TASK_PROCESSING = "processing"
+TASK_COMPLETED = "completed"
+TASK_FAILED = "failed"
+TASK_CANCELLED = "cancelled"
+FINISHED_STATUSES = (TASK_COMPLETED, TASK_FAILED, TASK_CANCELLED)
+
+# 清理过期任务的间隔（秒）
+CLEANUP_INTERVAL = 3600
+
+
+class TaskInfo(BaseModel):
+    """导出任务信息"""
+    id: str
+    chat_type: str
+    chat_id: str
+    status: str
+    message: str = ""
+    file_path: Optional[str] = None
+    request: dict[str, Any] = {}
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+
+    @classmethod
+    def from_model(cls, task: ExportTask) -> "TaskInfo":
+        return cls(
+            id=task.id,
+            chat_type=task.chat_type,
+            chat_id=task.chat_id,
+            status=task.status,
+            message=task.message,
+            file_path=task.file_path,
+            request=task.request or {},
+            created_at=task.created_at,
+            updated_at=task.updated_at,
+            finished_at=task.finished_at
+        )
+
+
+class TaskStore:
+    """
+    导出任务仓库
+
+    所有任务写入数据库，重启后仍可查询；内存中以 LRU 方式缓存最近访问的任务，
+    状态查询在缓存命中时不访问数据库，内存占用不随任务数量增长。
+    已结束的任务超过保留时间后被定期清理。
+    """
+
+    def __init__(self, cache_size: int, ttl: int):
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self._cache: OrderedDict[str, TaskInfo] = OrderedDict()
+
+    def _remember(self, task: TaskInfo) -> TaskInfo:
+        self._cache[task.id] = task
+        self._cache.move_to_end(task.id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return task
+
+    async def create(self, chat_type: str, chat_id: str, request: dict[str, Any]) -> TaskInfo:
+        """
+        创建任务
+
+        Args:
+            chat_type: 聊天类型
+            chat_id: 群号或用户ID
+            request: 导出请求参数
+
+        Returns:
+            新任务
+        """
+        now = datetime.now()
+        task = TaskInfo(
+            id=str(uuid.uuid4()),
+            chat_type=chat_type,
+            chat_id=chat_id,
+            status=TASK_PENDING,
+            message="任务已创建",
+            request=request,
+            created_at=now,
+            updated_at=now
+        )
+        async with get_session() as db_session:
+            db_session.add(ExportTask(**task.model_dump()))
+            await db_session.commit()
+        return self._remember(task)
+
+    async def get(self, task_id: str) -> Optional[TaskInfo]:
+        """
+        获取任务
+
+        Args:
+            task_id: 任务id
+
+        Returns:
+            任务信息，不存在时返回 None
+        """
+        task = self._cache.get(task_id)
+        if task is not None:
+            self._cache.move_to_end(task_id)
+            return task
+
+        async with get_session() as db_session:
+            model = await db_session.get(ExportTask, task_id)
+            if model is None:
+                return None
+            return self._remember(TaskInfo.from_model(model))
+
+    async def update(self, task_id: str, **values: Any) -> Optional[TaskInfo]:
+        """
+        更新任务
+
+        状态变为已结束时自动记录结束时间；已结束的任务不再更新，
+        避免取消后仍在进行的导出覆盖任务状态
+
+        Args:
+            task_id: 任务id
+            **values: 要更新的字段
+
+        Returns:
+            更新后的任务信息，不存在或已结束时返回 None
+        """
+        now = datetime.now()
+        values["updated_at"] = now
+        if values.get("status") in FINISHED_STATUSES:
+            values.setdefault("finished_at", now)
+
+        async with get_session() as db_session:
+            result = await db_session.execute(
+                update(ExportTask)
+                .where(ExportTask.id == task_id, ExportTask.status.notin_(FINISHED_STATUSES))
+                .values(**values)
+            )
+            await db_session.commit()
+        if not result.rowcount:
+            # 任务不存在或已结束，缓存中的状态可能已过时
+            self._cache.pop(task_id, None)
+            return None
+
+        task = self._cache.get(task_id)
+        if task is None:
+            return await self.get(task_id)
+        return self._remember(task.model_copy(update=values))
+
+    async def list(
+        self,
+        offset: int = 0,
+        limit: int = 20,
+        status: Optional[str] = None,
+        chat_type: Optional[str] = None,
+        chat_id: Optional[str] = None
+    ) -> tuple[int, list[TaskInfo]]:
+        """
+        分页列出任务，按创建时间倒序
+
+        Args:
+            offset: 跳过的任务数
+            limit: 返回的最大任务数
+            status: 按状态筛选
+            chat_type: 按聊天类型筛选
+            chat_id: 按群号或用户ID筛选
+
+        Returns:
+            (符合条件的任务总数, 当前页的任务)
+        """
+        conditions = []
+        if status:
+            conditions.append(ExportTask.status == status)
+        if chat_type:
+            conditions.append(ExportTask.chat_type == chat_type)
+        if chat_id:
+            conditions.append(ExportTask.chat_id == chat_id)
+
+        async with get_session() as db_session:
+            total = await db_session.scalar(
+                select(func.count()).select_from(ExportTask).where(*conditions)
+            )
+            models = await db_session.scalars(
+                select(ExportTask)
+                .where(*conditions)
+                .order_by(ExportTask.created_at.desc(), ExportTask.id)
+                .offset(offset)
+                .limit(limit)
+            )
+            tasks = [TaskInfo.from_model(model) for model in models]
+        return total or 0, tasks
+
+    async def cleanup(self, now: Optional[datetime] = None) -> int:
+        """
+        删除超过保留时间的已结束任务，不删除导出文件
+
+        Args:
+            now: 当前时间
+
+        Returns:
+            删除的任务数
+        """
+        if self.ttl <= 0:
+            return 0
+
+        expire_before = (now or datetime.now()) - timedelta(seconds=self.ttl)
+        async with get_session() as db_session:
+            result = await db_session.execute(
+                delete(ExportTask).where(
+                    ExportTask.status.in_(FINISHED_STATUSES),
+                    ExportTask.finished_at < expire_before
+                )
+            )
+            await db_session.commit()
+
+        for task_id in [
+            task.id for task in self._cache.values()
+            if task.finished_at is not None and task.finished_at < expire_before
+        ]:
+            del self._cache[task_id]
+
+        if result.rowcount:
+            logger.info(f"Removed {result.rowcount} expired export tasks")
+        return result.rowcount
+
+    async def fail_interrupted(self) -> int:
+        """
+        将上次运行时未完成的任务标记为失败
+
+        Returns:
+            标记的任务数
+        """
+        now = datetime.now()
+        async with get_session() as db_session:
+            result = await db_session.execute(
+                update(ExportTask)
+                .where(ExportTask.status.in_((TASK_PENDING, TASK_PROCESSING)))
+                .values(
+                    status=TASK_FAILED,
+                    message="导出失败: 任务因重启中断",
+                    updated_at=now,
+                    finished_at=now
+                )
+            )
+            await db_session.commit()
+        self._cache.clear()
+
+        if result.rowcount:
+            logger.warning(f"Marked {result.rowcount} interrupted export tasks as failed")
+        return result.rowcount
+
+
+task_store = TaskStore(
+    plugin_config.qq_chat_exporter_task_cache_size,
+    plugin_config.qq_chat_exporter_task_ttl
+)
+
+_cleanup_task: Optional[asyncio.Task] = None
+
+
+async def _cleanup_loop() -> None:
+    while True:
+        try:
+            await task_store.cleanup()
+        except Exception as e:
+            logger.warning(f"Failed to clean up export tasks: {e}")
+        await asyncio.sleep(CLEANUP_INTERVAL)
+
+
+driver = get_driver()
+
+
+@driver.on_startup
+async def _start_task_store() -> None:
+    global _cleanup_task
+
+    await task_store.fail_interrupted()
+    _cleanup_task = asyncio.create_task(_cleanup_loop())
+
+
+@driver.on_shutdown
+async def _stop_task_store() -> None:
+    if _cleanup_task is not None:
+        _cleanup_task.cancel()
@@ -2,26 +2,43 @@
 WebUI 路由和API
 """
 import asyncio
+import json
 import logging
-import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional
 
 from nonebot import get_driver, require, get_bot
-from fastapi import FastAPI, HTTPException, Query, BackgroundTasks
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
 require("nonebot_plugin_chatrecorder")
 
-from .exporter import export_group_messages, export_private_messages
+from .batch import export_batch
+from .bot_api import bot_cache_stats, get_group_list
+from .cache import ExportCacheKey, export_cache, normalize_time
+from .compression import MEDIA_TYPES, detect_compression, normalize_compression
+from .config import plugin_config
+from .download import file_download_response
+from .exporter import (
+    export_group_messages,
+    export_private_messages,
+    get_export_watermark,
+    get_group_statistics,
+    get_private_statistics,
+)
+from .metrics import CACHE_REQUESTS, CONTENT_TYPE, SCHEDULER_TASKS, render_metrics
+from .progress import ExportProgress, progress_hub
+from .scheduler import export_scheduler
+from .streaming import open_export_stream
+from .tasks import FINISHED_STATUSES, TASK_CANCELLED, task_store
 
 logger = logging.getLogger(__name__)
 
-# 任务存储
-# task_id -> {status: str, message: str, file_path: str, created_at: datetime}
-export_tasks: Dict[str, Dict[str, Any]] = {}
+# SSE 连接无事件时发送保活注释的间隔（秒）
+SSE_KEEPALIVE_INTERVAL = 15
+
 
 class ExportRequest(BaseModel):
     """导出请求"""
@@ -30,6 +47,36 @@ class ExportRequest(BaseModel):
     start_time: Optional[str] = None  # ISO format datetime string
     end_time: Optional[str] = None  # ISO format datetime string
     output_dir: Optional[str] = None
+    compression: Optional[str] = None  # "none", "gzip" or "zstd"
+    incremental: bool = False  # 只导出上次增量导出之后的新消息
+    priority: int = 0  # 排队时数值越大越先执行
+    timeout: Optional[float] = None  # 最长执行时间（秒），为空时使用插件配置，为 0 时不限制
+
+
+class StreamExportRequest(BaseModel):
+    """流式导出请求"""
+    chat_type: str  # "group" or "private"
+    chat_id: str
+    start_time: Optional[str] = None  # ISO format datetime string
+    end_time: Optional[str] = None  # ISO format datetime string
+    compression: Optional[str] = None  # "none", "gzip" or "zstd"
+
+
+class BatchChat(BaseModel):
+    """批量导出中的一个聊天"""
+    chat_type: str  # "group" or "private"
+    chat_id: str
+
+
+class BatchExportRequest(BaseModel):
+    """批量导出请求"""
+    chats: list[BatchChat]
+    start_time: Optional[str] = None  # ISO format datetime string
+    end_time: Optional[str] = None  # ISO format datetime string
+    output_dir: Optional[str] = None
+    concurrency: Optional[int] = None  # 同时导出的聊天数，为空时使用插件配置
+    priority: int = 0  # 排队时数值越大越先执行
+    timeout: Optional[float] = None  # 最长执行时间（秒），为空时使用插件配置，为 0 时不限制
 
 
 class ExportResponse(BaseModel):
@@ -50,7 +97,7 @@ async def get_groups():
     try:
         bot = get_bot()
         if hasattr(bot, "get_group_list"):
-            groups = await bot.get_group_list()
+            groups = await get_group_list(bot)
             return {
                 "success": True,
                 "data": [
@@ -60,7 +107,7 @@ async def get_groups():
             }
     except Exception as e:
         logger.warning(f"Failed to get group list: {e}")
-    
+
     return {"success": False, "message": "Failed to get group list", "data": []}
 
 
@@ -78,55 +125,100 @@ async def index():
         raise HTTPException(status_code=500, detail=f"Failed to load template: {str(e)}")
 
 
-async def _run_export_task(task_id: str, request: ExportRequest):
-    """后台执行导出任务"""
-    try:
-        logger.info(f"Starting export task {task_id} for {request.chat_type} {request.chat_id}")
-        export_tasks[task_id]["status"] = "processing"
-        
-        # 解析时间
-        start_time = None
-        end_time = None
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """解析 ISO 格式时间字符串"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
 
-        if request.start_time:
-            start_time = datetime.fromisoformat(request.start_time.replace("Z", "+00:00"))
 
-        if request.end_time:
-            end_time = datetime.fromisoformat(request.end_time.replace("Z", "+00:00"))
-
-        # 根据聊天类型调用相应的导出函数
-        if request.chat_type == "group":
-            file_path = await export_group_messages(
-                group_id=request.chat_id,
-                start_time=start_time,
-                end_time=end_time,
-                output_dir=request.output_dir
-            )
-        elif request.chat_type == "private":
-            file_path = await export_private_messages(
-                user_id=request.chat_id,
-                start_time=start_time,
-                end_time=end_time,
-                output_dir=request.output_dir
+def _export_key(request: ExportRequest) -> tuple:
+    """导出请求的合并键，聊天、时间范围和导出选项都相同的请求合并执行"""
+    return (
+        request.chat_type,
+        request.chat_id,
+        normalize_time(_parse_datetime(request.start_time)),
+        normalize_time(_parse_datetime(request.end_time)),
+        request.output_dir,
+        normalize_compression(request.compression),
+        request.incremental
+    )
+
+
+async def _run_export(request: ExportRequest, progress: ExportProgress) -> tuple[str, str]:
+    """
+    执行导出
+
+    Args:
+        request: 导出请求
+        progress: 导出进度
+
+    Returns:
+        (导出文件路径, 状态说明)
+    """
+    logger.info(f"Starting export for {request.chat_type} {request.chat_id}")
+
+    # 解析时间
+    start_time = _parse_datetime(request.start_time)
+    end_time = _parse_datetime(request.end_time)
+
+    # 相同的聊天、时间范围和数据水位直接复用已有的导出文件，
+    # 增量导出会修改已有文件，不参与缓存
+    cache_key: Optional[ExportCacheKey] = None
+    if export_cache.enabled and not request.incremental:
+        cache_key = ExportCacheKey(
+            chat_type=request.chat_type,
+            chat_id=request.chat_id,
+            start_time=normalize_time(start_time),
+            end_time=normalize_time(end_time),
+            output_dir=request.output_dir,
+            compression=normalize_compression(request.compression),
+            watermark=await get_export_watermark(
+                request.chat_type, request.chat_id, start_time, end_time
             )
-        else:
-            raise ValueError(f"Invalid chat_type: {request.chat_type}")
+        )
+        cached_path = export_cache.get(cache_key)
+        if cached_path is not None:
+            logger.info(f"Reused cached export: {cached_path}")
+            return cached_path, "导出成功（使用缓存）"
 
-        export_tasks[task_id]["status"] = "completed"
-        export_tasks[task_id]["file_path"] = file_path
-        export_tasks[task_id]["message"] = "导出成功"
-        logger.info(f"Task {task_id} completed successfully: {file_path}")
+    # 根据聊天类型调用相应的导出函数
+    if request.chat_type == "group":
+        file_path = await export_group_messages(
+            group_id=request.chat_id,
+            start_time=start_time,
+            end_time=end_time,
+            output_dir=request.output_dir,
+            compression=request.compression,
+            incremental=request.incremental,
+            progress=progress
+        )
+    elif request.chat_type == "private":
+        file_path = await export_private_messages(
+            user_id=request.chat_id,
+            start_time=start_time,
+            end_time=end_time,
+            output_dir=request.output_dir,
+            compression=request.compression,
+            incremental=request.incremental,
+            progress=progress
+        )
+    else:
+        raise ValueError(f"Invalid chat_type: {request.chat_type}")
 
-    except Exception as e:
-        logger.error(f"Task {task_id} failed: {type(e).__name__} - {str(e)}", exc_info=True)
-        export_tasks[task_id]["status"] = "failed"
-        export_tasks[task_id]["message"] = f"导出失败: {type(e).__name__} - {str(e)}"
+    if cache_key is not None:
+        export_cache.put(cache_key, file_path)
+
+    logger.info(f"Export completed successfully: {file_path}")
+    return file_path, "导出成功"
 
 
 @app.post("/qq-chat-exporter/export")
-async def export_messages(request: ExportRequest, background_tasks: BackgroundTasks):
+async def export_messages(request: ExportRequest):
     """
     导出消息接口 (异步任务)
+
+    任务提交到调度器排队执行，与正在排队或执行的相同导出合并
     """
     try:
         # 验证时间格式
@@ -135,30 +227,45 @@ async def export_messages(request: ExportRequest, background_tasks: BackgroundTa
                 datetime.fromisoformat(request.start_time.replace("Z", "+00:00"))
             except ValueError as e:
                 return JSONResponse(status_code=400, content={"success": False, "message": f"Invalid start_time: {e}"})
-        
+
         if request.end_time:
             try:
                 datetime.fromisoformat(request.end_time.replace("Z", "+00:00"))
             except ValueError as e:
                 return JSONResponse(status_code=400, content={"success": False, "message": f"Invalid end_time: {e}"})
 
+        # 验证压缩方式
+        try:
+            compression = normalize_compression(request.compression)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"success": False, "message": str(e)})
+        if request.incremental and compression is not None:
+            return JSONResponse(
+                status_code=400,
+                content={"success": False, "message": "Incremental export does not support compression"}
+            )
+
         # 创建任务
-        task_id = str(uuid.uuid4())
-        export_tasks[task_id] = {
-            "status": "pending",
-            "message": "任务已创建",
-            "created_at": datetime.now(),
-            "file_path": None
-        }
-        
-        # 添加后台任务
-        background_tasks.add_task(_run_export_task, task_id, request)
-        
+        task = await task_store.create(request.chat_type, request.chat_id, request.model_dump())
+
+        # 提交到调度器
+        timeout = request.timeout
+        if timeout is None:
+            timeout = plugin_config.qq_chat_exporter_task_timeout
+        await export_scheduler.submit(
+            task.id,
+            _export_key(request),
+            lambda progress: _run_export(request, progress),
+            priority=request.priority,
+            timeout=timeout if timeout > 0 else None
+        )
+
         return JSONResponse(
             content={
                 "success": True,
                 "message": "导出任务已开始",
-                "task_id": task_id
+                "task_id": task.id,
+                "queue_position": export_scheduler.queue_position(task.id)
             }
         )
 
@@ -173,33 +280,351 @@ async def export_messages(request: ExportRequest, background_tasks: BackgroundTa
         )
 
 
+async def _stream_export(
+    chat_type: str,
+    chat_id: str,
+    start_time: Optional[str],
+    end_time: Optional[str],
+    compression: Optional[str]
+):
+    """以 StreamingResponse 返回导出内容"""
+    try:
+        start = _parse_datetime(start_time)
+        end = _parse_datetime(end_time)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "message": f"Invalid time: {e}"})
+
+    try:
+        stream = await open_export_stream(chat_type, chat_id, start, end, compression=compression)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "message": str(e)})
+
+    return StreamingResponse(
+        stream,
+        media_type=MEDIA_TYPES.get(stream.compression, "application/json"),
+        headers={
+            "Content-Disposition": f'attachment; filename="{stream.filename}"',
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
+@app.get("/qq-chat-exporter/export/stream")
+async def stream_export_messages(
+    chat_type: str = Query(..., description="group or private"),
+    chat_id: str = Query(..., description="Group ID or user ID"),
+    start_time: Optional[str] = Query(None, description="ISO format datetime string"),
+    end_time: Optional[str] = Query(None, description="ISO format datetime string"),
+    compression: Optional[str] = Query(None, description="none, gzip or zstd")
+):
+    """
+    流式导出接口
+
+    不创建任务，也不写入磁盘，导出内容边查询边返回
+    """
+    return await _stream_export(chat_type, chat_id, start_time, end_time, compression)
+
+
+@app.post("/qq-chat-exporter/export/stream")
+async def stream_export_messages_post(request: StreamExportRequest):
+    """流式导出接口，参数与 GET 相同，放在请求体中"""
+    return await _stream_export(
+        request.chat_type, request.chat_id, request.start_time, request.end_time, request.compression
+    )
+
+
+async def _run_batch_export(request: BatchExportRequest, progress: ExportProgress) -> tuple[str, str]:
+    """执行批量导出"""
+    file_path = await export_batch(
+        [(chat.chat_type, chat.chat_id) for chat in request.chats],
+        start_time=_parse_datetime(request.start_time),
+        end_time=_parse_datetime(request.end_time),
+        output_dir=request.output_dir,
+        concurrency=request.concurrency,
+        progress=progress
+    )
+    return file_path, "导出成功"
+
+
+@app.post("/qq-chat-exporter/export/batch")
+async def export_batch_messages(request: BatchExportRequest):
+    """
+    批量导出接口 (异步任务)
+
+    导出多个聊天并打包为一个 zip 文件，压缩包中的 manifest.json 记录每个聊天的导出结果
+    """
+    if not request.chats:
+        return JSONResponse(status_code=400, content={"success": False, "message": "No chats to export"})
+    for chat in request.chats:
+        if chat.chat_type not in ("group", "private"):
+            return JSONResponse(
+                status_code=400,
+                content={"success": False, "message": f"Invalid chat_type: {chat.chat_type}"}
+            )
+    try:
+        start_time = _parse_datetime(request.start_time)
+        end_time = _parse_datetime(request.end_time)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "message": f"Invalid time: {e}"})
+
+    try:
+        task = await task_store.create("batch", str(len(request.chats)), request.model_dump())
+
+        timeout = request.timeout
+        if timeout is None:
+            timeout = plugin_config.qq_chat_exporter_task_timeout
+        key = (
+            "batch",
+            tuple((chat.chat_type, chat.chat_id) for chat in request.chats),
+            normalize_time(start_time),
+            normalize_time(end_time),
+            request.output_dir
+        )
+        await export_scheduler.submit(
+            task.id,
+            key,
+            lambda progress: _run_batch_export(request, progress),
+            priority=request.priority,
+            timeout=timeout if timeout > 0 else None
+        )
+
+        return JSONResponse(
+            content={
+                "success": True,
+                "message": "导出任务已开始",
+                "task_id": task.id,
+                "queue_position": export_scheduler.queue_position(task.id)
+            }
+        )
+
+    except Exception as e:
+        logger.error(f"Failed to create batch export task: {e}", exc_info=True)
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "message": f"创建任务失败: {str(e)}"
+            }
+        )
+
+
+@app.get("/qq-chat-exporter/tasks")
+async def list_tasks(
+    offset: int = Query(0, ge=0, description="Number of tasks to skip"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of tasks to return"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    chat_type: Optional[str] = Query(None, description="Filter by chat type"),
+    chat_id: Optional[str] = Query(None, description="Filter by group ID or user ID")
+):
+    """分页列出导出任务，按创建时间倒序"""
+    total, tasks = await task_store.list(
+        offset=offset, limit=limit, status=status, chat_type=chat_type, chat_id=chat_id
+    )
+    return JSONResponse(content={
+        "success": True,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "data": [
+            {
+                **task.model_dump(mode="json", exclude={"request"}),
+                "queue_position": export_scheduler.queue_position(task.id)
+            }
+            for task in tasks
+        ]
+    })
+
+
 @app.get("/qq-chat-exporter/tasks/{task_id}")
 async def get_task_status(task_id: str):
     """获取任务状态"""
-    task = export_tasks.get(task_id)
+    task = await task_store.get(task_id)
     if not task:
         return JSONResponse(status_code=404, content={"success": False, "message": "Task not found"})
-    
+
     return JSONResponse(content={
         "success": True,
-        "status": task["status"],
-        "message": task["message"],
-        "file_path": task.get("file_path")
+        "status": task.status,
+        "message": task.message,
+        "file_path": task.file_path,
+        "queue_position": export_scheduler.queue_position(task.id)
     })
 
 
+@app.post("/qq-chat-exporter/tasks/{task_id}/cancel")
+async def cancel_task(task_id: str):
+    """
+    取消导出任务
+
+    排队中的任务直接移出队列，执行中的导出在处理完当前这批消息后中止，并删除未完成的导出文件
+    """
+    task = await task_store.get(task_id)
+    if not task:
+        return JSONResponse(status_code=404, content={"success": False, "message": "Task not found"})
+    if task.status in FINISHED_STATUSES:
+        return JSONResponse(
+            status_code=409, content={"success": False, "message": f"Task already {task.status}"}
+        )
+
+    if not await export_scheduler.cancel(task_id):
+        # 不在调度器中的任务不会再执行，直接标记为已取消
+        if await task_store.update(task_id, status=TASK_CANCELLED, message="任务已取消") is None:
+            return JSONResponse(status_code=409, content={"success": False, "message": "Task already finished"})
+
+    return JSONResponse(content={"success": True, "message": "任务已取消"})
+
+
+def _sse(event: dict) -> str:
+    """编码为一条 Server-Sent Events 消息"""
+    return f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+@app.get("/qq-chat-exporter/tasks/{task_id}/events")
+async def stream_task_events(task_id: str):
+    """
+    以 Server-Sent Events 推送任务状态和导出进度
+
+    先推送一次当前状态，之后每次状态或进度变化时推送，任务结束后关闭连接
+    """
+    task = await task_store.get(task_id)
+    if not task:
+        return JSONResponse(status_code=404, content={"success": False, "message": "Task not found"})
+
+    async def events():
+        # 先订阅再读取当前状态，避免漏掉两者之间发布的事件
+        with progress_hub.subscribe(task_id) as queue:
+            current = await task_store.get(task_id)
+            if current is None or current.status in FINISHED_STATUSES or current.id not in export_scheduler:
+                # 已结束，或是重启前创建、不会再执行的任务
+                yield _sse({
+                    "task_id": task_id,
+                    "status": current.status if current else task.status,
+                    "message": current.message if current else task.message,
+                    "file_path": current.file_path if current else task.file_path,
+                    "queue_position": None,
+                    "progress": None,
+                })
+                return
+
+            latest = progress_hub.latest(task_id)
+            if latest is not None:
+                yield _sse(latest)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    # 注释行用于保持连接
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(event)
+                if event["status"] in FINISHED_STATUSES:
+                    return
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/qq-chat-exporter/statistics")
+async def get_statistics(
+    chat_type: str = Query(..., description="group or private"),
+    chat_id: str = Query(..., description="Group ID or user ID"),
+    start_time: Optional[str] = Query(None, description="ISO format datetime string"),
+    end_time: Optional[str] = Query(None, description="ISO format datetime string"),
+    include_resources: bool = Query(False, description="Scan message content for resource counts")
+):
+    """只计算统计信息，不进行导出"""
+    try:
+        start = _parse_datetime(start_time)
+        end = _parse_datetime(end_time)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "message": f"Invalid time: {e}"})
+
+    try:
+        if chat_type == "group":
+            statistics = await get_group_statistics(chat_id, start, end, include_resources)
+        elif chat_type == "private":
+            statistics = await get_private_statistics(chat_id, start, end, include_resources)
+        else:
+            return JSONResponse(status_code=400, content={"success": False, "message": f"Invalid chat_type: {chat_type}"})
+    except Exception as e:
+        logger.error(f"Failed to compute statistics: {e}", exc_info=True)
+        return JSONResponse(
+            status_code=500,
+            content={"success": False, "message": f"统计失败: {str(e)}"}
+        )
+
+    return JSONResponse(content={"success": True, "data": statistics.model_dump(mode="json")})
+
+
 @app.get("/qq-chat-exporter/download")
-async def download_file(file_path: str = Query(..., description="File path to download")):
-    """下载文件接口"""
+async def download_file(request: Request, file_path: str = Query(..., description="File path to download")):
+    """
+    下载文件接口
+
+    支持 Range 断点续传，并根据 ETag 对重复下载返回 304
+    """
     path = Path(file_path)
     if not path.exists() or not path.is_file():
         raise HTTPException(status_code=404, detail="File not found")
-    
-    return FileResponse(
-        path=path,
-        filename=path.name,
-        media_type="application/octet-stream"
-    )
+
+    # 压缩文件按对应的媒体类型下载，文件名保留 .gz / .zst / .zip 后缀
+    compression = detect_compression(path)
+    if path.suffix == ".zip":
+        media_type = "application/zip"
+    else:
+        media_type = MEDIA_TYPES.get(compression, "application/octet-stream")
+    return file_download_response(path, request.headers, media_type)
+
+
+@app.get("/qq-chat-exporter/cache/stats")
+async def get_cache_stats():
+    """获取导出结果缓存和机器人 API 缓存的命中统计"""
+    return {
+        "success": True,
+        "data": {
+            "export": {
+                "entries": len(export_cache),
+                "hits": export_cache.hits,
+                "misses": export_cache.misses,
+            },
+            "bot_api": bot_cache_stats(),
+        }
+    }
+
+
+def _scheduler_task_counts() -> dict[tuple[str, ...], float]:
+    return {
+        ("queued",): export_scheduler.queued_count,
+        ("running",): export_scheduler.running_count,
+    }
+
+
+def _cache_request_counts() -> dict[tuple[str, ...], float]:
+    counts: dict[tuple[str, ...], float] = {
+        ("export", "hit"): export_cache.hits,
+        ("export", "miss"): export_cache.misses,
+    }
+    for name, stats in bot_cache_stats().items():
+        counts[(name, "hit")] = stats["hits"]
+        counts[(name, "stale_hit")] = stats["stale_hits"]
+        counts[(name, "miss")] = stats["misses"]
+        counts[(name, "coalesced")] = stats["coalesced"]
+    return counts
+
+
+# 队列长度和缓存命中在输出指标时读取
+SCHEDULER_TASKS.set_function(_scheduler_task_counts)
+CACHE_REQUESTS.set_function(_cache_request_counts)
+
+
+@app.get("/qq-chat-exporter/metrics")
+async def get_metrics():
+    """Prometheus 文本格式的运行指标：导出次数、各阶段耗时、消息数、写入字节数、任务队列长度等"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
 
 
 @app.get("/qq-chat-exporter/health")
@@ -0,0 +1,623 @@
+"""
+流式导出写入器：逐批写出消息，避免在内存中构建完整的 ExportData
+"""
+import itertools
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Any, BinaryIO, Optional, Union
+
+from pydantic import BaseModel
+from typing_extensions import Self
+
+from .compression import compressed_path, open_input, open_output
+from .models import ChatInfo, ExportMessage, ExportOptions, Metadata, Statistics
+from .serializer import Serializer, get_serializer
+
+logger = logging.getLogger(__name__)
+
+# 复制暂存文件时的缓冲区大小
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# NDJSON 导出目录中清单文件的名称
+NDJSON_MANIFEST_FILENAME = "manifest.json"
+
+# messages 数组的开头
+MESSAGES_OPEN = b',"messages":['
+
+# 为增量导出预留的头部空间：至少 4 KiB，或头部长度的 1/4
+HEADER_RESERVE_MIN = 4096
+HEADER_RESERVE_RATIO = 4
+
+
+def header_padding(header_length: int) -> int:
+    """计算增量导出时在头部之后预留的空白字节数"""
+    return max(HEADER_RESERVE_MIN, header_length // HEADER_RESERVE_RATIO)
+
+
+def skip_bytes(src: BinaryIO, length: int) -> None:
+    """从 src 的当前位置跳过 length 字节，用于只能顺序读取的解压流"""
+    while length > 0:
+        chunk = src.read(min(COPY_BUFFER_SIZE, length))
+        if not chunk:
+            raise EOFError("Unexpected end of file while skipping")
+        length -= len(chunk)
+
+
+def copy_range(src: BinaryIO, dst: BinaryIO, length: int) -> None:
+    """从 src 的当前位置复制 length 字节到 dst"""
+    while length > 0:
+        chunk = src.read(min(COPY_BUFFER_SIZE, length))
+        if not chunk:
+            raise EOFError("Unexpected end of file while copying")
+        dst.write(chunk)
+        length -= len(chunk)
+
+
+class _ExportEncoding:
+    """导出文件各部分的序列化"""
+
+    def __init__(
+        self,
+        chat_info: ChatInfo,
+        metadata: Optional[Metadata] = None,
+        export_options: Optional[ExportOptions] = None,
+        dumps: Optional[Serializer] = None
+    ):
+        self._dumps = dumps or get_serializer()
+        self.chat_info = chat_info
+        self.metadata = metadata or Metadata()
+        self.export_options = export_options or ExportOptions()
+        self.message_count = 0
+
+    def _dump_model(self, model: BaseModel) -> bytes:
+        return self._dumps(model.model_dump(mode="json"))
+
+    def _dump_message(self, message: Union[ExportMessage, dict[str, Any]]) -> bytes:
+        if isinstance(message, dict):
+            return self._dumps(message)
+        return self._dump_model(message)
+
+    def dump_messages(self, messages: list[Union[ExportMessage, dict[str, Any]]]) -> bytes:
+        """序列化一批消息，返回以逗号分隔的消息 JSON，可以交给 `write_raw` 写入"""
+        return b",".join(self._dump_message(message) for message in messages)
+
+    def _field(self, name: str, value: bytes, first: bool = False) -> bytes:
+        """生成 `"name":value` 片段"""
+        prefix = b"" if first else b","
+        return prefix + self._dumps(name) + b":" + value
+
+
+class ExportWriter(_ExportEncoding):
+    """
+    ExportData 流式写入器
+
+    使用标准库后端时，输出与 `ExportData.model_dump(mode="json")` 经紧凑 JSON
+    序列化后的结果逐字节一致；使用 orjson 后端时输出等价。
+    进入上下文时先写出 metadata、chatInfo 和 statistics，消息随后直接写入同目录下的
+    `.part` 文件，`finish` 时写出 exportOptions 并重命名为最终文件，每条消息只写入磁盘一次。
+    指定压缩方式时 `.part` 文件在写出的同时经 gzip / zstd 压缩，解压后的内容与不压缩时相同。
+
+    头部中的 statistics 是构造时传入的 `statistics`，通常由 `compute_statistics`
+    在导出前通过 SQL 计算。`finish` 时的统计信息与之不同时（例如导出期间写入了新消息），
+    不压缩且新头部放得进原来的位置时原地覆盖，否则按新头部重写整个文件。
+    未传入 `statistics` 时总是需要重写。
+
+    `reserve_header` 为真时，在 statistics 之后预留空白（JSON 允许的空白字符），
+    之后可以用 `ExportAppender` 追加消息并原地更新头部。
+    `finish` 之后 `header_size`、`messages_end`、`file_size` 记录追加所需的偏移量。
+
+    用法:
+        with ExportWriter(output_file, chat_info, statistics=expected) as writer:
+            writer.write_messages(batch)
+            ...
+            writer.finish(statistics)
+    """
+
+    def __init__(
+        self,
+        output_file: Path,
+        chat_info: ChatInfo,
+        metadata: Optional[Metadata] = None,
+        export_options: Optional[ExportOptions] = None,
+        dumps: Optional[Serializer] = None,
+        compression: Optional[str] = None,
+        reserve_header: bool = False,
+        statistics: Optional[Statistics] = None
+    ):
+        if reserve_header and compression is not None:
+            raise ValueError("Cannot reserve header space in a compressed export")
+
+        super().__init__(chat_info, metadata, export_options, dumps)
+        self.output_file = Path(output_file)
+        self.compression = compression
+        self.reserve_header = reserve_header
+        self.statistics = statistics
+        self.header_size = 0
+        self.messages_end = 0
+        self.file_size = 0
+        # finish 时是否因统计信息变化重写了整个文件
+        self.rewritten = False
+        self._part_file = self.output_file.with_name(self.output_file.name + ".part")
+        self._rewrite_file = self.output_file.with_name(self.output_file.name + ".tmp")
+        self._file: Optional[BinaryIO] = None
+        # 已写出的头部，不含预留的空白
+        self._written_header = b""
+        # 已写入的消息数组内容的字节数（压缩前）
+        self._messages_size = 0
+        self._finished = False
+
+    def __enter__(self) -> Self:
+        self._written_header = self._header(self.statistics or Statistics())
+        header = self._padded(self._written_header)
+        self._file = open_output(self._part_file, self.compression)
+        self._file.write(header + MESSAGES_OPEN)
+        self.header_size = len(header)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._close_file()
+        self._part_file.unlink(missing_ok=True)
+        self._rewrite_file.unlink(missing_ok=True)
+        if exc_type is not None and self._finished:
+            # 出错时不保留导出文件
+            self.output_file.unlink(missing_ok=True)
+
+    @property
+    def bytes_written(self) -> int:
+        """已写入的字节数，写出完成前为消息的字节数（压缩前），之后为导出文件大小"""
+        if self._file is not None and not self._file.closed:
+            return self._messages_size
+        return self.file_size
+
+    def _header(self, statistics: Statistics) -> bytes:
+        """生成 messages 之前的部分：`{"metadata":...,"chatInfo":...,"statistics":...`"""
+        return (
+            b"{"
+            + self._field("metadata", self._dump_model(self.metadata), first=True)
+            + self._field("chatInfo", self._dump_model(self.chat_info))
+            + self._field("statistics", self._dump_model(statistics))
+        )
+
+    def _padded(self, header: bytes) -> bytes:
+        """需要预留头部空间时在头部之后追加空白"""
+        if self.reserve_header:
+            return header + b" " * header_padding(len(header))
+        return header
+
+    def _tail(self) -> bytes:
+        """生成 messages 之后的部分"""
+        return b"]" + self._field("exportOptions", self._dump_model(self.export_options)) + b"}"
+
+    def _close_file(self) -> None:
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+
+    def write_messages(self, messages: list[Union[ExportMessage, dict[str, Any]]]) -> None:
+        """
+        写入一批消息
+
+        Args:
+            messages: 导出消息列表，可以是 `ExportMessage`，
+                也可以是快速路径生成的同结构字典
+        """
+        self.write_raw(self.dump_messages(messages), len(messages))
+
+    def write_raw(self, fragment: bytes, count: int) -> None:
+        """
+        写入已序列化的一段消息
+
+        Args:
+            fragment: 以逗号分隔的若干条消息 JSON
+            count: 片段中的消息条数
+        """
+        if self._file is None or self._finished:
+            raise RuntimeError("ExportWriter is not open")
+
+        if not count:
+            return
+        if self.message_count:
+            self._file.write(b",")
+            self._messages_size += 1
+        self._file.write(fragment)
+        self._messages_size += len(fragment)
+        self.message_count += count
+
+    def finish(self, statistics: Statistics) -> None:
+        """
+        写出完整的导出文件
+
+        Args:
+            statistics: 全部消息的统计信息
+        """
+        if self._file is None or self._finished:
+            raise RuntimeError("ExportWriter is not open")
+
+        self._file.write(self._tail())
+        self._close_file()
+        self.messages_end = self.header_size + len(MESSAGES_OPEN) + self._messages_size
+
+        header = self._header(statistics)
+        if header != self._written_header:
+            fits = len(header) == self.header_size or (self.reserve_header and len(header) <= self.header_size)
+            if self.compression is None and fits:
+                with open(self._part_file, "r+b") as f:
+                    f.write(header.ljust(self.header_size))
+            else:
+                self._rewrite(header)
+
+        os.replace(self._part_file, self.output_file)
+        self._finished = True
+        self.file_size = self.output_file.stat().st_size
+        logger.debug(f"Wrote {self.message_count} messages to {self.output_file}")
+
+    def _rewrite(self, header: bytes) -> None:
+        """按新的头部重写 `.part` 文件，头部之后的内容原样复制"""
+        logger.info(f"Statistics of {self.output_file} differ from the header written up front, rewriting")
+        header = self._padded(header)
+        with open_input(self._part_file, self.compression) as old:
+            skip_bytes(old, self.header_size)
+            with open_output(self._rewrite_file, self.compression) as f:
+                f.write(header)
+                shutil.copyfileobj(old, f, COPY_BUFFER_SIZE)
+        os.replace(self._rewrite_file, self._part_file)
+        self.messages_end += len(header) - self.header_size
+        self.header_size = len(header)
+        self.rewritten = True
+
+
+class ExportAppender(ExportWriter):
+    """
+    向预留了头部空间的导出文件追加消息
+
+    新消息先写入暂存文件，`finish` 时接在原有消息之后，
+    再写出新的头部。新头部放得进预留空间时原地覆盖，只写入新增的部分；
+    否则重写整个文件并重新预留空间。出错时保留原文件，不会删除已有的导出。
+
+    用法:
+        with ExportAppender(output_file, chat_info, header_size, messages_end, count) as writer:
+            writer.write_messages(batch)
+            ...
+            writer.finish(statistics)
+    """
+
+    def __init__(
+        self,
+        output_file: Path,
+        chat_info: ChatInfo,
+        header_size: int,
+        messages_end: int,
+        message_count: int,
+        metadata: Optional[Metadata] = None,
+        export_options: Optional[ExportOptions] = None,
+        dumps: Optional[Serializer] = None
+    ):
+        super().__init__(
+            output_file,
+            chat_info,
+            metadata=metadata,
+            export_options=export_options,
+            dumps=dumps,
+            reserve_header=True
+        )
+        self.header_size = header_size
+        self.messages_end = messages_end
+        # 从已有消息数开始计数，第一条新消息前会写出分隔的逗号
+        self.message_count = message_count
+        self._spool_file = self.output_file.with_name(self.output_file.name + ".part")
+
+    def __enter__(self) -> Self:
+        self._file = open(self._spool_file, "wb")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._close_file()
+        self._spool_file.unlink(missing_ok=True)
+        self._rewrite_file.unlink(missing_ok=True)
+
+    def finish(self, statistics: Statistics) -> None:
+        """
+        追加新消息并更新头部
+
+        Args:
+            statistics: 包含原有消息在内的全部统计信息
+        """
+        if self._file is None or self._finished:
+            raise RuntimeError("ExportWriter is not open")
+
+        self._close_file()
+        self._finished = True
+
+        header = self._header(statistics)
+        spool_size = self._spool_file.stat().st_size
+
+        if len(header) <= self.header_size:
+            # 先追加消息和结尾，再覆盖头部
+            with open(self.output_file, "r+b") as f:
+                f.seek(self.messages_end)
+                with open(self._spool_file, "rb") as spool:
+                    shutil.copyfileobj(spool, f, COPY_BUFFER_SIZE)
+                f.write(self._tail())
+                f.truncate()
+                f.seek(0)
+                f.write(header.ljust(self.header_size))
+            self.messages_end += spool_size
+        else:
+            # 预留空间不足，重写整个文件
+            logger.info(f"Header of {self.output_file} outgrew its reserved space, rewriting")
+            header += b" " * header_padding(len(header))
+            messages_start = self.header_size + len(MESSAGES_OPEN)
+            with open(self._rewrite_file, "wb") as f:
+                f.write(header)
+                f.write(MESSAGES_OPEN)
+                with open(self.output_file, "rb") as old:
+                    old.seek(messages_start)
+                    copy_range(old, f, self.messages_end - messages_start)
+                with open(self._spool_file, "rb") as spool:
+                    shutil.copyfileobj(spool, f, COPY_BUFFER_SIZE)
+                f.write(self._tail())
+            os.replace(self._rewrite_file, self.output_file)
+            self.messages_end = len(header) + self.messages_end - self.header_size + spool_size
+            self.header_size = len(header)
+
+        self.file_size = self.output_file.stat().st_size
+        logger.debug(f"Appended messages to {self.output_file}, {self.message_count} in total")
+
+
+class ExportStreamEncoder(_ExportEncoding):
+    """
+    不落盘的 ExportData 编码器，依次生成导出内容的各个片段
+
+    统计信息在全部消息转换后才能确定，因此 statistics 放在 messages 之后：
+    `{"metadata":...,"chatInfo":...,"messages":[...],"statistics":...,"exportOptions":...}`。
+    与 `ExportWriter` 的输出只有字段顺序不同，解析后的内容相同。
+
+    用法:
+        encoder = ExportStreamEncoder(chat_info)
+        yield encoder.header()
+        yield encoder.encode_messages(batch)
+        ...
+        yield encoder.tail(statistics)
+    """
+
+    def header(self) -> bytes:
+        """生成 messages 数组之前的部分"""
+        return (
+            b"{"
+            + self._field("metadata", self._dump_model(self.metadata), first=True)
+            + self._field("chatInfo", self._dump_model(self.chat_info))
+            + MESSAGES_OPEN
+        )
+
+    def encode_messages(self, messages: list[Union[ExportMessage, dict[str, Any]]]) -> bytes:
+        """
+        编码一批消息
+
+        Args:
+            messages: 导出消息列表，可以是 `ExportMessage`，也可以是快速路径生成的同结构字典
+
+        Returns:
+            以逗号分隔的消息 JSON，不是第一批时以逗号开头
+        """
+        if not messages:
+            return b""
+        fragment = self.dump_messages(messages)
+        if self.message_count:
+            fragment = b"," + fragment
+        self.message_count += len(messages)
+        return fragment
+
+    def tail(self, statistics: Statistics) -> bytes:
+        """生成 messages 数组之后的部分"""
+        return (
+            b"]"
+            + self._field("statistics", self._dump_model(statistics))
+            + self._field("exportOptions", self._dump_model(self.export_options))
+            + b"}"
+        )
+
+
+class _Shard:
+    """NDJSON 导出的一个分片"""
+
+    def __init__(self, index: int, spool_file: Path, period: Optional[str]):
+        self.index = index
+        self.spool_file = spool_file
+        self.period = period
+        self.message_count = 0
+        self.size = 0
+        self.first_timestamp: Optional[str] = None
+        self.last_timestamp: Optional[str] = None
+        self.file: Optional[Path] = None
+        self.file_size = 0
+
+
+class NDJSONWriter(_ExportEncoding):
+    """
+    NDJSON 流式写入器
+
+    导出到一个目录，目录中每个分片文件的第一行是头部
+    `{"metadata":...,"chatInfo":...,"statistics":...,"exportOptions":...,"shard":...}`，
+    之后每行一条消息；`manifest.json` 记录全部分片和整体的统计信息。
+    头部中的 statistics 是整个导出的统计，shard 记录该分片的序号、消息数和时间范围。
+
+    分片中的消息行（不含头部，压缩前）超过 `split_size` 字节，或 `split_by_month` 为真且消息进入
+    新的自然月（UTC）时，后续消息写入新的分片。每个分片至少包含一条消息，单条消息超过 `split_size` 时独占一个分片。
+
+    与 `ExportWriter` 相同，消息先写入暂存文件，统计信息确定后在 `finish` 时
+    写出各个分片的头部并拷贝暂存的消息，指定压缩方式时分片文件经 gzip / zstd 压缩。
+    输出目录已存在时（例如同一秒内两次导出同一聊天）改用追加了 `_1`、`_2` 等序号的目录，
+    `output_dir` 和 `manifest_file` 在进入上下文后指向实际使用的目录。
+
+    用法:
+        with NDJSONWriter(output_dir, chat_info, split_size=100 * 1024 * 1024) as writer:
+            writer.write_messages(batch)
+            ...
+            writer.finish(statistics)
+        writer.manifest_file
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        chat_info: ChatInfo,
+        split_size: Optional[int] = None,
+        split_by_month: bool = False,
+        metadata: Optional[Metadata] = None,
+        export_options: Optional[ExportOptions] = None,
+        dumps: Optional[Serializer] = None,
+        compression: Optional[str] = None
+    ):
+        if split_size is not None and split_size <= 0:
+            raise ValueError(f"split_size must be positive, got {split_size}")
+
+        super().__init__(chat_info, metadata, export_options, dumps)
+        self.output_dir = Path(output_dir)
+        self.manifest_file = self.output_dir / NDJSON_MANIFEST_FILENAME
+        self.split_size = split_size
+        self.split_by_month = split_by_month
+        self.compression = compression
+        self.file_size = 0
+        self.shards: list[_Shard] = []
+        self._spool: Optional[BinaryIO] = None
+        self._finished = False
+
+    def __enter__(self) -> Self:
+        base = self.output_dir
+        for index in itertools.count(1):
+            try:
+                self.output_dir.mkdir(parents=True)
+                break
+            except FileExistsError:
+                self.output_dir = base.with_name(f"{base.name}_{index}")
+        self.manifest_file = self.output_dir / NDJSON_MANIFEST_FILENAME
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._close_spool()
+        for shard in self.shards:
+            shard.spool_file.unlink(missing_ok=True)
+        if exc_type is not None:
+            # 出错时不保留不完整的导出目录
+            shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    @property
+    def bytes_written(self) -> int:
+        """已写入的字节数，写出完成前为暂存的消息字节数，之后为全部分片文件的大小"""
+        if not self._finished:
+            return sum(shard.size for shard in self.shards)
+        return self.file_size
+
+    def _close_spool(self) -> None:
+        if self._spool is not None and not self._spool.closed:
+            self._spool.close()
+
+    def _new_shard(self, period: Optional[str]) -> _Shard:
+        self._close_spool()
+        index = len(self.shards) + 1
+        shard = _Shard(index, self.output_dir / f"part-{index:05d}.ndjson.part", period)
+        self.shards.append(shard)
+        self._spool = open(shard.spool_file, "wb")
+        return shard
+
+    def _needs_new_shard(self, shard: Optional[_Shard], period: Optional[str], line_size: int) -> bool:
+        if shard is None:
+            return True
+        if not shard.message_count:
+            return False
+        if self.split_by_month and period != shard.period:
+            return True
+        return self.split_size is not None and shard.size + line_size > self.split_size
+
+    def write_messages(self, messages: list[Union[ExportMessage, dict[str, Any]]]) -> None:
+        """
+        写入一批消息
+
+        Args:
+            messages: 导出消息列表，可以是 `ExportMessage`，
+                也可以是快速路径生成的同结构字典
+        """
+        if self._finished:
+            raise RuntimeError("NDJSONWriter is already finished")
+
+        shard = self.shards[-1] if self.shards else None
+        for message in messages:
+            line = self._dump_message(message) + b"\n"
+            timestamp = message["timestamp"] if isinstance(message, dict) else message.timestamp
+            # ISO 时间戳的前 7 个字符为年月
+            period = timestamp[:7] if self.split_by_month else None
+            if self._needs_new_shard(shard, period, len(line)):
+                shard = self._new_shard(period)
+
+            self._spool.write(line)
+            shard.size += len(line)
+            shard.message_count += 1
+            if shard.first_timestamp is None:
+                shard.first_timestamp = timestamp
+            shard.last_timestamp = timestamp
+            self.message_count += 1
+
+    def _shard_info(self, shard: _Shard) -> dict[str, Any]:
+        return {
+            "index": shard.index,
+            "count": len(self.shards),
+            "messageCount": shard.message_count,
+            "firstTimestamp": shard.first_timestamp,
+            "lastTimestamp": shard.last_timestamp,
+            "period": shard.period,
+        }
+
+    def finish(self, statistics: Statistics) -> None:
+        """
+        写出全部分片和清单
+
+        Args:
+            statistics: 全部消息的统计信息
+        """
+        if self._finished:
+            raise RuntimeError("NDJSONWriter is already finished")
+
+        if not self.shards:
+            # 没有消息时仍然写出只有头部的分片
+            self._new_shard(None)
+        self._close_spool()
+        self._finished = True
+
+        header_prefix = (
+            b"{"
+            + self._field("metadata", self._dump_model(self.metadata), first=True)
+            + self._field("chatInfo", self._dump_model(self.chat_info))
+            + self._field("statistics", self._dump_model(statistics))
+            + self._field("exportOptions", self._dump_model(self.export_options))
+        )
+        for shard in self.shards:
+            shard.file = compressed_path(shard.spool_file.with_suffix(""), self.compression)
+            header = header_prefix + self._field("shard", self._dumps(self._shard_info(shard))) + b"}\n"
+            with open_output(shard.file, self.compression) as f:
+                f.write(header)
+                with open(shard.spool_file, "rb") as spool:
+                    shutil.copyfileobj(spool, f, COPY_BUFFER_SIZE)
+            shard.spool_file.unlink()
+            shard.file_size = shard.file.stat().st_size
+
+        manifest = {
+            "format": "ndjson",
+            "metadata": self.metadata.model_dump(mode="json"),
+            "chatInfo": self.chat_info.model_dump(mode="json"),
+            "statistics": statistics.model_dump(mode="json"),
+            "split": {"maxBytes": self.split_size, "byMonth": self.split_by_month},
+            "compression": self.compression,
+            "shards": [
+                {
+                    **self._shard_info(shard),
+                    "file": shard.file.name,
+                    "size": shard.file_size,
+                }
+                for shard in self.shards
+            ],
+        }
+        self.manifest_file.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        self.file_size = sum(shard.file_size for shard in self.shards)
+        logger.debug(f"Wrote {self.message_count} messages in {len(self.shards)} shards to {self.output_dir}")
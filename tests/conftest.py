@@ -0,0 +1,31 @@
+"""
+测试环境：初始化 NoneBot 并加载插件
+
+需要数据库的测试使用 `database` fixture，每个测试使用临时目录中单独的 SQLite 文件。
+"""
+import asyncio
+
+import nonebot
+import pytest
+from sqlalchemy.pool import NullPool
+
+nonebot.init(
+    driver="~fastapi",
+    alembic_startup_check=False,
+    localstore_use_cwd=False,
+    # 各个测试在不同的事件循环中访问数据库，不复用连接
+    sqlalchemy_engine_options={"poolclass": NullPool},
+)
+nonebot.load_plugin("nonebot_plugin_qq_chat_exporter")
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """使用空的 SQLite 数据库并按 ORM 模型建表"""
+    from nonebot_plugin_orm import init_orm, plugin_config
+
+    monkeypatch.setattr(
+        plugin_config, "sqlalchemy_database_url", f"sqlite+aiosqlite:///{tmp_path / 'test.db'}"
+    )
+    asyncio.run(init_orm())
+    return tmp_path / "test.db"
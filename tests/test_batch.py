@@ -0,0 +1,115 @@
+"""
+测试批量导出
+"""
+import asyncio
+import json
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from benchmarks.datagen import GROUP_ID, PRIVATE_USER_ID, SyntheticChat, populate_database
+from nonebot_plugin_qq_chat_exporter import batch
+from nonebot_plugin_qq_chat_exporter.batch import MANIFEST_FILENAME, export_batch
+from nonebot_plugin_qq_chat_exporter.progress import ExportCancelled, ExportProgress
+
+
+@pytest.mark.parametrize("chats, error", [
+    ([], "No chats"),
+    ([("group", "1"), ("channel", "2")], "Invalid chat_type"),
+])
+def test_export_batch_validates_chats(tmp_path, chats, error):
+    """测试聊天列表校验，校验失败时不创建任何文件"""
+    with pytest.raises(ValueError, match=error):
+        asyncio.run(export_batch(chats, output_dir=str(tmp_path / "out")))
+    assert not (tmp_path / "out").exists()
+
+
+def _read_archive(archive_file: str) -> tuple[dict, dict[str, dict]]:
+    """读取压缩包中的清单和各聊天的导出文件"""
+    with zipfile.ZipFile(archive_file) as archive:
+        files = {
+            name: json.loads(archive.read(name)) for name in archive.namelist() if name != MANIFEST_FILENAME
+        }
+        return json.loads(archive.read(MANIFEST_FILENAME)), files
+
+
+def test_export_batch_writes_archive_and_manifest(database, tmp_path):
+    """测试压缩包包含每个聊天的导出文件和清单，重复的聊天只导出一次"""
+    chats = [("group", GROUP_ID), ("private", PRIVATE_USER_ID), ("group", GROUP_ID)]
+
+    async def run():
+        await populate_database(SyntheticChat(500, members=8, seed=11))
+        return await export_batch(chats, output_dir=str(tmp_path / "out"), batch_size=64)
+
+    archive_file = asyncio.run(run())
+    manifest, files = _read_archive(archive_file)
+
+    assert [path.name for path in (tmp_path / "out").iterdir()] == [Path(archive_file).name]
+    assert sorted(files) == [f"group_{GROUP_ID}.json", f"private_{PRIVATE_USER_ID}.json"]
+    assert (manifest["total"], manifest["completed"], manifest["failed"]) == (2, 2, 0)
+    assert [(entry["chatType"], entry["chatId"]) for entry in manifest["chats"]] == chats[:2]
+    for entry in manifest["chats"]:
+        data = files[entry["file"]]
+        assert entry["status"] == "completed"
+        assert entry["messageCount"] == len(data["messages"]) > 0
+        assert data["chatInfo"]["type"] == entry["chatType"]
+
+
+def test_export_batch_reports_failed_chat(database, tmp_path, monkeypatch):
+    """测试单个聊天导出失败时记录在清单中，其他聊天照常导出"""
+    export_chat = batch._export_chat
+
+    async def failing_export_chat(chat_type, chat_id, *args, **kwargs):
+        if chat_type == "private":
+            raise RuntimeError("disk full")
+        return await export_chat(chat_type, chat_id, *args, **kwargs)
+
+    monkeypatch.setattr(batch, "_export_chat", failing_export_chat)
+
+    async def run():
+        await populate_database(SyntheticChat(300, members=5, seed=12))
+        return await export_batch(
+            [("private", PRIVATE_USER_ID), ("group", GROUP_ID)], output_dir=str(tmp_path / "out")
+        )
+
+    manifest, files = _read_archive(asyncio.run(run()))
+
+    assert sorted(files) == [f"group_{GROUP_ID}.json"]
+    assert (manifest["total"], manifest["completed"], manifest["failed"]) == (2, 1, 1)
+    failed, completed = manifest["chats"]
+    assert failed == {
+        "chatType": "private",
+        "chatId": PRIVATE_USER_ID,
+        "name": f"User {PRIVATE_USER_ID}",
+        "status": "failed",
+        "error": "RuntimeError: disk full",
+    }
+    assert completed["status"] == "completed"
+
+
+def test_export_batch_cancel_removes_archive(database, tmp_path, monkeypatch):
+    """测试取消时删除未完成的压缩包和临时目录"""
+    progress = ExportProgress()
+    export_chat = batch._export_chat
+
+    async def cancelling_export_chat(chat_type, chat_id, *args, **kwargs):
+        if chat_type == "private":
+            # 第一个聊天已经写入压缩包
+            progress.cancel()
+        return await export_chat(chat_type, chat_id, *args, **kwargs)
+
+    monkeypatch.setattr(batch, "_export_chat", cancelling_export_chat)
+
+    async def run():
+        await populate_database(SyntheticChat(300, members=5, seed=13))
+        await export_batch(
+            [("group", GROUP_ID), ("private", PRIVATE_USER_ID)],
+            output_dir=str(tmp_path / "out"),
+            concurrency=1,
+            progress=progress
+        )
+
+    with pytest.raises(ExportCancelled):
+        asyncio.run(run())
+    assert list((tmp_path / "out").iterdir()) == []
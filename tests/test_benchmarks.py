@@ -0,0 +1,49 @@
+"""
+测试基准测试的数据生成和结果比较
+"""
+from benchmarks.datagen import SCENE_GROUP, SyntheticChat
+from benchmarks.results import BenchmarkReport, BenchmarkResult, compare_reports
+
+
+def test_synthetic_chat_is_reproducible():
+    """测试相同参数生成相同的数据"""
+    first = list(SyntheticChat(2000, members=50, seed=7))
+    second = list(SyntheticChat(2000, members=50, seed=7))
+    other = list(SyntheticChat(2000, members=50, seed=8))
+
+    assert first == second
+    assert first != other
+    assert [m.time for m in first] == sorted(m.time for m in first)
+    # 以目标群为主，混有多种消息段
+    assert sum(m.scene == SCENE_GROUP for m in first) > 1500
+    segment_types = {segment["type"] for m in first for segment in m.message}
+    assert {"text", "image", "at", "reply", "face", "record"} <= segment_types
+
+
+def _report(**rates: float) -> BenchmarkReport:
+    return BenchmarkReport(benchmarks={
+        name: BenchmarkResult(name=name, items=1000, rounds=[1000 / rate, 2000 / rate])
+        for name, rate in rates.items()
+    })
+
+
+def test_compare_reports_uses_thresholds():
+    """测试按吞吐量和阈值判断回归"""
+    baseline = _report(parse=1000, export=1000, removed=1000)
+    current = _report(parse=800, export=800, added=10)
+
+    regressions = compare_reports(baseline, current, {"default": 0.15, "export": 0.25})
+    assert [r.name for r in regressions] == ["parse"]
+    assert round(regressions[0].slowdown, 2) == 0.2
+    assert compare_reports(baseline, _report(parse=900), {"default": 0.15}) == []
+
+
+def test_report_round_trip(tmp_path):
+    """测试结果 JSON 的读写"""
+    report = _report(parse=500)
+    report.parameters = {"messages": 1000}
+    report.save(tmp_path / "bench.json")
+
+    loaded = BenchmarkReport.load(tmp_path / "bench.json")
+    assert loaded.parameters == {"messages": 1000}
+    assert loaded.benchmarks["parse"].items_per_second == 500
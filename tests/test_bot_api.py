@@ -0,0 +1,112 @@
+"""
+测试机器人 API 缓存
+"""
+import asyncio
+
+import pytest
+
+from nonebot_plugin_qq_chat_exporter.bot_api import AsyncTTLCache
+
+
+class _Loader:
+    """记录调用次数的加载函数"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("api error")
+        return self.calls
+
+
+def test_cache_coalesces_concurrent_misses():
+    """测试并发的未命中只调用一次"""
+    async def run():
+        cache = AsyncTTLCache("test", ttl=60, stale_ttl=0, max_entries=8)
+        loader = _Loader(delay=0.01)
+        results = await asyncio.gather(*(cache.get("k", loader) for _ in range(5)))
+        assert await cache.get("k", loader) == 1
+        return cache, loader, results
+
+    cache, loader, results = asyncio.run(run())
+    assert results == [1] * 5
+    assert loader.calls == 1
+    assert cache.stats() == {"entries": 1, "hits": 1, "stale_hits": 0, "misses": 1, "coalesced": 4}
+
+
+def test_cache_refreshes_stale_entries_in_background():
+    """测试过期条目先返回旧值，再在后台刷新"""
+    async def run():
+        cache = AsyncTTLCache("test", ttl=0.05, stale_ttl=60, max_entries=8)
+        loader = _Loader()
+        assert await cache.get("k", loader) == 1
+        await asyncio.sleep(0.06)
+        # 旧值立即返回，后台刷新只启动一次
+        assert await cache.get("k", loader) == 1
+        assert await cache.get("k", loader) == 1
+        await asyncio.sleep(0.005)
+        assert await cache.get("k", loader) == 2
+        return cache, loader
+
+    cache, loader = asyncio.run(run())
+    assert loader.calls == 2
+    assert cache.stale_hits == 2
+    assert cache.hits == 1
+
+
+def test_cache_reloads_expired_entries():
+    """测试超过可用旧值期限的条目重新加载"""
+    async def run():
+        cache = AsyncTTLCache("test", ttl=0.01, stale_ttl=0.01, max_entries=8)
+        loader = _Loader()
+        await cache.get("k", loader)
+        await asyncio.sleep(0.03)
+        return await cache.get("k", loader), cache
+
+    value, cache = asyncio.run(run())
+    assert value == 2
+    assert cache.misses == 2
+
+
+def test_cache_does_not_store_failures():
+    """测试加载失败时不缓存，后台刷新失败时保留旧值"""
+    async def run():
+        cache = AsyncTTLCache("test", ttl=0.01, stale_ttl=60, max_entries=8)
+        loader = _Loader()
+        loader.fail = True
+        with pytest.raises(RuntimeError):
+            await cache.get("k", loader)
+        assert len(cache) == 0
+
+        loader.fail = False
+        assert await cache.get("k", loader) == 2
+        await asyncio.sleep(0.02)
+        loader.fail = True
+        assert await cache.get("k", loader) == 2
+        await asyncio.sleep(0.005)
+        assert await cache.get("k", loader) == 2
+
+    asyncio.run(run())
+
+
+def test_cache_evicts_least_recently_used():
+    """测试超出最大条目数时淘汰最久未使用的条目"""
+    async def run():
+        cache = AsyncTTLCache("test", ttl=60, stale_ttl=0, max_entries=2)
+        loader = _Loader()
+        await cache.get("a", loader)
+        await cache.get("b", loader)
+        await cache.get("a", loader)
+        await cache.get("c", loader)
+        await cache.get("a", loader)
+        await cache.get("b", loader)
+        return loader
+
+    loader = asyncio.run(run())
+    # b 被淘汰后重新加载
+    assert loader.calls == 4
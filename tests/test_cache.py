@@ -0,0 +1,97 @@
+"""
+测试导出结果缓存
+"""
+from datetime import datetime, timedelta, timezone
+
+from nonebot_plugin_qq_chat_exporter import cache as cache_module
+from nonebot_plugin_qq_chat_exporter.cache import ExportCache, ExportCacheKey, normalize_time
+
+
+def _key(chat_id: str = "999", watermark: int = 100) -> ExportCacheKey:
+    return ExportCacheKey("group", chat_id, None, None, None, None, watermark)
+
+
+def _file(tmp_path, name: str) -> str:
+    path = tmp_path / name
+    path.write_text("{}", encoding="utf-8")
+    return str(path)
+
+
+def test_cache_hit_and_miss(tmp_path):
+    """测试命中和未命中"""
+    cache = ExportCache(max_entries=4, ttl=0)
+    file_path = _file(tmp_path, "a.json")
+
+    assert cache.get(_key()) is None
+    cache.put(_key(), file_path)
+    assert cache.get(_key()) == file_path
+    # 有新消息时水位变化，不再命中
+    assert cache.get(_key(watermark=101)) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cache_replaces_old_watermark(tmp_path):
+    """测试同一导出的新水位条目替换旧条目"""
+    cache = ExportCache(max_entries=4, ttl=0)
+    cache.put(_key(watermark=100), _file(tmp_path, "a.json"))
+    cache.put(_key(chat_id="888"), _file(tmp_path, "b.json"))
+    cache.put(_key(watermark=101), _file(tmp_path, "c.json"))
+
+    assert len(cache) == 2
+    assert cache.get(_key(watermark=101)).endswith("c.json")
+
+
+def test_cache_lru_eviction(tmp_path):
+    """测试超过条目上限时淘汰最久未使用的条目"""
+    cache = ExportCache(max_entries=2, ttl=0)
+    cache.put(_key("1"), _file(tmp_path, "1.json"))
+    cache.put(_key("2"), _file(tmp_path, "2.json"))
+    cache.get(_key("1"))
+    cache.put(_key("3"), _file(tmp_path, "3.json"))
+
+    assert cache.get(_key("2")) is None
+    assert cache.get(_key("1")) is not None
+    assert cache.get(_key("3")) is not None
+
+
+def test_cache_ttl_eviction(tmp_path, monkeypatch):
+    """测试按存活时间淘汰"""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = ExportCache(max_entries=4, ttl=60)
+    cache.put(_key(), _file(tmp_path, "a.json"))
+
+    now[0] += 30
+    assert cache.get(_key()) is not None
+    now[0] += 31
+    assert cache.get(_key()) is None
+    assert len(cache) == 0
+
+
+def test_cache_drops_missing_file(tmp_path):
+    """测试导出文件被删除后不再命中"""
+    cache = ExportCache(max_entries=4, ttl=0)
+    file_path = _file(tmp_path, "a.json")
+    cache.put(_key(), file_path)
+    (tmp_path / "a.json").unlink()
+
+    assert cache.get(_key()) is None
+    assert len(cache) == 0
+
+
+def test_cache_disabled(tmp_path):
+    """测试条目上限为 0 时不缓存"""
+    cache = ExportCache(max_entries=0, ttl=0)
+    cache.put(_key(), _file(tmp_path, "a.json"))
+
+    assert not cache.enabled
+    assert cache.get(_key()) is None
+
+
+def test_normalize_time():
+    """测试带时区的时间转换为 UTC"""
+    aware = datetime(2025, 1, 1, 8, 0, tzinfo=timezone(timedelta(hours=8)))
+
+    assert normalize_time(aware) == datetime(2025, 1, 1, 0, 0)
+    assert normalize_time(datetime(2025, 1, 1)) == datetime(2025, 1, 1)
+    assert normalize_time(None) is None
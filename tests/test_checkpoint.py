@@ -0,0 +1,65 @@
+"""
+测试增量导出检查点
+"""
+from datetime import datetime
+
+from nonebot_plugin_qq_chat_exporter.checkpoint import Checkpoint, CheckpointStore
+
+
+def _make_checkpoint(file_path, **kwargs) -> Checkpoint:
+    data = {
+        "chat_type": "group",
+        "chat_id": "999",
+        "file_path": str(file_path),
+        "last_time": datetime(2025, 1, 1, 3, 20, 1, 123456),
+        "last_id": 42,
+        "message_count": 10,
+        "header_size": 4200,
+        "messages_end": 9000,
+        "file_size": 5,
+        "senders": {"u_1": {"uid": "u_1", "name": "测试用户", "messageCount": 10}},
+    }
+    data.update(kwargs)
+    return Checkpoint(**data)
+
+
+def test_checkpoint_store_roundtrip(tmp_path):
+    """测试检查点的保存和读取"""
+    store = CheckpointStore(tmp_path / "checkpoints.json")
+    checkpoint = _make_checkpoint(tmp_path / "export.json")
+
+    assert store.get("group", "999") is None
+    store.save(checkpoint)
+    store.save(_make_checkpoint(tmp_path / "other.json", chat_type="private", chat_id="1"))
+
+    loaded = store.get("group", "999")
+    assert loaded == checkpoint
+    assert loaded.last_key == (datetime(2025, 1, 1, 3, 20, 1, 123456), 42)
+    assert store.get("private", "1") is not None
+
+    store.remove("group", "999")
+    assert store.get("group", "999") is None
+    assert store.get("private", "1") is not None
+
+
+def test_checkpoint_store_ignores_corrupt_file(tmp_path):
+    """测试检查点文件损坏时视为没有检查点"""
+    path = tmp_path / "checkpoints.json"
+    path.write_text("{not json", encoding="utf-8")
+
+    assert CheckpointStore(path).get("group", "999") is None
+
+
+def test_checkpoint_can_resume(tmp_path):
+    """测试只有文件未被修改且开始时间一致时才能续接"""
+    export_file = tmp_path / "export.json"
+    checkpoint = _make_checkpoint(export_file)
+
+    assert not checkpoint.can_resume(None)
+
+    export_file.write_bytes(b"12345")
+    assert checkpoint.can_resume(None)
+    assert not checkpoint.can_resume(datetime(2024, 1, 1))
+
+    export_file.write_bytes(b"123456")
+    assert not checkpoint.can_resume(None)
@@ -0,0 +1,174 @@
+"""
+测试列式导出
+"""
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from nonebot_plugin_qq_chat_exporter import compression
+from nonebot_plugin_qq_chat_exporter.columnar import (
+    COLUMNS,
+    PARQUET_METADATA_KEY,
+    ColumnarWriter,
+    CSVExportWriter,
+    ParquetExportWriter,
+    create_columnar_writer,
+    pyarrow,
+)
+from nonebot_plugin_qq_chat_exporter.converter import MessageConverter, MessageRow
+from nonebot_plugin_qq_chat_exporter.exporter import _check_export_options
+from nonebot_plugin_qq_chat_exporter.models import ChatInfo, Statistics
+
+
+def _make_row(index: int, message) -> MessageRow:
+    return MessageRow(
+        id=index,
+        time=datetime(2025, 1, 1, 3, 20, index),
+        message_id=f"msg_{index}",
+        type="message",
+        message=message,
+        session_persist_id=1,
+        user_id=str(10 + index % 2),
+        user_name=None,
+    )
+
+
+def _rows() -> list[MessageRow]:
+    return [
+        _make_row(1, [{"type": "text", "data": {"text": "hi"}}]),
+        _make_row(2, None),
+        _make_row(3, [
+            {"type": "text", "data": {"text": "看图"}},
+            {"type": "image", "data": {"file": "a.jpg"}},
+            {"type": "image", "data": {"file": "b.jpg"}},
+        ]),
+        _make_row(4, [{"type": "record", "data": {"file": "a.amr"}}]),
+    ]
+
+
+def _write(writer, batches) -> None:
+    converter = MessageConverter("group", "999", {"11": "张三"})
+    with writer:
+        for batch in batches:
+            converted_rows: list[MessageRow] = []
+            messages = converter.convert(batch, converted_rows)
+            writer.write_rows(converted_rows, messages)
+        writer.finish(Statistics())
+
+
+def test_convert_reports_converted_rows():
+    """测试 converted_rows 跳过无法转换的行，与返回的消息一一对应"""
+    converted_rows: list[MessageRow] = []
+    messages = MessageConverter("group", "999").convert(_rows(), converted_rows)
+
+    assert [row.message_id for row in converted_rows] == ["msg_1", "msg_3", "msg_4"]
+    assert [message["messageId"] for message in messages] == ["msg_1", "msg_3", "msg_4"]
+
+
+def test_csv_writer(tmp_path):
+    """测试 CSV 写入器"""
+    rows = _rows()
+    writer = CSVExportWriter(tmp_path / "out.csv", ChatInfo(name="测试群", type="group"))
+    _write(writer, [rows[:2], rows[2:]])
+
+    with open(tmp_path / "out.csv", encoding="utf-8", newline="") as f:
+        records = list(csv.reader(f))
+    assert tuple(records[0]) == COLUMNS
+    data = [dict(zip(COLUMNS, record)) for record in records[1:]]
+    assert writer.message_count == 3
+    assert writer.file_size == (tmp_path / "out.csv").stat().st_size
+    assert [record["message_id"] for record in data] == ["msg_1", "msg_3", "msg_4"]
+    assert data[0]["sender_name"] == "张三"
+    assert data[0]["timestamp"] == "2025-01-01T03:20:01.000Z"
+    assert data[1]["segment_types"] == "text;image;image"
+    assert data[1]["image_count"] == "2"
+    assert data[1]["resource_count"] == "2"
+    assert data[2]["audio_count"] == "1"
+
+
+def test_csv_writer_removes_partial_output_on_error(tmp_path):
+    """测试出错时删除不完整的文件"""
+    writer = CSVExportWriter(tmp_path / "out.csv", ChatInfo(name="测试群", type="group"))
+    with pytest.raises(RuntimeError):
+        with writer:
+            writer.write_rows([], [])
+            raise RuntimeError("boom")
+    assert not (tmp_path / "out.csv").exists()
+
+
+def test_create_columnar_writer_compressed_csv(tmp_path):
+    """测试压缩的 CSV 输出路径和内容"""
+    writer = create_columnar_writer(
+        tmp_path / "group_999", "csv", ChatInfo(name="测试群", type="group"), "gzip"
+    )
+    assert writer.output_file == tmp_path / "group_999.csv.gz"
+    _write(writer, [_rows()])
+
+    with gzip.open(writer.output_file, "rt", encoding="utf-8", newline="") as f:
+        records = list(csv.reader(io.StringIO(f.read())))
+    assert len(records) == 4
+
+    with pytest.raises(ValueError):
+        create_columnar_writer(tmp_path / "x", "xlsx", ChatInfo(name="测试群", type="group"))
+
+
+@pytest.mark.skipif(pyarrow is None, reason="pyarrow is not installed")
+def test_parquet_writer_row_groups(tmp_path):
+    """测试 Parquet 写入器按行组写出并保存元数据"""
+    import pyarrow.parquet
+
+    rows = [_make_row(i, [{"type": "text", "data": {"text": f"消息 {i}"}}]) for i in range(1, 11)]
+    writer = create_columnar_writer(tmp_path / "group_999", "parquet", ChatInfo(name="测试群", type="group"))
+    assert isinstance(writer, ParquetExportWriter)
+    writer.row_group_size = 4
+    _write(writer, [rows[:3], rows[3:7], rows[7:]])
+
+    parquet_file = pyarrow.parquet.ParquetFile(tmp_path / "group_999.parquet")
+    assert parquet_file.metadata.num_rows == 10
+    assert parquet_file.metadata.num_row_groups == 3
+    assert parquet_file.schema_arrow.names == list(COLUMNS)
+
+    table = parquet_file.read()
+    assert table.column("message_id").to_pylist() == [f"msg_{i}" for i in range(1, 11)]
+    assert table.column("timestamp").to_pylist()[0] == rows[0].time.replace(tzinfo=timezone.utc)
+    assert table.column("segment_types").to_pylist()[0] == ["text"]
+
+    metadata = json.loads(parquet_file.metadata.metadata[PARQUET_METADATA_KEY.encode()])
+    assert metadata["chatInfo"]["name"] == "测试群"
+    assert "statistics" in metadata
+
+
+def test_columnar_writer_is_abstract(tmp_path):
+    """测试基类不能直接使用"""
+    with pytest.raises(TypeError):
+        ColumnarWriter(tmp_path / "out", ChatInfo(name="测试群", type="group"))
+
+
+@pytest.mark.skipif(pyarrow is None, reason="pyarrow is not installed")
+def test_parquet_compression_options(tmp_path, monkeypatch):
+    """测试 Parquet 的压缩编码按 pyarrow 支持的编码校验，不依赖 zstandard"""
+    import pyarrow.parquet
+
+    monkeypatch.setattr(compression, "zstandard", None)
+    assert _check_export_options("zstd", False, "parquet") == "zstd"
+    assert _check_export_options("snappy", False, "parquet") == "snappy"
+    assert _check_export_options(None, False, "parquet") is None
+    with pytest.raises(ValueError, match="zstandard"):
+        _check_export_options("zstd", False, "csv")
+    with pytest.raises(ValueError, match="Invalid Parquet compression"):
+        _check_export_options("xz", False, "parquet")
+    with pytest.raises(ValueError, match="Invalid compression"):
+        _check_export_options("snappy", False, "json")
+
+    rows = [_make_row(1, [{"type": "text", "data": {"text": "消息"}}])]
+    for codec, expected in (("none", "UNCOMPRESSED"), ("snappy", "SNAPPY"), (None, "ZSTD")):
+        writer = create_columnar_writer(
+            tmp_path / f"group_{codec}", "parquet", ChatInfo(name="测试群", type="group"), codec
+        )
+        _write(writer, [rows])
+        metadata = pyarrow.parquet.ParquetFile(writer.output_file).metadata
+        assert metadata.row_group(0).column(0).compression == expected
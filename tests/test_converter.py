@@ -1,7 +1,21 @@
 """
 测试消息转换功能
 """
-from nonebot_plugin_qq_chat_exporter.converter import parse_message_content
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from nonebot_plugin_qq_chat_exporter.config import plugin_config
+from nonebot_plugin_qq_chat_exporter.converter import (
+    MessageConverter,
+    MessageRow,
+    convert_records_to_export_messages,
+    convert_rows_to_export_dicts,
+    convert_rows_to_export_messages,
+    message_row_from_models,
+    new_resource_stats,
+    parse_message_content,
+)
 from nonebot_plugin_qq_chat_exporter.models import (
     ChatInfo,
     ExportData,
@@ -12,6 +26,7 @@ from nonebot_plugin_qq_chat_exporter.models import (
     MessageStats,
     Statistics,
 )
+from nonebot_plugin_qq_chat_exporter.segments import register_segment_handler, unregister_segment_handler
 
 
 def test_parse_text_message():
@@ -52,6 +67,164 @@ def test_parse_at_message():
     assert text == "@123456 你好"
 
 
+def _make_record(message_id, user_id, message):
+    """构造 (消息记录, 会话模型, 用户模型) 元组"""
+    record = SimpleNamespace(
+        message_id=message_id,
+        message=message,
+        time=datetime(2025, 1, 1, 3, 20, 1),
+        type="message",
+        session_persist_id=1
+    )
+    session = SimpleNamespace(id=1, user_persist_id=1)
+    user = SimpleNamespace(user_id=user_id)
+    return record, session, user
+
+
+def test_convert_accumulates_across_batches():
+    """测试分批转换时统计信息累加"""
+    sender_stats = {}
+    resource_totals = new_resource_stats()
+    image = [{"type": "image", "data": {}}]
+    text = [{"type": "text", "data": {"text": "hi"}}]
+
+    first, _ = convert_records_to_export_messages(
+        [_make_record("1", "10", image), _make_record("2", "20", text)],
+        "group", "999",
+        sender_stats=sender_stats, resource_totals=resource_totals
+    )
+    second, statistics = convert_records_to_export_messages(
+        [_make_record("3", "10", text)],
+        "group", "999",
+        sender_stats=sender_stats, resource_totals=resource_totals
+    )
+
+    assert len(first) == 2
+    assert len(second) == 1
+    senders = {s["uid"]: s for s in statistics["senders"]}
+    assert senders["u_10"]["messageCount"] == 2
+    assert senders["u_10"]["percentage"] == 66.67
+    assert senders["u_20"]["percentage"] == 33.33
+    assert statistics["resources"]["image"] == 1
+
+
+def test_convert_rows_matches_models():
+    """测试按列查询的消息行与 ORM 实体转换结果一致"""
+    message = [{"type": "text", "data": {"text": "hello"}}]
+    record, session, _ = _make_record("1", "10", message)
+    user = SimpleNamespace(user_id="10", user_data={"name": "Alice"})
+    row = MessageRow(
+        id=None,
+        time=record.time,
+        message_id="1",
+        type="message",
+        message=message,
+        session_persist_id=1,
+        user_id="10",
+        user_name="Alice"
+    )
+
+    assert message_row_from_models(record, session, user) == row
+
+    from_rows, rows_stats = convert_rows_to_export_messages([row], "private", "10")
+    from_models, models_stats = convert_records_to_export_messages(
+        [(record, session, user)], "private", "10"
+    )
+
+    assert from_rows[0].model_dump() == from_models[0].model_dump()
+    assert from_rows[0].sender.name == "Alice"
+    assert rows_stats == models_stats
+
+
+def test_fast_path_matches_schema():
+    """测试快速路径生成的字典与 pydantic 模型序列化结果一致"""
+    rows = [
+        MessageRow(
+            id=1,
+            time=datetime(2025, 1, 1, 3, 20, 1),
+            message_id="1",
+            type="message",
+            message=[
+                {"type": "text", "data": {"text": "看图"}},
+                {"type": "image", "data": {"url": "http://example.com/a.jpg"}},
+                {"type": "at", "data": {"qq": "all"}},
+            ],
+            session_persist_id=1,
+            user_id="10",
+            user_name="Alice"
+        ),
+        MessageRow(
+            id=2,
+            time=datetime(2025, 1, 2, 3, 20, 1),
+            message_id="2",
+            type="message_sent",
+            message=[],
+            session_persist_id=2,
+            user_id="20",
+            user_name=None
+        ),
+    ]
+
+    dicts, dict_stats = convert_rows_to_export_dicts(rows, "group", "999", {"20": "Bob"})
+    messages, message_stats = convert_rows_to_export_messages(rows, "group", "999", {"20": "Bob"})
+
+    assert dict_stats == message_stats
+    for export_dict, message in zip(dicts, messages):
+        # 键顺序也必须一致，保证序列化结果逐字节相同
+        assert list(export_dict) == list(message.model_dump(mode="json"))
+        assert export_dict == message.model_dump(mode="json")
+
+    expected = ExportMessage(
+        messageId="1",
+        timestamp="2025-01-01T03:20:01.000Z",
+        sender=MessageSender(uid="u_10", uin="10", name="Alice"),
+        receiver=MessageReceiver(uid="999", type="group"),
+        isSystemMessage=False,
+        content=MessageContent(
+            text="看图[图片]@全体成员",
+            raw="看图[图片]@全体成员",
+            resources=[{"type": "image", "data": {"url": "http://example.com/a.jpg"}}]
+        ),
+        stats=MessageStats(elementCount=3, resourceCount=1, textLength=11)
+    )
+    assert dicts[0] == expected.model_dump(mode="json")
+    assert dicts[1]["sender"]["name"] == "Bob"
+    assert dicts[1]["isSystemMessage"] is True
+
+
+def test_converter_reuses_sender_and_receiver():
+    """测试同一次导出中复用发送者和接收者对象"""
+    def make_row(index, user_id, message):
+        return MessageRow(
+            id=index,
+            time=datetime(2025, 1, 1, 3, 20, index),
+            message_id=str(index),
+            type="message",
+            message=message,
+            session_persist_id=1,
+            user_id=user_id,
+            user_name=None
+        )
+
+    text = [{"type": "text", "data": {"text": "hi"}}]
+    # 第二个消息段缺少 data，整条消息转换失败，其中的图片不计入统计
+    broken = [{"type": "image", "data": {}}, {"type": "text", "data": None}]
+    converter = MessageConverter("group", "999", {"10": "Alice"})
+
+    first = converter.convert([make_row(1, "10", text), make_row(2, "20", text)])
+    second = converter.convert([make_row(3, "10", text), make_row(4, "10", broken)])
+
+    assert len(first) == 2
+    assert len(second) == 1
+    assert first[0]["sender"] is second[0]["sender"]
+    assert first[0]["receiver"] is first[1]["receiver"] is second[0]["receiver"]
+    assert second[0]["sender"] == {"uid": "u_10", "uin": "10", "name": "Alice"}
+
+    statistics = converter.statistics()
+    assert [s["messageCount"] for s in statistics["senders"]] == [2, 1]
+    assert statistics["resources"]["image"] == 0
+
+
 def test_export_message_model():
     """测试导出消息模型"""
     sender = MessageSender(
@@ -114,6 +287,44 @@ def test_export_data_model():
     assert export_data.messages[0].messageId == "msg_001"
 
 
+def _slow_text(data: dict) -> str:
+    time.sleep(0.002)
+    return data.get("text", "")
+
+
+def test_processing_time_is_opt_in(monkeypatch):
+    """测试默认不记录转换耗时，导出结果确定；开启配置后记录每条消息的耗时"""
+    rows = [
+        MessageRow(
+            id=i,
+            time=datetime(2025, 1, 1, 3, 20, i),
+            message_id=str(i),
+            type="message",
+            message=[{"type": "slow", "data": {"text": f"消息 {i}"}}],
+            session_persist_id=1,
+            user_id="10",
+            user_name="Alice"
+        )
+        for i in range(3)
+    ]
+    register_segment_handler("slow", _slow_text)
+    try:
+        first = MessageConverter("group", "999").convert(rows)
+        second = MessageConverter("group", "999").convert(rows)
+        monkeypatch.setattr(plugin_config, "qq_chat_exporter_record_processing_time", True)
+        from_config = MessageConverter("group", "999").convert(rows)
+        explicit = MessageConverter("group", "999", record_processing_time=False).convert(rows)
+    finally:
+        unregister_segment_handler("slow")
+
+    assert [message["stats"]["processingTime"] for message in first] == [0, 0, 0]
+    assert first == second
+    assert explicit == first
+    # 处理器耗时 2 毫秒，记录的耗时不少于 2000 微秒
+    assert all(message["stats"]["processingTime"] >= 2000 for message in from_config)
+    assert [{**m, "stats": {**m["stats"], "processingTime": 0}} for m in from_config] == first
+
+
 if __name__ == "__main__":
     # 运行测试
     test_parse_text_message()
@@ -0,0 +1,64 @@
+"""
+测试文件下载的范围请求和条件请求
+"""
+import os
+
+import pytest
+
+from nonebot_plugin_qq_chat_exporter.download import (
+    RangeNotSatisfiable,
+    etag_matches,
+    file_etag,
+    parse_range,
+)
+
+
+def test_parse_range():
+    """测试单个字节范围的解析"""
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=500-", 1000) == (500, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=-5000", 1000) == (0, 999)
+    # 结束位置超出文件大小时截断
+    assert parse_range("bytes=900-5000", 1000) == (900, 999)
+
+
+@pytest.mark.parametrize("header", [
+    "items=0-10",
+    "bytes=0-10,20-30",
+    "bytes=abc-",
+    "bytes=10-5",
+    "bytes=5",
+    "bytes=-",
+])
+def test_parse_range_ignores_invalid_headers(header):
+    """测试格式错误或多个范围时按完整文件响应"""
+    assert parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=1000-", 1000),
+    ("bytes=-0", 1000),
+    ("bytes=0-", 0),
+])
+def test_parse_range_not_satisfiable(header, size):
+    """测试超出文件大小的范围"""
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, size)
+
+
+def test_etag_changes_with_file(tmp_path):
+    """测试 ETag 随文件内容变化，并按弱比较匹配 If-None-Match"""
+    path = tmp_path / "export.json"
+    path.write_bytes(b"{}")
+    etag = file_etag(path.stat())
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+
+    path.write_bytes(b'{"a":1}')
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 1))
+    assert file_etag(path.stat()) != etag
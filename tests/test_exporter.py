@@ -0,0 +1,133 @@
+"""
+测试导出服务
+"""
+import asyncio
+import gzip
+import json
+import math
+
+import pytest
+
+from benchmarks.datagen import GROUP_ID, SyntheticChat, populate_database
+from nonebot_plugin_qq_chat_exporter import exporter
+from nonebot_plugin_qq_chat_exporter.exporter import (
+    _export_chat,
+    _group_filters,
+    _load_records_with_info,
+    export_group_messages,
+    export_private_messages,
+)
+from nonebot_plugin_qq_chat_exporter.fetch import MAX_IN_PARAMS, QueryTimings, iter_message_records
+from nonebot_plugin_qq_chat_exporter.metrics import EXPORT_FAILURES, EXPORTS, ExportMetrics
+from nonebot_plugin_qq_chat_exporter.progress import ExportProgress, ExportTimeout
+
+
+def test_load_records_with_info_chunks_sessions(database):
+    """测试会话数超过 IN 列表上限时分块加载，结果完整且保持记录顺序"""
+    chat = SyntheticChat(6000, members=600, seed=5)
+
+    async def run():
+        await populate_database(chat)
+        records = [
+            record async for batch in iter_message_records(batch_size=50_000) for record in batch
+        ]
+        timings = QueryTimings()
+        return records, await _load_records_with_info(records, timings), timings
+
+    records, loaded, timings = asyncio.run(run())
+
+    sessions = {record.session_persist_id for record in records}
+    assert len(sessions) > MAX_IN_PARAMS
+    assert timings.entries["sessions_with_users"]["queries"] == math.ceil(len(sessions) / MAX_IN_PARAMS)
+
+    assert [record.id for record, _, _ in loaded] == [record.id for record in records]
+    for record, session, user in loaded:
+        assert session.id == record.session_persist_id
+        assert user.id == session.user_persist_id
+
+
+def test_timed_out_export_counts_as_failure(database, tmp_path):
+    """测试超过期限的导出记为失败而不是取消，且不留下导出文件"""
+    failed = EXPORTS.get(chat_type="group", format="json", status="failed")
+    cancelled = EXPORTS.get(chat_type="group", format="json", status="cancelled")
+    timeouts = EXPORT_FAILURES.get(error="ExportTimeout")
+    output_dir = tmp_path / "exports"
+
+    async def run():
+        await populate_database(SyntheticChat(200, members=5, seed=7))
+        progress = ExportProgress()
+        progress.set_timeout(0)
+        await _export_chat(
+            "group", GROUP_ID, "Group", _group_filters(GROUP_ID, None, None), {},
+            str(output_dir), 50, progress=progress, metrics=ExportMetrics("group", "json")
+        )
+
+    with pytest.raises(ExportTimeout):
+        asyncio.run(run())
+
+    assert EXPORTS.get(chat_type="group", format="json", status="failed") == failed + 1
+    assert EXPORTS.get(chat_type="group", format="json", status="cancelled") == cancelled
+    assert EXPORT_FAILURES.get(error="ExportTimeout") == timeouts + 1
+    assert list(output_dir.iterdir()) == []
+
+
+def test_compressed_export_keeps_field_order(database, tmp_path):
+    """测试压缩导出解压后与不压缩时字段顺序相同，统计信息在导出前计算且与消息一致"""
+    async def run():
+        await populate_database(SyntheticChat(500, members=20, seed=11))
+        filters = _group_filters(GROUP_ID, None, None)
+        return [
+            await _export_chat(
+                "group", GROUP_ID, "Group", filters, {}, str(tmp_path / name), 64, compression=compression
+            )
+            for name, compression in (("plain", None), ("gzip", "gzip"))
+        ]
+
+    plain_file, gzip_file = asyncio.run(run())
+
+    with open(plain_file, "rb") as f:
+        plain = json.loads(f.read())
+    with gzip.open(gzip_file, "rb") as f:
+        compressed = json.loads(f.read())
+
+    assert list(plain) == ["metadata", "chatInfo", "statistics", "messages", "exportOptions"]
+    assert list(compressed) == list(plain)
+    for key in ("chatInfo", "statistics", "messages", "exportOptions"):
+        assert compressed[key] == plain[key]
+    assert plain["statistics"]["totalMessages"] == len(plain["messages"]) > 0
+
+
+def test_failures_before_export_are_counted(database, tmp_path, monkeypatch):
+    """测试参数错误和获取群成员失败也计入失败的导出，已经记录的结果不重复计数"""
+    def counts():
+        return (
+            EXPORTS.get(chat_type="group", format="json", status="failed"),
+            EXPORTS.get(chat_type="private", format="json", status="failed"),
+            EXPORT_FAILURES.get(error="ValueError"),
+            EXPORT_FAILURES.get(error="RuntimeError"),
+            EXPORT_FAILURES.get(error="ExportTimeout"),
+        )
+
+    async def broken_member_map(group_id, bot=None):
+        raise RuntimeError("no bot")
+
+    before = counts()
+
+    # 增量导出不支持压缩
+    with pytest.raises(ValueError):
+        asyncio.run(export_group_messages(GROUP_ID, compression="gzip", incremental=True))
+    with pytest.raises(ValueError):
+        asyncio.run(export_private_messages("20001", compression="gzip", incremental=True))
+
+    monkeypatch.setattr(exporter, "_get_group_member_map", broken_member_map)
+    with pytest.raises(RuntimeError):
+        asyncio.run(export_group_messages(GROUP_ID, output_dir=str(tmp_path)))
+
+    # _export_chat 中超时已经记录为失败，入口处不再重复计数
+    progress = ExportProgress()
+    progress.set_timeout(0)
+    with pytest.raises(ExportTimeout):
+        asyncio.run(export_private_messages("20001", output_dir=str(tmp_path), progress=progress))
+
+    after = counts()
+    assert [b - a for a, b in zip(before, after)] == [2, 2, 2, 1, 1]
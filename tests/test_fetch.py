@@ -0,0 +1,179 @@
+"""
+测试拉取辅助函数
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.datagen import GROUP_ID, SCENE_GROUP, SyntheticChat, populate_database
+from nonebot_plugin_qq_chat_exporter.exporter import _group_filters
+from nonebot_plugin_qq_chat_exporter.fetch import (
+    QueryTimings,
+    chunked,
+    iter_message_records,
+    iter_message_rows,
+    iter_message_rows_partitioned,
+    iter_windows_concurrently,
+    split_time_range,
+)
+
+
+def test_chunked():
+    """测试 IN 列表分块"""
+    chunks = list(chunked(list(range(7)), 3))
+
+    assert chunks == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(chunked([], 3)) == []
+
+
+def test_query_timings():
+    """测试查询耗时汇总"""
+    timings = QueryTimings()
+    timings.record("records", 0.5, 100)
+    timings.record("records", 0.25, 50)
+
+    entry = timings.entries["records"]
+    assert entry["queries"] == 2
+    assert entry["rows"] == 150
+    assert entry["seconds"] == 0.75
+    assert "records: 2 queries, 150 rows" in timings.summary()
+
+
+def test_split_time_range():
+    """测试按时间等分窗口"""
+    start = datetime(2024, 1, 1)
+    bounds = split_time_range(start, start + timedelta(days=4), 4)
+
+    assert bounds == [start + timedelta(days=i) for i in (1, 2, 3)]
+    assert split_time_range(start, start, 4) == []
+    assert split_time_range(start, start + timedelta(days=4), 1) == []
+    # 跨度小于窗口数时去掉重复的分界点
+    assert split_time_range(start, start + timedelta(microseconds=2), 4) == [
+        start + timedelta(microseconds=1), start + timedelta(microseconds=2)
+    ]
+
+
+class _Source:
+    """按批输出的数据源，记录同时运行的数据源数"""
+
+    active = 0
+    max_active = 0
+
+    def __init__(self, name: str, batches: int, fail: bool = False):
+        self.name = name
+        self.batches = batches
+        self.fail = fail
+        self.closed = False
+
+    async def __aiter__(self):
+        _Source.active += 1
+        _Source.max_active = max(_Source.max_active, _Source.active)
+        try:
+            for i in range(self.batches):
+                await asyncio.sleep(0.001)
+                if self.fail:
+                    raise RuntimeError(self.name)
+                yield [f"{self.name}{i}"]
+        finally:
+            _Source.active -= 1
+            self.closed = True
+
+
+def test_iter_windows_concurrently_keeps_order():
+    """测试并发拉取的数据源按顺序输出"""
+    _Source.max_active = 0
+    sources = [_Source(name, 3) for name in "abcde"]
+
+    async def run():
+        return [
+            batch[0]
+            async for batch in iter_windows_concurrently(
+                [source.__aiter__() for source in sources], parallelism=2
+            )
+        ]
+
+    result = asyncio.run(run())
+    assert result == [f"{name}{i}" for name in "abcde" for i in range(3)]
+    assert _Source.max_active == 2
+    assert all(source.closed for source in sources)
+
+
+def test_iter_windows_concurrently_stops_on_error():
+    """测试数据源出错时抛出异常并停止其他数据源"""
+    sources = [_Source("a", 2), _Source("b", 2, fail=True), _Source("c", 50)]
+
+    async def run():
+        result = []
+        with pytest.raises(RuntimeError, match="b"):
+            async for batch in iter_windows_concurrently(
+                [source.__aiter__() for source in sources], parallelism=3
+            ):
+                result.append(batch[0])
+        return result
+
+    assert asyncio.run(run()) == ["a0", "a1"]
+    assert all(source.closed for source in sources)
+
+
+def test_keyset_paging_within_same_timestamp(database):
+    """测试分页边界落在同一时间的多条消息中间时不重复也不遗漏"""
+    # 平均间隔 0.02 秒，时间只保留到秒，每秒约 50 条消息
+    chat = SyntheticChat(300, members=10, seed=3, interval=0.02)
+    filters = _group_filters(GROUP_ID, None, None)
+
+    async def run():
+        await populate_database(chat)
+        rows = [row async for batch in iter_message_rows(batch_size=7, **filters) for row in batch]
+        records = [
+            record async for batch in iter_message_records(batch_size=7, **filters) for record in batch
+        ]
+        everything = [row async for batch in iter_message_rows(batch_size=10_000, **filters) for row in batch]
+        return rows, records, everything
+
+    rows, records, everything = asyncio.run(run())
+
+    times = [row.time for row in everything]
+    assert len(set(times)) < len(times) / 10
+    # 与一次查询全部消息的结果逐条相同：没有重复，也没有遗漏
+    assert [row.id for row in rows] == [row.id for row in everything]
+    assert [record.id for record in records] == [row.id for row in everything]
+    assert len({row.id for row in rows}) == len(rows)
+    assert len(rows) == sum(message.scene == SCENE_GROUP for message in chat)
+    assert [(row.time, row.id) for row in rows] == sorted((row.time, row.id) for row in rows)
+
+
+def test_partitioned_fetch_matches_sequential(database):
+    """测试按时间窗口并发拉取的结果与单个查询逐条相同，窗口分界点落在多条消息共享的时间上"""
+    # 平均间隔 0.02 秒，时间只保留到秒，每秒约 50 条消息
+    chat = SyntheticChat(3000, members=50, seed=13, interval=0.02)
+    filters = _group_filters(GROUP_ID, None, None)
+
+    async def collect(**kwargs):
+        return [row async for batch in iter_message_rows_partitioned(**kwargs, **filters) for row in batch]
+
+    async def run():
+        await populate_database(chat)
+        expected = await collect(batch_size=37, parallelism=1)
+        first, last = expected[0].time, expected[-1].time
+        # 每个窗口恰好一秒，分界点都是整秒，即消息的时间
+        seconds = int((last - first).total_seconds())
+        middle = expected[len(expected) // 2]
+        return expected, seconds, {
+            "default": await collect(batch_size=37, parallelism=4),
+            "whole_seconds": await collect(batch_size=37, parallelism=4, partitions=seconds),
+            "after": await collect(batch_size=37, parallelism=4, partitions=seconds, after=(middle.time, middle.id)),
+        }
+
+    expected, seconds, results = asyncio.run(run())
+
+    assert len(expected) == sum(message.scene == SCENE_GROUP for message in chat)
+    times = [row.time for row in expected]
+    first = times[0]
+    bounds = split_time_range(first, times[-1], seconds)
+    assert seconds > 10
+    assert all(times.count(bound) > 1 for bound in bounds)
+    for name in ("default", "whole_seconds"):
+        assert results[name] == expected, name
+    middle = len(expected) // 2
+    assert results["after"] == expected[middle + 1:]
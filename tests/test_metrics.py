@@ -0,0 +1,78 @@
+"""
+测试运行指标
+"""
+import pytest
+
+from nonebot_plugin_qq_chat_exporter.metrics import (
+    EXPORT_FAILURES,
+    EXPORTS,
+    STAGE_DURATION,
+    Counter,
+    ExportMetrics,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    _Metric,
+)
+
+
+def test_render_text_format():
+    """测试 Prometheus 文本格式的输出"""
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("demo_total", "Demo counter", ("kind",)))
+    gauge = registry.register(Gauge("demo_queue", "Demo gauge", ("state",)))
+    histogram = registry.register(Histogram("demo_seconds", "Demo histogram", (0.1, 1)))
+
+    counter.inc(kind='a"b')
+    counter.inc(2, kind='a"b')
+    gauge.set_function(lambda: {("queued",): 3, ("running",): 1})
+    for value in (0.05, 0.5, 0.5, 5):
+        histogram.observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP demo_total Demo counter",
+        "# TYPE demo_total counter",
+        'demo_total{kind="a\\"b"} 3',
+        "# HELP demo_queue Demo gauge",
+        "# TYPE demo_queue gauge",
+        'demo_queue{state="queued"} 3',
+        'demo_queue{state="running"} 1',
+        "# HELP demo_seconds Demo histogram",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{le="0.1"} 1',
+        'demo_seconds_bucket{le="1"} 3',
+        'demo_seconds_bucket{le="+Inf"} 4',
+        "demo_seconds_sum 6.05",
+        "demo_seconds_count 4",
+    ]
+
+    with pytest.raises(ValueError):
+        counter.inc(-1, kind="a")
+    with pytest.raises(ValueError):
+        counter.inc(other="a")
+    with pytest.raises(ValueError):
+        registry.register(Counter("demo_total", "Duplicate"))
+    with pytest.raises(TypeError):
+        _Metric("demo_base", "Abstract base")
+
+
+def test_export_metrics_records_once():
+    """测试阶段耗时计入全局直方图，导出结果只记录一次"""
+    fetches = STAGE_DURATION.count(stage="fetch")
+    succeeded = EXPORTS.get(chat_type="group", format="ndjson", status="success")
+    failed = EXPORTS.get(chat_type="group", format="ndjson", status="failed")
+    errors = EXPORT_FAILURES.get(error="OSError")
+
+    metrics = ExportMetrics("group", "ndjson")
+    with metrics.span("fetch"):
+        pass
+    metrics.record("fetch", 0.5)
+    assert metrics.stages["fetch"] >= 0.5
+    assert STAGE_DURATION.count(stage="fetch") == fetches + 2
+
+    metrics.finish("failed", OSError("disk full"))
+    # 导出函数在 finally 中总会尝试记为成功
+    metrics.finish("success")
+    assert EXPORTS.get(chat_type="group", format="ndjson", status="failed") == failed + 1
+    assert EXPORTS.get(chat_type="group", format="ndjson", status="success") == succeeded
+    assert EXPORT_FAILURES.get(error="OSError") == errors + 1
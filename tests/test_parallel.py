@@ -0,0 +1,154 @@
+"""
+测试多进程转换
+"""
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+from nonebot_plugin_qq_chat_exporter.converter import (
+    MessageRow,
+    build_statistics,
+    convert_rows_to_export_dicts,
+    new_resource_stats,
+)
+from nonebot_plugin_qq_chat_exporter.parallel import (
+    ParallelConverter,
+    _convert_chunk,
+    split_chunks,
+)
+from nonebot_plugin_qq_chat_exporter.segments import register_segment_handler, unregister_segment_handler
+from nonebot_plugin_qq_chat_exporter.serializer import dumps_stdlib
+
+
+def _make_rows(count: int) -> list[MessageRow]:
+    start = datetime(2025, 1, 1)
+    segments = [
+        [{"type": "text", "data": {"text": "你好"}}],
+        [{"type": "image", "data": {"url": "http://example.com/a.jpg"}}],
+        [{"type": "record", "data": {}}, {"type": "text", "data": {"text": "语音"}}],
+    ]
+    return [
+        MessageRow(
+            id=i,
+            time=start + timedelta(seconds=i),
+            message_id=str(i),
+            type="message",
+            message=segments[i % len(segments)],
+            session_persist_id=i % 7,
+            user_id=str(i % 7),
+            user_name=f"用户{i % 7}"
+        )
+        for i in range(count)
+    ]
+
+
+def _sequential(rows):
+    sender_stats = {}
+    resource_totals = new_resource_stats()
+    dicts, _ = convert_rows_to_export_dicts(
+        rows, "group", "999", {}, sender_stats=sender_stats, resource_totals=resource_totals
+    )
+    return b",".join(dumps_stdlib(d) for d in dicts), build_statistics(sender_stats, resource_totals)
+
+
+def test_convert_chunk_matches_sequential():
+    """测试单个分块的转换结果"""
+    rows = _make_rows(20)
+    fragment, count, sender_stats, resource_totals = _convert_chunk(
+        rows, "group", "999", {}, dumps_stdlib
+    )
+    expected_fragment, expected_stats = _sequential(rows)
+
+    assert count == 20
+    assert fragment == expected_fragment
+    assert build_statistics(sender_stats, resource_totals) == expected_stats
+
+
+def test_parallel_converter_preserves_order():
+    """测试多进程转换保持消息顺序并确定性地合并统计"""
+    rows = _make_rows(1000)
+
+    async def run():
+        converter = ParallelConverter(3, "group", "999", {}, dumps_stdlib)
+        sender_stats = {}
+        resource_totals = new_resource_stats()
+        fragments = []
+        for i in range(0, len(rows), 450):
+            futures = converter.submit(rows[i:i + 450])
+            fragments += await ParallelConverter.collect(futures, sender_stats, resource_totals)
+        return fragments, build_statistics(sender_stats, resource_totals)
+
+    fragments, statistics = asyncio.run(run())
+    expected_fragment, expected_stats = _sequential(rows)
+
+    assert sum(count for _, count in fragments) == 1000
+    assert b",".join(fragment for fragment, _ in fragments) == expected_fragment
+    assert statistics == expected_stats
+
+
+def test_split_chunks_gives_every_worker_work():
+    """测试每批消息均匀切分给所有工作进程，不受最小分块大小限制"""
+    rows = _make_rows(1000)
+
+    chunks = split_chunks(rows, 8)
+    assert [len(chunk) for chunk in chunks] == [125] * 8
+    assert [row for chunk in chunks for row in chunk] == rows
+
+    assert [len(chunk) for chunk in split_chunks(rows[:9], 4)] == [2, 2, 2, 3]
+    assert [len(chunk) for chunk in split_chunks(rows[:3], 4)] == [1, 1, 1]
+    assert split_chunks([], 4) == []
+
+
+def _shout(data: dict) -> str:
+    return data.get("text", "").upper()
+
+
+def test_parallel_converter_uses_all_workers_and_handlers():
+    """测试一批消息分给所有工作进程，主进程注册的消息段处理器在工作进程中生效"""
+    rows = [
+        row._replace(message=[{"type": "shout", "data": {"text": f"hi {row.id}"}}])
+        for row in _make_rows(40)
+    ]
+    register_segment_handler("shout", _shout)
+
+    async def run():
+        converter = ParallelConverter(4, "group", "999", {}, dumps_stdlib)
+        futures = converter.submit(rows)
+        return len(futures), await ParallelConverter.collect(futures, {}, new_resource_stats())
+
+    try:
+        submitted, fragments = asyncio.run(run())
+        expected_fragment, _ = _sequential(rows)
+    finally:
+        unregister_segment_handler("shout")
+
+    assert submitted == 4
+    assert [count for _, count in fragments] == [10, 10, 10, 10]
+    assert b",".join(fragment for fragment, _ in fragments) == expected_fragment
+    assert b"HI 0" in expected_fragment
+
+
+def _slow(data: dict) -> str:
+    time.sleep(0.002)
+    return "slow"
+
+
+def test_parallel_converter_records_processing_time():
+    """测试开启记录转换耗时后，工作进程中转换的消息同样记录耗时"""
+    rows = [row._replace(message=[{"type": "slow", "data": {}}]) for row in _make_rows(8)]
+    register_segment_handler("slow", _slow)
+
+    async def run(record_processing_time):
+        converter = ParallelConverter(2, "group", "999", {}, dumps_stdlib, record_processing_time)
+        fragments = await ParallelConverter.collect(converter.submit(rows), {}, new_resource_stats())
+        return json.loads(b"[" + b",".join(fragment for fragment, _ in fragments) + b"]")
+
+    try:
+        recorded = asyncio.run(run(True))
+        deterministic = asyncio.run(run(False))
+    finally:
+        unregister_segment_handler("slow")
+
+    assert all(message["stats"]["processingTime"] >= 2000 for message in recorded)
+    assert all(message["stats"]["processingTime"] == 0 for message in deterministic)
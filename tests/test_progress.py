@@ -0,0 +1,96 @@
+"""
+测试导出进度
+"""
+import asyncio
+
+import pytest
+
+from nonebot_plugin_qq_chat_exporter import progress as progress_module
+from nonebot_plugin_qq_chat_exporter.progress import (
+    ExportCancelled,
+    ExportProgress,
+    ExportTimeout,
+    ProgressHub,
+)
+
+
+def test_progress_snapshot_and_eta(monkeypatch):
+    """测试吞吐量和剩余时间估算"""
+    now = [100.0]
+    monkeypatch.setattr(progress_module.time, "monotonic", lambda: now[0])
+
+    progress = ExportProgress()
+    progress.set_stage("preparing")
+    progress.set_total(1000)
+    now[0] += 2.0
+    progress.update(fetched=500, converted=400, bytes_written=2048)
+
+    snapshot = progress.snapshot()
+    assert snapshot["stage"] == "preparing"
+    assert (snapshot["fetched"], snapshot["converted"], snapshot["bytes_written"]) == (500, 400, 2048)
+    assert snapshot["throughput"] == 200.0
+    assert snapshot["eta"] == 3.0
+
+
+def test_progress_throttles_updates(monkeypatch):
+    """测试同一阶段内的上报经过节流，阶段变化时立即上报"""
+    now = [0.0]
+    monkeypatch.setattr(progress_module.time, "monotonic", lambda: now[0])
+    reports = []
+
+    progress = ExportProgress(on_update=reports.append)
+    progress.set_stage("exporting")
+    progress.update(fetched=1)
+    now[0] += progress_module.REPORT_INTERVAL
+    progress.update(fetched=2)
+    progress.set_stage("finalizing")
+
+    assert [(r["stage"], r["fetched"]) for r in reports] == [
+        ("exporting", 0), ("exporting", 2), ("finalizing", 2)
+    ]
+
+
+def test_hub_keeps_latest_and_drops_oldest():
+    """测试订阅者积压过多时丢弃最旧的事件"""
+    async def run():
+        hub = ProgressHub()
+        with hub.subscribe("t") as queue:
+            for i in range(progress_module.SUBSCRIBER_QUEUE_SIZE + 2):
+                hub.publish("t", {"n": i})
+            assert hub.latest("t") == {"n": progress_module.SUBSCRIBER_QUEUE_SIZE + 1}
+            first = queue.get_nowait()
+            hub.publish("t", {"n": -1}, finished=True)
+        return hub, first
+
+    hub, first = asyncio.run(run())
+    assert first == {"n": 2}
+    assert hub.latest("t") is None
+    assert not hub._subscribers
+
+
+def test_progress_cancel_and_deadline(monkeypatch):
+    """测试取消和期限"""
+    now = [0.0]
+    monkeypatch.setattr(progress_module.time, "monotonic", lambda: now[0])
+
+    progress = ExportProgress()
+    progress.set_timeout(10)
+    progress.check_cancelled()
+    now[0] += 11
+    with pytest.raises(ExportTimeout):
+        progress.check_cancelled()
+
+    progress = ExportProgress()
+    progress.cancel()
+    with pytest.raises(ExportCancelled):
+        progress.check_cancelled()
+
+
+def test_child_progress_follows_parent_cancel():
+    """测试子进度随整体进度一起取消"""
+    parent = ExportProgress()
+    child = ExportProgress(parent=parent)
+    child.check_cancelled()
+    parent.cancel()
+    with pytest.raises(ExportCancelled):
+        child.check_cancelled()
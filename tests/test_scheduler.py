@@ -0,0 +1,222 @@
+"""
+测试导出任务调度器
+"""
+import asyncio
+
+from nonebot_plugin_qq_chat_exporter.progress import ProgressHub
+from nonebot_plugin_qq_chat_exporter.scheduler import ExportScheduler
+
+
+class _FakeStore:
+    """只记录更新的任务仓库"""
+
+    def __init__(self):
+        self.tasks: dict[str, dict] = {}
+
+    async def update(self, task_id: str, **values):
+        task = self.tasks.setdefault(task_id, {})
+        if task.get("status") in ("completed", "failed", "cancelled"):
+            return None
+        task.update(values)
+        return task
+
+
+def _runner(gate: asyncio.Event, calls: list, name: str):
+    async def run(progress):
+        calls.append(name)
+        await gate.wait()
+        return f"{name}.json", "导出成功"
+    return run
+
+
+def test_scheduler_limits_workers_and_orders_by_priority():
+    """测试并发上限、排队位置和优先级"""
+    async def run():
+        store = _FakeStore()
+        scheduler = ExportScheduler(max_workers=1, store=store)
+        gate = asyncio.Event()
+        calls = []
+
+        await scheduler.submit("t1", "a", _runner(gate, calls, "a"))
+        await scheduler.submit("t2", "b", _runner(gate, calls, "b"))
+        await scheduler.submit("t3", "c", _runner(gate, calls, "c"), priority=5)
+        await asyncio.sleep(0)
+
+        assert scheduler.running_count == 1
+        assert scheduler.queue_position("t1") is None
+        # 优先级高的 c 排在先提交的 b 前面
+        assert scheduler.queue_position("t3") == 1
+        assert scheduler.queue_position("t2") == 2
+
+        gate.set()
+        while scheduler.running_count or scheduler.queued_count:
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return store, calls
+
+    store, calls = asyncio.run(run())
+    assert calls == ["a", "c", "b"]
+    assert store.tasks["t2"]["status"] == "completed"
+    assert store.tasks["t2"]["file_path"] == "b.json"
+
+
+def test_scheduler_coalesces_identical_requests():
+    """测试相同的导出合并执行"""
+    async def run():
+        store = _FakeStore()
+        scheduler = ExportScheduler(max_workers=1, store=store)
+        gate = asyncio.Event()
+        calls = []
+
+        await scheduler.submit("t1", "busy", _runner(gate, calls, "busy"))
+        job = await scheduler.submit("t2", "same", _runner(gate, calls, "same"))
+        merged = await scheduler.submit("t3", "same", _runner(gate, calls, "other"), priority=1)
+        assert merged is job
+        assert job.task_ids == ["t2", "t3"]
+        assert job.priority == 1
+        assert scheduler.queue_position("t3") == 1
+
+        gate.set()
+        while scheduler.running_count or scheduler.queued_count:
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return store, calls
+
+    store, calls = asyncio.run(run())
+    assert calls == ["busy", "same"]
+    assert store.tasks["t2"]["file_path"] == store.tasks["t3"]["file_path"] == "same.json"
+
+
+def test_scheduler_marks_failed_jobs():
+    """测试导出失败时所有关联任务标记为失败"""
+    async def fail(progress):
+        raise ValueError("boom")
+
+    async def run():
+        store = _FakeStore()
+        scheduler = ExportScheduler(max_workers=2, store=store)
+        await scheduler.submit("t1", "x", fail)
+        await scheduler.submit("t2", "x", fail)
+        while scheduler.running_count:
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return store
+
+    store = asyncio.run(run())
+    for task_id in ("t1", "t2"):
+        assert store.tasks[task_id]["status"] == "failed"
+        assert "boom" in store.tasks[task_id]["message"]
+
+
+def test_scheduler_publishes_events():
+    """测试排队、进度和结束事件发布到所有关联任务"""
+    async def export(progress):
+        progress.set_total(10)
+        progress.set_stage("exporting")
+        progress.update(fetched=10, converted=10, bytes_written=100)
+        return "a.json", "导出成功"
+
+    async def run():
+        hub = ProgressHub()
+        scheduler = ExportScheduler(max_workers=1, store=_FakeStore(), hub=hub)
+        gate = asyncio.Event()
+        with hub.subscribe("t2") as queue:
+            await scheduler.submit("t1", "busy", _runner(gate, [], "busy"))
+            await scheduler.submit("t2", "a", export)
+            assert hub.latest("t2")["queue_position"] == 1
+            gate.set()
+            events = []
+            while not events or events[-1]["status"] != "completed":
+                events.append(await queue.get())
+        return hub, events, "t2" in scheduler
+
+    hub, events, in_scheduler = asyncio.run(run())
+    assert events[0]["status"] == "pending"
+    assert any(e["progress"]["stage"] == "exporting" for e in events)
+    assert events[-1]["file_path"] == "a.json"
+    assert events[-1]["progress"]["converted"] == 10
+    assert hub.latest("t2") is None
+    assert not in_scheduler
+
+
+async def _slow(progress):
+    """每批之间检查取消的慢导出"""
+    for _ in range(6000):
+        progress.check_cancelled()
+        await asyncio.sleep(0.01)
+    return "slow.json", "导出成功"
+
+
+def test_scheduler_cancels_queued_and_running_jobs():
+    """测试取消排队和执行中的任务"""
+    async def run():
+        store = _FakeStore()
+        scheduler = ExportScheduler(max_workers=1, store=store)
+        running = await scheduler.submit("t1", "slow", _slow)
+        await scheduler.submit("t2", "queued", _slow)
+        await scheduler.submit("t3", "slow", _slow)
+        await asyncio.sleep(0)
+
+        assert await scheduler.cancel("t2")
+        assert scheduler.queued_count == 0
+        # 合并的 job 上还有 t3，只移除 t1，不中止导出
+        assert await scheduler.cancel("t1")
+        assert not running.progress.cancelled
+        assert await scheduler.cancel("t3")
+        assert running.progress.cancelled
+        while scheduler.running_count:
+            await asyncio.sleep(0.01)
+        assert not await scheduler.cancel("t3")
+        return store
+
+    store = asyncio.run(run())
+    assert [store.tasks[t]["status"] for t in ("t1", "t2", "t3")] == ["cancelled"] * 3
+
+
+def test_scheduler_resubmits_after_cancelling_running_job():
+    """测试取消执行中的导出后，再次提交相同的请求会重新导出"""
+    async def run():
+        store = _FakeStore()
+        scheduler = ExportScheduler(max_workers=2, store=store)
+        gate = asyncio.Event()
+        calls = []
+        cancelled = await scheduler.submit("t1", "slow", _slow)
+        await asyncio.sleep(0)
+        assert await scheduler.cancel("t1")
+
+        resubmitted = await scheduler.submit("t2", "slow", _runner(gate, calls, "slow"))
+        assert resubmitted is not cancelled
+        await asyncio.sleep(0)
+        assert calls == ["slow"]
+        assert scheduler.running_count == 2
+
+        # 被取消的导出先结束，不影响新的 job
+        while cancelled in scheduler._running:
+            await asyncio.sleep(0.01)
+        assert scheduler.running_count == 1
+        assert "t2" in scheduler
+        gate.set()
+        while scheduler.running_count:
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return store
+
+    store = asyncio.run(run())
+    assert store.tasks["t1"]["status"] == "cancelled"
+    assert store.tasks["t2"]["status"] == "completed"
+    assert store.tasks["t2"]["file_path"] == "slow.json"
+
+def test_scheduler_enforces_deadline():
+    """测试超过期限的导出被中止并标记为失败"""
+    async def run():
+        store = _FakeStore()
+        scheduler = ExportScheduler(max_workers=1, store=store)
+        await scheduler.submit("t1", "slow", _slow, timeout=0.05)
+        while scheduler.running_count:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0)
+        return store
+
+    store = asyncio.run(run())
+    assert store.tasks["t1"]["status"] == "failed"
+    assert "超时" in store.tasks["t1"]["message"]
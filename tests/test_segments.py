@@ -0,0 +1,59 @@
+"""
+测试消息段处理器注册表
+"""
+import pytest
+
+from nonebot_plugin_qq_chat_exporter.converter import parse_message_content
+from nonebot_plugin_qq_chat_exporter.segments import (
+    SEGMENT_HANDLERS,
+    register_segment_handler,
+    unregister_segment_handler,
+)
+
+
+def test_unknown_segment_fallback():
+    """测试未注册的消息段"""
+    content, text, resource_stats = parse_message_content(
+        [{"type": "mface", "data": {"summary": "[开心]"}}]
+    )
+
+    assert text == "[mface]"
+    assert content.resources == []
+
+
+def test_register_custom_handler():
+    """测试注册新的消息段类型"""
+    @register_segment_handler("mface", resource_type="image")
+    def _(data):
+        return data.get("summary", "[商城表情]")
+
+    try:
+        content, text, resource_stats = parse_message_content(
+            [{"type": "mface", "data": {"summary": "[开心]"}}]
+        )
+    finally:
+        unregister_segment_handler("mface")
+
+    assert text == "[开心]"
+    assert resource_stats["image"] == 1
+    assert content.resources[0]["type"] == "image"
+    assert "mface" not in SEGMENT_HANDLERS
+
+
+def test_override_builtin_handler():
+    """测试覆盖内置消息段类型"""
+    original = SEGMENT_HANDLERS["reply"]
+    register_segment_handler("reply", lambda data: f"[回复{data.get('id', '')}]")
+    try:
+        _, text, _ = parse_message_content([{"type": "reply", "data": {"id": "42"}}])
+    finally:
+        register_segment_handler("reply", *original)
+
+    assert text == "[回复42]"
+
+
+def test_register_invalid_resource_type():
+    """测试资源类型校验"""
+    with pytest.raises(ValueError):
+        register_segment_handler("sticker", lambda data: "", resource_type="sticker")
+    assert "sticker" not in SEGMENT_HANDLERS
@@ -0,0 +1,43 @@
+"""
+测试 JSON 序列化后端
+"""
+import json
+
+import pytest
+
+from nonebot_plugin_qq_chat_exporter.serializer import (
+    dumps_orjson,
+    dumps_stdlib,
+    get_serializer,
+)
+
+SAMPLE = {
+    "messageId": "1",
+    "content": {"text": '你好，世界 "quoted" \\ \n\t\x1f', "resources": []},
+    "stats": {"elementCount": 1, "percentage": 33.33},
+    "rawMessage": None,
+    "isSystemMessage": False,
+}
+
+
+def test_stdlib_matches_json_dump():
+    """测试标准库后端与 json.dump 参数一致"""
+    expected = json.dumps(SAMPLE, ensure_ascii=False, indent=None, separators=(",", ":"))
+    assert dumps_stdlib(SAMPLE) == expected.encode("utf-8")
+
+
+def test_orjson_matches_stdlib():
+    """测试 orjson 后端输出与标准库一致"""
+    pytest.importorskip("orjson")
+    assert dumps_orjson(SAMPLE) == dumps_stdlib(SAMPLE)
+    # 超过 64 位的整数回退到标准库
+    assert dumps_orjson({"id": 2 ** 70}) == dumps_stdlib({"id": 2 ** 70})
+
+
+def test_get_serializer():
+    """测试后端选择"""
+    assert get_serializer("json") is dumps_stdlib
+    assert get_serializer("auto")(SAMPLE) == dumps_stdlib(SAMPLE)
+
+    with pytest.raises(ValueError):
+        get_serializer("pickle")
@@ -0,0 +1,125 @@
+"""
+测试统计信息构建
+"""
+import asyncio
+from datetime import datetime
+
+from benchmarks.datagen import GROUP_ID, SyntheticChat, populate_database
+from nonebot_plugin_qq_chat_exporter.converter import (
+    MessageConverter,
+    build_statistics,
+    count_resources,
+    merge_statistics,
+    new_resource_stats,
+)
+from nonebot_plugin_qq_chat_exporter.exporter import _group_filters
+from nonebot_plugin_qq_chat_exporter.fetch import iter_message_rows
+from nonebot_plugin_qq_chat_exporter.statistics import (
+    build_statistics_model,
+    build_time_range,
+    compute_statistics,
+)
+
+
+def test_build_time_range():
+    """测试时间范围计算"""
+    time_range = build_time_range(
+        datetime(2025, 1, 1, 3, 20, 1, 123456),
+        datetime(2025, 1, 3, 4, 0, 0)
+    )
+
+    assert time_range.start == "2025-01-01T03:20:01.123Z"
+    assert time_range.end == "2025-01-03T04:00:00.000Z"
+    assert time_range.durationDays == 2
+
+
+def test_build_time_range_empty():
+    """测试没有消息时的时间范围"""
+    time_range = build_time_range(None, None)
+
+    assert time_range.start == ""
+    assert time_range.durationDays == 0
+
+
+def test_count_resources():
+    """测试只统计资源数量"""
+    resource_totals = new_resource_stats()
+    count_resources(
+        [
+            {"type": "image", "data": {}},
+            {"type": "record", "data": {}},
+            {"type": "text", "data": {"text": "hi"}},
+            {"type": "file", "data": {}},
+        ],
+        resource_totals
+    )
+
+    assert resource_totals == {"image": 1, "video": 0, "audio": 1, "file": 1}
+
+
+def test_build_statistics_model():
+    """测试统计信息模型"""
+    sender_stats = {
+        "u_1": {"uid": "u_1", "name": "Alice", "messageCount": 3},
+        "u_2": {"uid": "u_2", "name": "Bob", "messageCount": 1},
+    }
+    resources = {"image": 2, "video": 0, "audio": 1, "file": 0}
+
+    statistics = build_statistics_model(
+        4, build_time_range(None, None), build_statistics(sender_stats, resources)
+    )
+
+    assert statistics.totalMessages == 4
+    assert statistics.messageTypes.unknown == 4
+    assert statistics.senders[0].percentage == 75.0
+    assert statistics.resources.total == 3
+    assert statistics.resources.byType.image == 2
+
+
+def test_merge_statistics_keeps_first_seen_order():
+    """测试合并分段统计时保持发送者首次出现的顺序和名字"""
+    sender_stats = {"u_2": {"uid": "u_2", "name": "Bob", "messageCount": 1}}
+    resource_totals = {"image": 1, "video": 0, "audio": 0, "file": 0}
+
+    merge_statistics(
+        sender_stats,
+        resource_totals,
+        {
+            "u_1": {"uid": "u_1", "name": "Alice", "messageCount": 2},
+            "u_2": {"uid": "u_2", "name": "Bobby", "messageCount": 3},
+        },
+        {"image": 0, "video": 1, "audio": 0, "file": 0}
+    )
+
+    assert list(sender_stats) == ["u_2", "u_1"]
+    assert sender_stats["u_2"] == {"uid": "u_2", "name": "Bob", "messageCount": 4}
+    assert resource_totals == {"image": 1, "video": 1, "audio": 0, "file": 0}
+
+
+def test_compute_statistics_matches_conversion(database):
+    """测试数据库侧统计与逐条转换累加的统计一致，包括发送者顺序"""
+    chat = SyntheticChat(3000, members=30, seed=11)
+    filters = _group_filters(GROUP_ID, None, None)
+    nickname_map = {chat.user_id(0): "群主"}
+
+    async def run():
+        await populate_database(chat)
+        converter = MessageConverter("group", GROUP_ID, nickname_map)
+        rows = [row async for batch in iter_message_rows(batch_size=500, **filters) for row in batch]
+        converter.convert(rows)
+        expected = build_statistics_model(
+            len(rows), build_time_range(rows[0].time, rows[-1].time), converter.statistics()
+        )
+        computed = await compute_statistics(filters, nickname_map, include_resources=True)
+        without_resources = await compute_statistics(filters, nickname_map)
+        return expected, computed, without_resources
+
+    expected, computed, without_resources = asyncio.run(run())
+
+    assert len(expected.senders) > 10
+    assert expected.resources.total > 0
+    assert computed == expected
+    assert [sender.uid for sender in computed.senders] == [sender.uid for sender in expected.senders]
+    assert "群主" in [sender.name for sender in computed.senders]
+    assert without_resources.senders == expected.senders
+    assert without_resources.resources.total == 0
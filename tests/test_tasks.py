@@ -0,0 +1,145 @@
+"""
+测试导出任务存储
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from nonebot_plugin_qq_chat_exporter.tasks import (
+    TASK_CANCELLED,
+    TASK_COMPLETED,
+    TASK_FAILED,
+    TASK_PENDING,
+    TASK_PROCESSING,
+    TaskStore,
+)
+
+
+def test_update_ignores_finished_tasks(database):
+    """测试已结束的任务不再更新"""
+    store = TaskStore(cache_size=10, ttl=3600)
+
+    async def run():
+        task = await store.create("group", "1", {"format": "json"})
+        done = await store.update(task.id, status=TASK_COMPLETED, file_path="a.json")
+        ignored = await store.update(task.id, status=TASK_PROCESSING, message="late progress")
+        missing = await store.update("missing", status=TASK_PROCESSING)
+        # 绕过缓存，确认数据库中的状态
+        stored = await TaskStore(cache_size=10, ttl=3600).get(task.id)
+        return done, ignored, missing, await store.get(task.id), stored
+
+    done, ignored, missing, cached, stored = asyncio.run(run())
+
+    assert done.status == TASK_COMPLETED
+    assert done.finished_at is not None
+    assert ignored is None
+    assert missing is None
+    for task in (cached, stored):
+        assert task.status == TASK_COMPLETED
+        assert task.file_path == "a.json"
+        assert task.message == "任务已创建"
+        assert task.request == {"format": "json"}
+
+
+def test_list_paginates_and_filters(database):
+    """测试分页按创建时间倒序，并按状态、聊天类型和聊天筛选"""
+    store = TaskStore(cache_size=10, ttl=3600)
+    chats = [("group", "1"), ("group", "2"), ("private", "3"), ("group", "1"), ("private", "4")]
+
+    async def run():
+        tasks = [await store.create(chat_type, chat_id, {}) for chat_type, chat_id in chats]
+        await store.update(tasks[0].id, status=TASK_COMPLETED)
+        await store.update(tasks[2].id, status=TASK_FAILED)
+        pages = [await store.list(offset=offset, limit=2) for offset in (0, 2, 4)]
+        return tasks, pages, {
+            "completed": await store.list(status=TASK_COMPLETED),
+            "group": await store.list(chat_type="group"),
+            "group_1": await store.list(chat_type="group", chat_id="1"),
+            "pending_private": await store.list(status=TASK_PENDING, chat_type="private"),
+        }
+
+    tasks, pages, filtered = asyncio.run(run())
+
+    expected = sorted(tasks, key=lambda task: (-task.created_at.timestamp(), task.id))
+    assert [total for total, _ in pages] == [5, 5, 5]
+    assert [len(page) for _, page in pages] == [2, 2, 1]
+    assert [task.id for _, page in pages for task in page] == [task.id for task in expected]
+
+    assert [task.id for task in filtered["completed"][1]] == [tasks[0].id]
+    assert filtered["group"][0] == 3
+    assert {task.id for task in filtered["group_1"][1]} == {tasks[0].id, tasks[3].id}
+    assert [task.id for task in filtered["pending_private"][1]] == [tasks[4].id]
+
+
+def test_cleanup_removes_expired_finished_tasks(database):
+    """测试只删除超过保留时间的已结束任务，并同步清理缓存"""
+    store = TaskStore(cache_size=10, ttl=60)
+
+    async def run():
+        expired = await store.create("group", "1", {})
+        recent = await store.create("group", "2", {})
+        running = await store.create("group", "3", {})
+        await store.update(expired.id, status=TASK_CANCELLED, finished_at=datetime.now() - timedelta(minutes=5))
+        await store.update(recent.id, status=TASK_COMPLETED)
+        await store.update(running.id, status=TASK_PROCESSING)
+
+        removed = await store.cleanup()
+        disabled = await TaskStore(cache_size=10, ttl=0).cleanup(now=datetime.now() + timedelta(days=1))
+        later = await store.cleanup(now=datetime.now() + timedelta(minutes=2))
+        return (
+            removed, disabled, later,
+            [await store.get(task.id) for task in (expired, recent, running)]
+        )
+
+    removed, disabled, later, (expired, recent, running) = asyncio.run(run())
+
+    assert removed == 1
+    assert disabled == 0
+    assert later == 1
+    assert expired is None
+    assert recent is None
+    assert running.status == TASK_PROCESSING
+
+
+def test_fail_interrupted_marks_unfinished_tasks(database):
+    """测试启动时将上次未完成的任务标记为失败"""
+    store = TaskStore(cache_size=10, ttl=3600)
+
+    async def run():
+        pending = await store.create("group", "1", {})
+        processing = await store.create("group", "2", {})
+        completed = await store.create("group", "3", {})
+        await store.update(processing.id, status=TASK_PROCESSING)
+        await store.update(completed.id, status=TASK_COMPLETED)
+
+        marked = await store.fail_interrupted()
+        return marked, [await store.get(task.id) for task in (pending, processing, completed)]
+
+    marked, (pending, processing, completed) = asyncio.run(run())
+
+    assert marked == 2
+    for task in (pending, processing):
+        assert task.status == TASK_FAILED
+        assert task.finished_at is not None
+        assert "中断" in task.message
+    assert completed.status == TASK_COMPLETED
+
+
+def test_cache_is_bounded(database):
+    """测试内存中只保留最近访问的任务，被淘汰的任务从数据库读取"""
+    store = TaskStore(cache_size=2, ttl=3600)
+
+    async def run():
+        first = await store.create("group", "1", {})
+        second = await store.create("group", "2", {})
+        # 访问第一个任务后，第二个任务成为最久未访问的
+        await store.get(first.id)
+        third = await store.create("group", "3", {})
+        cached = list(store._cache)
+        reloaded = await store.get(second.id)
+        return first, second, third, cached, reloaded, list(store._cache)
+
+    first, second, third, cached, reloaded, cached_after = asyncio.run(run())
+
+    assert cached == [first.id, third.id]
+    assert reloaded.id == second.id
+    assert cached_after == [third.id, second.id]
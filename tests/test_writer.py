@@ -0,0 +1,479 @@
+"""
+测试流式导出写入器
+"""
+import gzip
+import json
+import zlib
+from pathlib import Path
+
+import pytest
+
+from nonebot_plugin_qq_chat_exporter.compression import (
+    StreamCompressor,
+    compressed_path,
+    detect_compression,
+    normalize_compression,
+    zstandard,
+)
+from nonebot_plugin_qq_chat_exporter.models import (
+    ChatInfo,
+    ExportData,
+    ExportMessage,
+    MessageContent,
+    MessageReceiver,
+    MessageSender,
+    MessageStats,
+    SenderStats,
+    Statistics,
+)
+from nonebot_plugin_qq_chat_exporter.writer import (
+    ExportAppender,
+    ExportStreamEncoder,
+    ExportWriter,
+    NDJSONWriter,
+)
+
+
+def _make_message(index: int, timestamp: str = "2025-01-01T03:20:01.000Z") -> ExportMessage:
+    return ExportMessage(
+        messageId=f"msg_{index}",
+        timestamp=timestamp,
+        sender=MessageSender(uid="u_1", uin="1", name="测试用户"),
+        receiver=MessageReceiver(uid="999", type="group"),
+        content=MessageContent(text=f"消息 {index}", raw=f"消息 {index}"),
+        stats=MessageStats(elementCount=1, textLength=4)
+    )
+
+
+def _expected_bytes(export_data: ExportData) -> bytes:
+    """旧版一次性写出的结果"""
+    return json.dumps(
+        export_data.model_dump(mode="json"),
+        ensure_ascii=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def test_writer_matches_model_dump(tmp_path):
+    """测试流式写出与 model_dump 逐字节一致"""
+    chat_info = ChatInfo(name="测试群", type="group")
+    messages = [_make_message(i) for i in range(5)]
+    statistics = Statistics(
+        totalMessages=5,
+        senders=[SenderStats(uid="u_1", name="测试用户", messageCount=5, percentage=100.0)]
+    )
+    output_file = tmp_path / "export.json"
+
+    with ExportWriter(output_file, chat_info) as writer:
+        writer.write_messages(messages[:2])
+        writer.write_messages([])
+        writer.write_messages(messages[2:])
+        writer.finish(statistics)
+
+    expected = ExportData(chatInfo=chat_info, statistics=statistics, messages=messages)
+    assert output_file.read_bytes() == _expected_bytes(expected)
+    assert not (tmp_path / "export.json.part").exists()
+
+
+def test_writer_empty_export(tmp_path):
+    """测试没有消息时的输出"""
+    chat_info = ChatInfo(name="空群", type="group")
+    output_file = tmp_path / "empty.json"
+
+    with ExportWriter(output_file, chat_info) as writer:
+        writer.finish(Statistics())
+
+    expected = ExportData(chatInfo=chat_info)
+    assert output_file.read_bytes() == _expected_bytes(expected)
+
+
+def test_writer_removes_partial_output_on_error(tmp_path):
+    """测试出错时清理不完整的文件"""
+    output_file = tmp_path / "broken.json"
+
+    try:
+        with ExportWriter(output_file, ChatInfo(name="群", type="group")) as writer:
+            writer.write_messages([_make_message(0)])
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    assert not output_file.exists()
+    assert not (tmp_path / "broken.json.part").exists()
+
+
+def test_writer_raw_fragments(tmp_path):
+    """测试写入已序列化片段与逐条写入一致"""
+    chat_info = ChatInfo(name="测试群", type="group")
+    messages = [_make_message(i) for i in range(4)]
+    fragment = b",".join(
+        json.dumps(
+            m.model_dump(mode="json"), ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        for m in messages[1:3]
+    )
+    output_file = tmp_path / "raw.json"
+
+    with ExportWriter(output_file, chat_info) as writer:
+        writer.write_messages(messages[:1])
+        writer.write_raw(fragment, 2)
+        writer.write_raw(b"", 0)
+        writer.write_messages(messages[3:])
+        writer.finish(Statistics(totalMessages=4))
+
+    expected = ExportData(chatInfo=chat_info, statistics=Statistics(totalMessages=4), messages=messages)
+    assert output_file.read_bytes() == _expected_bytes(expected)
+    assert writer.message_count == 4
+
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    if compression == "gzip":
+        return gzip.decompress(data)
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+@pytest.mark.parametrize("compression", [
+    "gzip",
+    pytest.param("zstd", marks=pytest.mark.skipif(zstandard is None, reason="requires zstandard")),
+])
+def test_writer_compressed_output(tmp_path, compression):
+    """测试压缩输出在写出的同时压缩，解压后与不压缩时逐字节相同"""
+    chat_info = ChatInfo(name="测试群", type="group")
+    messages = [_make_message(i) for i in range(50)]
+    statistics = Statistics(totalMessages=50)
+    output_file = compressed_path(tmp_path / "export.json", compression)
+
+    with ExportWriter(output_file, chat_info, compression=compression, statistics=statistics) as writer:
+        writer.write_messages(messages[:20])
+        writer.write_messages(messages[20:])
+        # 只有压缩后的 .part 文件，不经过未压缩的暂存文件
+        assert [path.name for path in tmp_path.iterdir()] == [output_file.name + ".part"]
+        assert writer.bytes_written > 0
+        writer.finish(statistics)
+
+    expected = ExportData(chatInfo=chat_info, statistics=statistics, messages=messages)
+    data = output_file.read_bytes()
+    assert len(data) < len(_expected_bytes(expected))
+    decoded = _decompress(data, compression)
+    assert decoded == _expected_bytes(expected)
+    assert list(json.loads(decoded)) == ["metadata", "chatInfo", "statistics", "messages", "exportOptions"]
+    assert not writer.rewritten
+    assert writer.file_size == len(data)
+    assert detect_compression(output_file) == compression
+    assert [path.name for path in tmp_path.iterdir()] == [output_file.name]
+
+
+def test_writer_writes_messages_once(tmp_path):
+    """测试头部先写出，消息直接写入导出文件"""
+    chat_info = ChatInfo(name="测试群", type="group")
+    messages = [_make_message(i) for i in range(5)]
+    statistics = Statistics(totalMessages=5)
+    output_file = tmp_path / "export.json"
+    expected = _expected_bytes(ExportData(chatInfo=chat_info, statistics=statistics, messages=messages))
+
+    with ExportWriter(output_file, chat_info, statistics=statistics) as writer:
+        writer.write_messages(messages)
+        part_file = tmp_path / "export.json.part"
+        writer._file.flush()
+        # 写出完成前 .part 文件已经是导出文件除结尾以外的部分
+        written = part_file.read_bytes()
+        assert expected.startswith(written)
+        assert len(written) == writer.header_size + len(b',"messages":[') + writer.bytes_written
+        writer.finish(statistics)
+
+    assert output_file.read_bytes() == expected
+    assert [path.name for path in tmp_path.iterdir()] == ["export.json"]
+
+
+@pytest.mark.parametrize(("compression", "estimate", "rewritten"), [
+    # 长度相同的头部原地覆盖
+    (None, Statistics(totalMessages=3), False),
+    (None, None, False),
+    # 长度不同或压缩时重写文件
+    (None, Statistics(totalMessages=40), True),
+    ("gzip", Statistics(totalMessages=3), True),
+])
+def test_writer_corrects_estimated_statistics(tmp_path, compression, estimate, rewritten):
+    """测试预先计算的统计信息与最终结果不同时修正头部"""
+    chat_info = ChatInfo(name="测试群", type="group")
+    messages = [_make_message(i) for i in range(4)]
+    statistics = Statistics(totalMessages=4)
+    output_file = compressed_path(tmp_path / "export.json", compression)
+
+    with ExportWriter(output_file, chat_info, compression=compression, statistics=estimate) as writer:
+        writer.write_messages(messages)
+        writer.finish(statistics)
+
+    expected = _expected_bytes(ExportData(chatInfo=chat_info, statistics=statistics, messages=messages))
+    data = output_file.read_bytes()
+    if compression is not None:
+        data = _decompress(data, compression)
+    assert data == expected
+    assert writer.rewritten == rewritten
+    assert writer.file_size == output_file.stat().st_size
+    assert data[writer.messages_end:writer.messages_end + 1] == b"]"
+    assert [path.name for path in tmp_path.iterdir()] == [output_file.name]
+
+
+def test_writer_compressed_output_removed_on_error(tmp_path):
+    """测试压缩导出出错时不保留不完整的文件"""
+    output_file = compressed_path(tmp_path / "export.json", "gzip")
+
+    with pytest.raises(RuntimeError):
+        with ExportWriter(output_file, ChatInfo(name="测试群", type="group"), compression="gzip") as writer:
+            writer.write_messages([_make_message(0)])
+            raise RuntimeError("interrupted")
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_stream_encoder_matches_model_dump():
+    """测试流式编码解析后与 model_dump 一致，statistics 位于 messages 之后"""
+    chat_info = ChatInfo(name="测试群", type="group")
+    messages = [_make_message(i) for i in range(5)]
+    statistics = Statistics(totalMessages=5)
+    encoder = ExportStreamEncoder(chat_info)
+
+    data = (
+        encoder.header()
+        + encoder.encode_messages(messages[:2])
+        + encoder.encode_messages([])
+        + encoder.encode_messages([m.model_dump(mode="json") for m in messages[2:]])
+        + encoder.tail(statistics)
+    )
+
+    expected = ExportData(chatInfo=chat_info, statistics=statistics, messages=messages)
+    decoded = json.loads(data)
+    assert decoded == json.loads(_expected_bytes(expected))
+    assert list(decoded) == ["metadata", "chatInfo", "messages", "statistics", "exportOptions"]
+    assert encoder.message_count == 5
+
+
+@pytest.mark.parametrize("compression", [
+    "gzip",
+    pytest.param("zstd", marks=pytest.mark.skipif(zstandard is None, reason="requires zstandard")),
+])
+def test_stream_compressor_flushes_each_chunk(compression):
+    """测试逐块压缩的数据可以立即解压，结束后得到完整内容"""
+    compressor = StreamCompressor(compression)
+    first = compressor.compress(b'{"messages":[')
+    if compression == "gzip":
+        partial = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(first)
+    else:
+        partial = zstandard.ZstdDecompressor().decompressobj().decompress(first)
+    assert partial == b'{"messages":['
+
+    data = first + compressor.compress(b"1,2,3") + compressor.compress(b"]}") + compressor.finish()
+    assert _decompress(data, compression) == b'{"messages":[1,2,3]}'
+
+
+def test_normalize_compression():
+    """测试压缩方式校验"""
+    assert normalize_compression(None) is None
+    assert normalize_compression("none") is None
+    assert normalize_compression("gzip") == "gzip"
+    assert compressed_path(Path("a.json"), None) == Path("a.json")
+    assert compressed_path(Path("a.json"), "gzip") == Path("a.json.gz")
+    assert detect_compression(Path("a.json")) is None
+    with pytest.raises(ValueError):
+        normalize_compression("brotli")
+
+
+def _append(output_file, chat_info, writer, messages, statistics):
+    with ExportAppender(
+        output_file,
+        chat_info,
+        writer.header_size,
+        writer.messages_end,
+        writer.message_count
+    ) as appender:
+        appender.write_messages(messages)
+        appender.finish(statistics)
+    return appender
+
+
+def test_appender_in_place(tmp_path):
+    """测试增量追加消息并原地更新头部"""
+    chat_info = ChatInfo(name="测试群", type="group")
+    messages = [_make_message(i) for i in range(5)]
+    output_file = tmp_path / "export.json"
+
+    with ExportWriter(output_file, chat_info, reserve_header=True) as writer:
+        writer.write_messages(messages[:3])
+        writer.finish(Statistics(totalMessages=3))
+
+    statistics = Statistics(totalMessages=5)
+    appender = _append(output_file, chat_info, writer, messages[3:], statistics)
+
+    expected = ExportData(chatInfo=chat_info, statistics=statistics, messages=messages)
+    assert json.loads(output_file.read_bytes()) == expected.model_dump(mode="json")
+    assert appender.header_size == writer.header_size
+    assert appender.message_count == 5
+    assert appender.file_size == output_file.stat().st_size
+    assert output_file.read_bytes()[appender.messages_end:appender.messages_end + 1] == b"]"
+
+
+def test_appender_rewrites_when_header_grows(tmp_path):
+    """测试头部超出预留空间时重写文件"""
+    chat_info = ChatInfo(name="测试群", type="group")
+    messages = [_make_message(i) for i in range(4)]
+    output_file = tmp_path / "export.json"
+
+    with ExportWriter(output_file, chat_info, reserve_header=True) as writer:
+        writer.finish(Statistics())
+
+    # 大量新发送者使统计信息超过预留空间
+    statistics = Statistics(
+        totalMessages=4,
+        senders=[
+            SenderStats(uid=f"u_{i}", name=f"用户{i}", messageCount=1, percentage=0.5)
+            for i in range(200)
+        ]
+    )
+    first = _append(output_file, chat_info, writer, messages[:2], statistics)
+    assert first.header_size > writer.header_size
+
+    second = _append(output_file, chat_info, first, messages[2:], statistics)
+    assert second.header_size == first.header_size
+
+    expected = ExportData(chatInfo=chat_info, statistics=statistics, messages=messages)
+    assert json.loads(output_file.read_bytes()) == expected.model_dump(mode="json")
+    assert not (tmp_path / "export.json.tmp").exists()
+
+
+def test_appender_keeps_file_on_error(tmp_path):
+    """测试追加出错时不删除已有的导出文件"""
+    chat_info = ChatInfo(name="测试群", type="group")
+    output_file = tmp_path / "export.json"
+
+    with ExportWriter(output_file, chat_info, reserve_header=True) as writer:
+        writer.write_messages([_make_message(0)])
+        writer.finish(Statistics(totalMessages=1))
+    original = output_file.read_bytes()
+
+    with pytest.raises(RuntimeError):
+        with ExportAppender(
+            output_file, chat_info, writer.header_size, writer.messages_end, 1
+        ) as appender:
+            appender.write_messages([_make_message(1)])
+            raise RuntimeError("boom")
+
+    assert output_file.read_bytes() == original
+    assert not (tmp_path / "export.json.part").exists()
+
+
+def test_reserve_header_requires_uncompressed(tmp_path):
+    """测试压缩输出不能预留头部空间"""
+    with pytest.raises(ValueError):
+        ExportWriter(
+            tmp_path / "export.json.gz",
+            ChatInfo(name="测试群", type="group"),
+            compression="gzip",
+            reserve_header=True
+        )
+
+
+def _read_shards(output_dir: Path) -> tuple[dict, list[list[dict]]]:
+    """读取 NDJSON 导出目录，返回清单和每个分片的各行"""
+    manifest = json.loads((output_dir / "manifest.json").read_text(encoding="utf-8"))
+    shards = []
+    for shard in manifest["shards"]:
+        data = (output_dir / shard["file"]).read_bytes()
+        if shard["file"].endswith(".gz"):
+            data = gzip.decompress(data)
+        shards.append([json.loads(line) for line in data.splitlines()])
+    return manifest, shards
+
+
+def test_ndjson_writer_splits_by_size(tmp_path):
+    """测试按大小分片，每个分片以头部开始，之后每行一条消息"""
+    chat_info = ChatInfo(name="测试群", type="group")
+    messages = [_make_message(i) for i in range(10)]
+    line_size = len(json.dumps(
+        messages[0].model_dump(mode="json"), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")) + 1
+    output_dir = tmp_path / "export"
+    statistics = Statistics(totalMessages=10)
+
+    with NDJSONWriter(output_dir, chat_info, split_size=line_size * 4) as writer:
+        writer.write_messages(messages[:3])
+        writer.write_messages([m.model_dump(mode="json") for m in messages[3:]])
+        writer.finish(statistics)
+
+    manifest, shards = _read_shards(output_dir)
+    assert [s["messageCount"] for s in manifest["shards"]] == [4, 4, 2]
+    assert manifest["statistics"] == statistics.model_dump(mode="json")
+    for index, lines in enumerate(shards, start=1):
+        header = lines[0]
+        assert header["chatInfo"] == chat_info.model_dump(mode="json")
+        assert header["statistics"]["totalMessages"] == 10
+        assert header["shard"]["index"] == index
+        assert header["shard"]["count"] == 3
+    assert [line["messageId"] for lines in shards for line in lines[1:]] == [m.messageId for m in messages]
+    assert sorted(p.name for p in output_dir.iterdir()) == [
+        "manifest.json", "part-00001.ndjson", "part-00002.ndjson", "part-00003.ndjson"
+    ]
+    assert writer.file_size == sum(s["size"] for s in manifest["shards"])
+
+
+def test_ndjson_writer_splits_by_month(tmp_path):
+    """测试按自然月分片"""
+    messages = [
+        _make_message(0, "2025-01-30T23:59:59.000Z"),
+        _make_message(1, "2025-01-31T00:00:00.000Z"),
+        _make_message(2, "2025-02-01T00:00:00.000Z"),
+        _make_message(3, "2025-04-15T12:00:00.000Z"),
+    ]
+    output_dir = tmp_path / "export"
+
+    with NDJSONWriter(output_dir, ChatInfo(name="群", type="group"), split_by_month=True, compression="gzip") as writer:
+        writer.write_messages(messages)
+        writer.finish(Statistics(totalMessages=4))
+
+    manifest, shards = _read_shards(output_dir)
+    assert [s["period"] for s in manifest["shards"]] == ["2025-01", "2025-02", "2025-04"]
+    assert [s["messageCount"] for s in manifest["shards"]] == [2, 1, 1]
+    assert manifest["shards"][0]["firstTimestamp"] == "2025-01-30T23:59:59.000Z"
+    assert manifest["shards"][0]["lastTimestamp"] == "2025-01-31T00:00:00.000Z"
+    assert manifest["shards"][0]["file"] == "part-00001.ndjson.gz"
+    assert [len(lines) for lines in shards] == [3, 2, 2]
+
+
+def test_ndjson_writer_empty_and_error(tmp_path):
+    """测试没有消息时仍写出头部，出错时删除导出目录"""
+    output_dir = tmp_path / "empty"
+    with NDJSONWriter(output_dir, ChatInfo(name="空群", type="group")) as writer:
+        writer.finish(Statistics())
+    manifest, shards = _read_shards(output_dir)
+    assert len(shards) == 1 and len(shards[0]) == 1
+    assert shards[0][0]["shard"]["messageCount"] == 0
+
+    broken = tmp_path / "broken"
+    with pytest.raises(RuntimeError):
+        with NDJSONWriter(broken, ChatInfo(name="群", type="group")) as writer:
+            writer.write_messages([_make_message(0)])
+            raise RuntimeError("boom")
+    assert not broken.exists()
+
+
+def test_ndjson_writer_avoids_existing_directory(tmp_path):
+    """测试输出目录已存在时追加序号，不覆盖已有的导出"""
+    output_dir = tmp_path / "export"
+    output_dir.mkdir()
+    (output_dir / "manifest.json").write_text("{}", encoding="utf-8")
+    chat_info = ChatInfo(name="测试群", type="group")
+
+    # 两次导出同时进行，各自使用不同的目录
+    with NDJSONWriter(output_dir, chat_info) as first, NDJSONWriter(output_dir, chat_info) as second:
+        first.write_messages([_make_message(0)])
+        second.write_messages([_make_message(1), _make_message(2)])
+        first.finish(Statistics(totalMessages=1))
+        second.finish(Statistics(totalMessages=2))
+
+    assert first.output_dir == tmp_path / "export_1"
+    assert second.output_dir == tmp_path / "export_2"
+    assert second.manifest_file == tmp_path / "export_2" / "manifest.json"
+    assert (output_dir / "manifest.json").read_text(encoding="utf-8") == "{}"
+    assert [len(shards[0]) - 1 for _, shards in map(_read_shards, (first.output_dir, second.output_dir))] == [1, 2]